@@ -1,20 +1,23 @@
-from flask import Flask, render_template, jsonify
-import numpy as np
-import cupy as cp
+from flask import Flask, render_template, jsonify, Response
+import logging
 import threading
 import time
 from bluetooth_demod.ble_sniffer import BLESniffer
 from bluetooth_demod.sdr.sdr_hackrf import HackRFSdr
+from sdrfly import metrics
+from sdrfly.spectrum import SpectrumEngine
 
 app = Flask(__name__)
+logger = logging.getLogger(__name__)
 
 # Parameters
 CENTER_FREQ = 2.426e9  # Centered at BLE advertising channel 38 (2426 MHz)
 SAMPLE_RATE = 16e6     # 16 MSPS
 BANDWIDTH = 16e6       # 16 MHz capture bandwidth
 GAIN = 30              # Gain in dB
-CAPTURE_DURATION = 1   # Capture duration in seconds
-NUM_SAMPLES = int(SAMPLE_RATE * CAPTURE_DURATION)  # Number of samples for 1 second
+FRAME_RATE = 1         # Spectrum frames per second, matching the page's refresh
+FFT_SIZE = 4096        # Spectrum bins
+NUM_AVERAGE = 512      # Most FFTs averaged per frame, bounding the CPU spent per second
 CHUNK_SIZE = 131072    # Number of samples per chunk from HackRF
 
 # Initialize the BLESniffer
@@ -22,46 +25,51 @@ sniffer = BLESniffer(HackRFSdr, CENTER_FREQ, SAMPLE_RATE, BANDWIDTH, GAIN)
 
 data_lock = threading.Lock()
 fft_data = []
+spectrum = SpectrumEngine(SAMPLE_RATE, FFT_SIZE, num_average=NUM_AVERAGE, frame_rate=FRAME_RATE, name="btsniffer")
+
+CAPTURE_SECONDS = metrics.histogram("sdrfly_btsniffer_capture_seconds", "Time to capture and average one frame.")
+CAPTURE_ERRORS = metrics.counter("sdrfly_btsniffer_capture_errors_total", "Frames abandoned after an exception.")
+EMPTY_CHUNKS = metrics.counter("sdrfly_btsniffer_empty_chunks_total", "Chunk reads that returned no samples.")
 
 def capture_data():
     global fft_data
+    started = time.perf_counter()
     while True:
         try:
-            # Capture samples in chunks and accumulate
-            accumulated_samples = cp.empty(NUM_SAMPLES, dtype=cp.complex64)
-            start_idx = 0
-
-            while start_idx < NUM_SAMPLES:
-                remaining_samples = NUM_SAMPLES - start_idx
-                chunk_samples = min(CHUNK_SIZE, remaining_samples)
-                samples = sniffer.capture_samples(chunk_samples)
-
-                if len(samples) > 0:
-                    accumulated_samples[start_idx:start_idx + len(samples)] = cp.asarray(samples)
-                    start_idx += len(samples)
-                else:
-                    print("Requested {} samples but got {} samples.".format(chunk_samples, len(samples)))
-
-            print("Captured {} samples.".format(NUM_SAMPLES))
-
-            # Compute FFT
-            fft_samples = cp.fft.fft(accumulated_samples)
-            fft_data = cp.asnumpy(20 * cp.log10(cp.abs(fft_samples)))
+            # Stream chunks into the spectrum engine, which hands back a frame every second
+            samples = sniffer.capture_samples(CHUNK_SIZE)
+            if len(samples) == 0:
+                EMPTY_CHUNKS.inc()
+                continue
+            frames = spectrum.push(samples)
+            if frames:
+                with data_lock:
+                    fft_data = frames[-1]
+                CAPTURE_SECONDS.observe(time.perf_counter() - started)
+                started = time.perf_counter()
         except KeyboardInterrupt:
             break
         except Exception as e:
-            print("Error capturing data: {}".format(e))
+            CAPTURE_ERRORS.inc()
+            spectrum.reset()
+            started = time.perf_counter()
+            logger.exception(f"Error capturing data: {e}")
 
 @app.route('/')
 def index():
     return render_template('index.html')
 
+@app.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
+
 @app.route('/data')
 def data():
     with data_lock:
-        return jsonify(fft_data.tolist())
+        return jsonify(list(map(float, fft_data)))
 
 if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
     data_thread = threading.Thread(target=capture_data)
     data_thread.start()
     app.run(host="0.0.0.0", port=80, debug=True, use_reloader=False)
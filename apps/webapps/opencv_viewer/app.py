@@ -6,6 +6,8 @@ import os
 from multiprocessing import Process, Queue
 import pickle
 from bluetooth_demod.sdr.sdr_hackrf import HackRFSdr
+from sdrfly import metrics
+from sdrfly.spectrum import SpectrumEngine
 
 app = Flask(__name__)
 
@@ -17,13 +19,14 @@ center_freq = 2.4e9  # Center frequency for Bluetooth
 sample_rate = 10e6  # Sample rate
 bandwidth = 10e6  # Bandwidth
 gain = 20  # Gain
+capture_size = 1024  # Samples per capture, one FFT frame
 
 hackrf_sdr = HackRFSdr(center_freq=center_freq, sample_rate=sample_rate, bandwidth=bandwidth, gain=gain)
-sample_buffer = np.zeros(1024, dtype=np.complex64)  # Initial buffer
+sample_buffer = np.zeros(capture_size, dtype=np.complex64)  # Initial buffer
 
 def hackrf_callback():
     global sample_buffer
-    sample_buffer = hackrf_sdr.capture_samples(1024)
+    sample_buffer = hackrf_sdr.capture_samples(capture_size)
 
 def generate_fft_image(q):
     from PySide6.QtWidgets import QApplication, QGraphicsView, QGraphicsScene
@@ -33,19 +36,22 @@ def generate_fft_image(q):
 
     # Create a single instance of QApplication
     qt_app = QApplication([])
+    # Each capture is one FFT frame, smoothed across frames for display
+    spectrum = SpectrumEngine(sample_rate, capture_size, overlap=0, averaging="ewma", num_average=1,
+                              alpha=0.3, name="opencv_viewer")
 
     while True:
         sample_buffer = q.get()
         
-        # Perform FFT
-        fft_result = np.fft.fftshift(np.fft.fft(sample_buffer))
-        fft_magnitude = 20 * np.log10(np.abs(fft_result))
+        # Average the new capture into the spectrum
+        spectrum.push(sample_buffer)
+        power_db = spectrum.latest
 
         # Generate the FFT plot using pyqtgraph
         plt = pg.PlotWidget()
-        plt.plot(np.linspace(-sample_rate/2, sample_rate/2, len(fft_magnitude)), fft_magnitude, pen='y')
+        plt.plot(spectrum.freqs, power_db, pen='y')
         plt.setTitle("FFT of Signal")
-        plt.setLabel('left', 'Magnitude (dB)')
+        plt.setLabel('left', 'Power (dBFS)')
         plt.setLabel('bottom', 'Frequency')
 
         # Render plot to an image using QGraphicsView and QGraphicsScene
@@ -70,6 +76,10 @@ def generate_fft_image(q):
 def index():
     return render_template('index.html')
 
+@app.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
+
 @app.route('/video_feed')
 def video_feed():
     return Response(generate_frames(), mimetype='multipart/x-mixed-replace; boundary=frame')
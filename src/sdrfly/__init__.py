@@ -1,25 +1,24 @@
 import logging
-import logging.handlers
 from pathlib import Path
 
-# Define the log directory and ensure it exists
-_log_location = Path.home() / "sdrfly"
-_log_location.mkdir(parents=True, exist_ok=True)
-
-# Setup a rotating file handler for SDRFLY
-_rotating_file_handler = logging.handlers.RotatingFileHandler(
-    _log_location / "sdrfly.log", maxBytes=10**6, backupCount=5  # Corrected maxBytes to 10^6 and added backupCount
-)
+# Named logger for SDRFLY. Importing the package neither touches the file system nor
+# configures logging; applications opt in to the log file with enable_file_logging()
+sdrfly_logger = logging.getLogger("SDRFLY")
+sdrfly_logger.addHandler(logging.NullHandler())
 
-# Set a formatter for the logs
-_rotating_file_handler.setFormatter(
-    logging.Formatter("%(asctime)s - SDRFLY - %(name)s - %(levelname)s - %(message)s")
-)
+def enable_file_logging(log_location=None, level=logging.INFO):
+    """
+    Log SDRFLY messages to a rotating sdrfly.log in log_location, ~/sdrfly by default.
 
-# Create a named logger for SDRFLY
-sdrfly_logger = logging.getLogger("SDRFLY")
-sdrfly_logger.addHandler(_rotating_file_handler)
-sdrfly_logger.setLevel(logging.INFO)
+    Returns:
+        Path: The log directory.
+    """
+    import logging.handlers
 
-# Print log directory for verification
-print(f"Log directory: {_log_location}")
+    log_location = Path(log_location) if log_location is not None else Path.home() / "sdrfly"
+    log_location.mkdir(parents=True, exist_ok=True)
+    handler = logging.handlers.RotatingFileHandler(log_location / "sdrfly.log", maxBytes=10**6, backupCount=5)
+    handler.setFormatter(logging.Formatter("%(asctime)s - SDRFLY - %(name)s - %(levelname)s - %(message)s"))
+    sdrfly_logger.addHandler(handler)
+    sdrfly_logger.setLevel(level)
+    return log_location
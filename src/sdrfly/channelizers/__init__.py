@@ -0,0 +1,3 @@
+from sdrfly.channelizers.registry import autotune, available_backends, get_channelizer
+
+__all__ = ["autotune", "available_backends", "get_channelizer"]
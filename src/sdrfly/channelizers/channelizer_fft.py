@@ -1,32 +1,94 @@
 import numpy as np
-from scipy.fftpack import fft, ifft
-from concurrent.futures import ThreadPoolExecutor
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy import fft as sp_fft
 from sdrfly.channelizers.channelizer_base import ChannelizerBase
+from sdrfly.filters import prototype_filter
+
+# Alias blocks of the prototype's response whose peak is below this are not folded
+# back; beyond the neighbouring channels the stopband is further down than this
+ALIAS_FLOOR_DB = -80.0
 
 class ChannelizerFFT(ChannelizerBase):
-    def __init__(self, num_channels=10, channel_bw=1e6, sample_rate=10e6):
+    """
+    Overlap-save fast-convolution channelizer.
+
+    Each frame of fft_size input samples is transformed once; every channel then
+    takes its band of bins, applies the prototype filter response and returns to
+    the time domain with a short inverse FFT, which also decimates by
+    sample_rate / channel_bw. Decimating folds the neighbouring bands, where the
+    prototype's transition band lies, onto the channel's, as the polyphase
+    filterbank's critical sampling does. Outputs are taken at the end of each
+    decimation interval, also like the filterbank, so for the same prototype the
+    outputs match ChannelizerPFB sample for sample, in count, timing and layout,
+    to within the stopband left unfolded (below ALIAS_FLOOR_DB).
+
+    Frames overlap by the filter length. A final partial frame is zero padded,
+    which leaves the outputs that depend only on real samples exact, so any whole
+    number of decimation intervals can be channelized and consecutive calls in
+    streaming mode are seamless.
+    """
+
+    def __init__(self, num_channels=10, channel_bw=1e6, sample_rate=10e6, taps_per_branch=12, fft_size=None, workers=None):
         super().__init__(num_channels, channel_bw, sample_rate)
+        self.decimation_factor = int(round(sample_rate / channel_bw))
+        if num_channels > self.decimation_factor:
+            raise ValueError(f"Cannot extract {num_channels} channels of {channel_bw} Hz from {sample_rate} Hz")
+        num_taps = self.decimation_factor * taps_per_branch
+        if fft_size is None:
+            bins_per_channel = 1 << int(np.ceil(np.log2(4 * taps_per_branch)))
+            fft_size = self.decimation_factor * bins_per_channel
+        if fft_size % self.decimation_factor or fft_size < 2 * num_taps:
+            raise ValueError("fft_size must be a multiple of the decimation factor and at least twice the filter length")
+        self.fft_size = fft_size
+        self.workers = workers
+        self.bins_per_channel = fft_size // self.decimation_factor
+        # Samples advanced per frame; the rest of each frame is overlap for the filter
+        self.frame_stride = (fft_size - num_taps + 1) // self.decimation_factor * self.decimation_factor
+        self.history_len = fft_size - self.frame_stride
+        # One output per decimation interval, like the polyphase filterbank
+        self.input_stride = self.decimation_factor
+
+        offsets = sp_fft.fftfreq(self.bins_per_channel, 1 / self.bins_per_channel).astype(int)
+        aliases, self.filter_response = self._create_filter_response(taps_per_branch, offsets)
+        centres = (np.arange(num_channels) - num_channels // 2) * self.bins_per_channel
+        bins = offsets[None, :] + aliases[:, None] * self.bins_per_channel
+        # (channel, alias, bin) indices into a frame's spectrum
+        self.bin_index = (centres[:, None, None] + bins[None]) % fft_size
+
+    def _create_filter_response(self, taps_per_branch, offsets):
+        # Same prototype as the polyphase filterbank, over the whole band
+        taps = prototype_filter(self.decimation_factor, taps_per_branch).astype(np.float64)
+        response = sp_fft.fft(taps, self.fft_size)
+        # Alias blocks, in channel spacings from the channel, that decimation folds in
+        aliases = np.arange(self.decimation_factor) - self.decimation_factor // 2
+        floor = np.abs(response).max() * 10 ** (ALIAS_FLOOR_DB / 20)
+        aliases = np.array([alias for alias in aliases
+                            if np.abs(response[(offsets + alias * self.bins_per_channel) % self.fft_size]).max() > floor])
+        bins = offsets[None, :] + aliases[:, None] * self.bins_per_channel
+        # Take each output at the end of its decimation interval, like the polyphase
+        # filterbank, and fold in the 1 / decimation scaling of the short inverse FFT
+        delay = np.exp(2j * np.pi * bins * (self.decimation_factor - 1) / self.fft_size)
+        return aliases, (response[bins % self.fft_size] * delay / self.decimation_factor).astype(np.complex64)
+
+    def _channelize_frames(self, frames):
+        spectra = sp_fft.fft(frames, axis=1, workers=self.workers)
+        channel_bins = np.einsum("fcab,ab->fcb", spectra[:, self.bin_index], self.filter_response)
+        channel_samples = sp_fft.ifft(channel_bins, axis=2, overwrite_x=True, workers=self.workers)
+        # Drop the outputs that fall inside the frame overlap
+        return channel_samples[:, :, self.history_len // self.decimation_factor:]
 
-    def channelize(self, samples):
-        return self._channelize_fft_parallel(samples, self.num_channels, self.channel_bw, self.sample_rate)
-
-    def _channelize_fft_parallel(self, samples, num_channels, channel_bw, sample_rate):
-        num_samples = len(samples)
-        fft_size = int(sample_rate // channel_bw)
-        channel_samples = np.zeros((num_channels, num_samples // fft_size), dtype=np.complex64)
-        
-        with ThreadPoolExecutor() as executor:
-            futures = [executor.submit(self._process_channel_fft, samples, fft_size, i) for i in range(num_channels)]
-            for i, future in enumerate(futures):
-                channel_samples[i] = future.result()
-        
-        return channel_samples
-
-    def _process_channel_fft(self, samples, fft_size, channel):
-        num_samples = len(samples)
-        freq_bins = fft(samples)
-        start_bin = channel * fft_size
-        end_bin = start_bin + fft_size
-        channel_freq_bins = np.zeros_like(freq_bins)
-        channel_freq_bins[start_bin:end_bin] = freq_bins[start_bin:end_bin]
-        return ifft(channel_freq_bins)[:num_samples // fft_size]
+    def _channelize_valid(self, buffer):
+        num_outputs = (len(buffer) - self.history_len) // self.decimation_factor
+        num_full = (len(buffer) - self.history_len) // self.frame_stride
+        outputs = []
+        if num_full:
+            frames = sliding_window_view(buffer, self.fft_size)[::self.frame_stride][:num_full]
+            outputs.append(self._channelize_frames(frames))
+        start = num_full * self.frame_stride
+        if start + self.history_len < len(buffer):
+            last = np.zeros((1, self.fft_size), dtype=np.complex64)
+            last[0, :len(buffer) - start] = buffer[start:]
+            outputs.append(self._channelize_frames(last))
+        valid = np.concatenate(outputs) if len(outputs) > 1 else outputs[0]
+        valid = np.ascontiguousarray(valid.transpose(1, 0, 2)).reshape(self.num_channels, -1)
+        return valid[:, :num_outputs]
@@ -0,0 +1,46 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy import fft as sp_fft
+from sdrfly.channelizers.channelizer_base import ChannelizerBase
+from sdrfly.filters import polyphase_filter
+
+
+class ChannelizerPFB(ChannelizerBase):
+    """
+    Critically sampled polyphase filterbank channelizer.
+
+    The input is split by a commutator into M = sample_rate / channel_bw branches,
+    each branch is filtered at the decimated rate and a single M-point FFT per
+    output sample produces every channel at once. Channel i of the output is
+    centred at (i - num_channels // 2) * channel_bw from the capture centre.
+
+    Parameters:
+        num_channels (int): Number of channels to return (at most M).
+        channel_bw (float): Channel spacing and output sample rate in Hz.
+        sample_rate (float): Input sample rate in Hz.
+        taps_per_branch (int): Length of each polyphase branch filter.
+        workers (int): Threads used by the FFT across output samples.
+    """
+
+    def __init__(self, num_channels=10, channel_bw=1e6, sample_rate=10e6, taps_per_branch=12, workers=None):
+        super().__init__(num_channels, channel_bw, sample_rate)
+        self.num_branches = int(round(sample_rate / channel_bw))
+        if num_channels > self.num_branches:
+            raise ValueError(f"Cannot extract {num_channels} channels of {channel_bw} Hz from {sample_rate} Hz")
+        self.taps_per_branch = taps_per_branch
+        self.workers = workers
+        # Row r holds the coefficients applied to commutator position r, oldest block first,
+        # so the branch FIR is a dot product over a window of consecutive blocks
+        self.branch_filter = polyphase_filter(self.num_branches, taps_per_branch)[::-1, ::-1]
+        self.channel_index = (np.arange(num_channels) - num_channels // 2) % self.num_branches
+        self.history_len = (taps_per_branch - 1) * self.num_branches
+        self.input_stride = self.num_branches
+
+    def _channelize_valid(self, buffer):
+        # Commutator: one row per input block of M samples
+        blocks = buffer.reshape(-1, self.num_branches)
+        windows = sliding_window_view(blocks, self.taps_per_branch, axis=0)
+        # Branch FIR for every output sample and every branch in one contraction
+        branch_out = np.einsum("nrp,rp->nr", windows, self.branch_filter)
+        spectra = sp_fft.fft(branch_out, axis=1, overwrite_x=True, workers=self.workers)
+        return np.ascontiguousarray(spectra[:, self.channel_index].T)
@@ -0,0 +1,117 @@
+import numpy as np
+from sdrfly.channelizers.channelizer_base import ChannelizerBase
+from sdrfly.channelizers.channelizer_pfb import ChannelizerPFB
+from sdrfly.filters import prototype_filter
+
+STRATEGIES = ("ddc", "dft", "pfb")
+
+class ChannelizerSparse(ChannelizerBase):
+    """
+    Extract only the requested channels from a capture.
+
+    channel_freqs are the channel centres in Hz; they are taken relative to
+    center_freq and need not lie on a uniform grid. The strategy is picked from
+    the request unless given explicitly:
+
+    - "dft": mode="power" only. A Goertzel-style DFT bank evaluated at each
+      requested frequency over consecutive blocks of sample_rate / channel_bw
+      samples, returning float32 power per block.
+    - "pfb": every frequency sits on the channel_bw grid and at least half the
+      grid is requested, so the full polyphase filterbank is cheaper.
+    - "ddc": otherwise. Each channel is mixed down and decimated through a
+      complex band-pass polyphase FIR evaluated as one small matrix product per
+      filter tap, so cost grows with the number of channels, not the bandwidth.
+
+    IQ output follows the same conventions as ChannelizerPFB.
+    """
+
+    def __init__(self, channel_freqs, channel_bw=1e6, sample_rate=10e6, center_freq=0.0, mode="iq", strategy="auto", taps_per_branch=12):
+        self.channel_freqs = np.atleast_1d(np.asarray(channel_freqs, dtype=np.float64))
+        super().__init__(len(self.channel_freqs), channel_bw, sample_rate)
+        self.offsets = self.channel_freqs - center_freq
+        if np.any(np.abs(self.offsets) > sample_rate / 2):
+            raise ValueError("All channel frequencies must lie within the capture bandwidth")
+        if mode not in ("iq", "power"):
+            raise ValueError(f"Unsupported mode: {mode}")
+        self.mode = mode
+        self.decimation_factor = int(round(sample_rate / channel_bw))
+        self.taps_per_branch = taps_per_branch
+        self.strategy = self._select_strategy() if strategy == "auto" else strategy
+        if self.strategy not in STRATEGIES:
+            raise ValueError(f"Unsupported strategy: {self.strategy}")
+        if (self.strategy == "dft") != (mode == "power"):
+            raise ValueError(f"Strategy {self.strategy} does not produce {mode} output")
+
+        if self.strategy == "dft":
+            self.output_dtype = np.float32
+            self.input_stride = self.decimation_factor
+            sample_index = np.arange(self.decimation_factor)[:, None]
+            self.dft_bank = np.exp(-2j * np.pi * sample_index * self.offsets / sample_rate).astype(np.complex64)
+        elif self.strategy == "pfb":
+            self.pfb = ChannelizerPFB(self.decimation_factor, channel_bw, sample_rate, taps_per_branch)
+            self.pfb_rows = (self.grid_index + self.decimation_factor // 2) % self.decimation_factor
+            self.history_len = self.pfb.history_len
+            self.input_stride = self.pfb.input_stride
+        else:
+            self.history_len = (taps_per_branch - 1) * self.decimation_factor
+            self.input_stride = self.decimation_factor
+            self.branch_filters = self._create_bandpass_filters()
+            # Phase of each channel's down-conversion, in cycles, per output sample
+            # and at the first output
+            self.cycles_per_output = self.offsets * self.decimation_factor / sample_rate
+            self.cycles_at_start = self.offsets * (self.decimation_factor - 1) / sample_rate
+        self._next_output = 0
+
+    @property
+    def grid_index(self):
+        return np.rint(self.offsets / self.channel_bw).astype(int)
+
+    def _select_strategy(self):
+        if self.mode == "power":
+            return "dft"
+        on_grid = np.allclose(self.offsets, self.grid_index * self.channel_bw, rtol=0, atol=1e-6 * self.sample_rate)
+        if on_grid and 2 * len(np.unique(self.grid_index)) >= self.decimation_factor:
+            return "pfb"
+        return "ddc"
+
+    def _create_bandpass_filters(self):
+        taps = prototype_filter(self.decimation_factor, self.taps_per_branch).astype(np.float64)
+        lag = np.arange(len(taps))[:, None]
+        bandpass = taps[:, None] * np.exp(2j * np.pi * lag * self.offsets / self.sample_rate)
+        # Reverse into input order and split into one (branches, channels) matrix per
+        # block of the filter window, oldest block first
+        return np.ascontiguousarray(bandpass[::-1].reshape(self.taps_per_branch, self.decimation_factor, -1), dtype=np.complex64)
+
+    def channelize(self, samples):
+        next_output = self._next_output
+        self._next_output = 0
+        try:
+            return super().channelize(samples)
+        finally:
+            self._next_output = next_output
+
+    def reset(self):
+        super().reset()
+        self._next_output = 0
+
+    def _channelize_valid(self, buffer):
+        blocks = buffer.reshape(-1, self.decimation_factor)
+        if self.strategy == "dft":
+            spectra = blocks @ self.dft_bank
+            power = np.abs(spectra.T).astype(np.float32)
+            power *= power
+            power /= self.decimation_factor ** 2
+            return power
+        if self.strategy == "pfb":
+            return self.pfb._channelize_valid(buffer)[self.pfb_rows]
+
+        num_outputs = blocks.shape[0] - self.taps_per_branch + 1
+        channel_samples = blocks[0:num_outputs] @ self.branch_filters[0]
+        for j in range(1, self.taps_per_branch):
+            channel_samples += blocks[j:j + num_outputs] @ self.branch_filters[j]
+
+        output_index = np.arange(self._next_output, self._next_output + num_outputs, dtype=np.float64)
+        self._next_output += num_outputs
+        cycles = np.mod(np.outer(output_index, self.cycles_per_output) + self.cycles_at_start, 1.0)
+        channel_samples *= np.exp(-2j * np.pi * cycles).astype(np.complex64)
+        return np.ascontiguousarray(channel_samples.T)
@@ -0,0 +1,147 @@
+import importlib
+import json
+import logging
+import os
+import platform
+import time
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Backend name -> (module, class). Modules are only imported when a backend is probed.
+BACKENDS = {
+    "pfb": ("sdrfly.channelizers.channelizer_pfb", "ChannelizerPFB"),
+    "fft": ("sdrfly.channelizers.channelizer_fft", "ChannelizerFFT"),
+    "numba": ("sdrfly.channelizers.channelizer_numba", "ChannelizerNumba"),
+    "cupy": ("sdrfly.channelizers.channelizer_cupy", "ChannelizerCuPy"),
+    "liquiddsp": ("sdrfly.channelizers.channelizer_liquiddsp", "ChannelizerLiquidDSP"),
+}
+
+# Backends that produce the decimated filterbank output and can stand in for each other.
+# LiquidDSP filters at the input rate, so it is only used when asked for by name.
+AUTOTUNE_BACKENDS = ("pfb", "fft", "numba", "cupy")
+
+DEFAULT_BLOCK_SIZE = 131072
+
+
+def _cache_path():
+    """Autotune cache file: SDRFLY_AUTOTUNE_CACHE, else under XDG_CACHE_HOME or ~/.cache, read on every use."""
+    if os.environ.get("SDRFLY_AUTOTUNE_CACHE"):
+        return Path(os.environ["SDRFLY_AUTOTUNE_CACHE"])
+    cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(cache_home) / "sdrfly" / "channelizer_autotune.json"
+
+
+@lru_cache(maxsize=None)
+def load_backend(name):
+    """Return the channelizer class for a backend, or None if it cannot be imported here."""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown channelizer backend: {name}")
+    module_name, class_name = BACKENDS[name]
+    try:
+        module = importlib.import_module(module_name)
+    except (ImportError, OSError) as e:
+        # OSError covers shared libraries such as libliquid.so that fail to load
+        logger.debug(f"Channelizer backend {name} unavailable: {e}")
+        return None
+    return getattr(module, class_name)
+
+
+def available_backends():
+    return [name for name in BACKENDS if load_backend(name) is not None]
+
+
+def get_channelizer(num_channels, channel_bw, sample_rate, backend="auto", block_size=DEFAULT_BLOCK_SIZE, **kwargs):
+    """
+    Construct a channelizer on the requested backend.
+
+    With backend="auto" the fastest backend for this shape and block size on this
+    host is used. It is benchmarked on first use and remembered in the autotune
+    cache file for later runs.
+    """
+    if backend == "auto":
+        backend = _cached_winner(num_channels, channel_bw, sample_rate, block_size)
+        if backend is None:
+            backend = autotune(num_channels, channel_bw, sample_rate, block_size)["backend"]
+    channelizer_class = load_backend(backend)
+    if channelizer_class is None:
+        raise RuntimeError(f"Channelizer backend {backend} is not available on this host")
+    return channelizer_class(num_channels, channel_bw, sample_rate, **kwargs)
+
+
+def autotune(num_channels, channel_bw, sample_rate, block_size=DEFAULT_BLOCK_SIZE, backends=None, repeats=5):
+    """
+    Benchmark the available backends in streaming mode and persist the winner.
+
+    Returns:
+        dict: The winning backend and the measured throughput of each backend in MSPS.
+    """
+    rng = np.random.default_rng(0)
+    block = (rng.standard_normal(block_size) + 1j * rng.standard_normal(block_size)).astype(np.complex64)
+    throughput = {}
+    for name in backends or AUTOTUNE_BACKENDS:
+        channelizer_class = load_backend(name)
+        if channelizer_class is None:
+            continue
+        try:
+            channelizer = channelizer_class(num_channels, channel_bw, sample_rate)
+            # The first call absorbs JIT compilation and device warm-up
+            _synchronize(channelizer.channelize_stream(block))
+            best = float("inf")
+            for _ in range(repeats):
+                start = time.perf_counter()
+                _synchronize(channelizer.channelize_stream(block))
+                best = min(best, time.perf_counter() - start)
+        except Exception as e:
+            logger.warning(f"Channelizer backend {name} failed during autotune: {e}")
+            continue
+        throughput[name] = block_size / best / 1e6
+
+    if not throughput:
+        raise RuntimeError("No channelizer backend is available")
+    result = {"backend": max(throughput, key=throughput.get), "throughput_msps": throughput}
+    logger.info(f"Channelizer autotune for {_cache_key(num_channels, channel_bw, sample_rate, block_size)}: {result}")
+    _store_winner(num_channels, channel_bw, sample_rate, block_size, result)
+    return result
+
+
+def _synchronize(output):
+    # GPU backends return device arrays; copying back waits for the work to finish
+    if hasattr(output, "get"):
+        output.get()
+
+
+def _cache_key(num_channels, channel_bw, sample_rate, block_size):
+    return f"{platform.node()}:{num_channels}:{channel_bw:g}:{sample_rate:g}:{block_size}"
+
+
+def _load_cache():
+    try:
+        with open(_cache_path()) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _cached_winner(num_channels, channel_bw, sample_rate, block_size):
+    entry = _load_cache().get(_cache_key(num_channels, channel_bw, sample_rate, block_size))
+    if entry is None or load_backend(entry["backend"]) is None:
+        return None
+    return entry["backend"]
+
+
+def _store_winner(num_channels, channel_bw, sample_rate, block_size, result):
+    cache = _load_cache()
+    cache[_cache_key(num_channels, channel_bw, sample_rate, block_size)] = result
+    cache_path = _cache_path()
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        partial = cache_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(partial, "w") as f:
+            json.dump(cache, f, indent=2)
+        os.replace(partial, cache_path)
+    except OSError as e:
+        logger.warning(f"Could not write channelizer autotune cache {cache_path}: {e}")
@@ -0,0 +1,138 @@
+import numpy as np
+
+# Bluetooth BR/EDR sync word construction (Core spec Vol 2 Part B 6.3.3.1):
+# 64-bit PN sequence with p0 in the LSB, and the (64, 30) expurgated BCH generator.
+BR_PN = 0x83848D96BBCC54FC
+BR_GENERATOR = 0x585713DA9
+
+BLE_ADVERTISING_ACCESS_ADDRESS = 0x8E89BED6
+
+MATCH_DTYPE = np.dtype([
+    ("channel", np.uint16),
+    ("bit_offset", np.int64),
+    ("word", np.uint16),
+    ("lap", np.uint32),
+    ("errors", np.uint8),
+])
+
+def br_sync_word(lap):
+    """64-bit BR/EDR sync word for a LAP, bit i being the i-th bit on air."""
+    lap &= 0xFFFFFF
+    # Barker sequence appended after a23 keeps the word DC free
+    info = lap | ((0x13 if lap & 0x800000 else 0x2C) << 24)
+    info ^= BR_PN >> 34
+    remainder = info << 34
+    for i in range(63, 33, -1):
+        if remainder >> i & 1:
+            remainder ^= BR_GENERATOR << (i - 34)
+    return ((info << 34) | remainder) ^ BR_PN
+
+def ble_sync_word(access_address):
+    """40-bit BLE 1M preamble plus access address, bit i being the i-th bit on air."""
+    # The preamble alternates into the first access address bit
+    preamble = 0x55 if access_address & 1 else 0xAA
+    return preamble | (access_address & 0xFFFFFFFF) << 8
+
+if hasattr(np, "bitwise_count"):
+    def _popcount(words):
+        return np.bitwise_count(words)
+else:
+    _BYTE_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+    def _popcount(words):
+        return _BYTE_POPCOUNT[words.view(np.uint8)].reshape(words.shape + (8,)).sum(axis=-1, dtype=np.uint8)
+
+class SyncWordCorrelator:
+    """
+    Find sync words in packed bit streams within a Hamming distance threshold.
+
+    Input blocks are (num_channels, num_bytes) uint8 as produced by GFSKSlicer, with
+    the first bit on air in the LSB of each byte. Every bit offset in every channel is
+    tested at once: eight consecutive bytes are read as one little-endian uint64, the
+    eight sub-byte shifts are formed with word-level shifts, and each candidate is
+    XORed against the sync words and popcounted. The last bytes of each block are
+    kept so words straddling blocks are found, and offsets count bits since the
+    first block.
+
+    Parameters:
+        sync_words (list): Sync words of length bits each, first bit on air in the LSB.
+        length (int): Sync word length in bits, at most 64.
+        max_errors (int): Largest Hamming distance reported as a match.
+        labels (list): Value reported in the lap field for each word.
+    """
+
+    TAIL_BYTES = 8
+
+    def __init__(self, sync_words, length=64, max_errors=0, labels=None):
+        if not 0 < length <= 64:
+            raise ValueError("Sync words must be 1 to 64 bits long")
+        self.length = length
+        self.mask = np.uint64((1 << length) - 1)
+        # Built from Python ints: numpy would turn a list mixing words above 2**63 into float64
+        sync_words = [sync_words] if np.ndim(sync_words) == 0 else sync_words
+        self.sync_words = np.array([int(word) & int(self.mask) for word in sync_words], dtype=np.uint64)
+        self.labels = np.zeros(len(self.sync_words), dtype=np.uint32) if labels is None else np.asarray(labels, dtype=np.uint32)
+        self.max_errors = max_errors
+        self.reset()
+
+    @classmethod
+    def for_laps(cls, laps, max_errors=3):
+        laps = np.atleast_1d(laps)
+        return cls([br_sync_word(int(lap)) for lap in laps], 64, max_errors, laps)
+
+    @classmethod
+    def for_access_addresses(cls, access_addresses=(BLE_ADVERTISING_ACCESS_ADDRESS,), max_errors=1):
+        access_addresses = np.atleast_1d(access_addresses)
+        return cls([ble_sync_word(int(aa)) for aa in access_addresses], 40, max_errors, access_addresses)
+
+    def reset(self):
+        self.tail = None
+        # Bits consumed per channel before the current block
+        self.bit_position = 0
+
+    def correlate(self, packed_bits):
+        packed_bits = np.asarray(packed_bits, dtype=np.uint8)
+        packed_bits = packed_bits.reshape(-1, packed_bits.shape[-1])
+        num_channels = len(packed_bits)
+        if self.tail is None or len(self.tail) != num_channels:
+            self.tail = np.zeros((num_channels, 0), dtype=np.uint8)
+        buffer = np.ascontiguousarray(np.concatenate((self.tail, packed_bits), axis=1))
+        base = self.bit_position - self.tail.shape[1] * 8
+        self.bit_position += packed_bits.shape[1] * 8
+        self.tail = buffer[:, max(0, buffer.shape[1] - self.TAIL_BYTES):].copy()
+
+        # Offsets are tested while a full uint64 plus one byte can be loaded from them,
+        # so the last eight bytes are only tested once the next block arrives
+        num_bytes = buffer.shape[1]
+        if num_bytes < 9:
+            return np.zeros(0, dtype=MATCH_DTYPE)
+        # Unaligned little-endian uint64 view starting at every byte, plus the byte after
+        # each word to supply the bits shifted in from above
+        words = np.ndarray((num_channels, num_bytes - 8), dtype="<u8", buffer=buffer, strides=(num_bytes, 1))
+        next_bytes = buffer[:, 8:].astype(np.uint64)
+
+        matches = []
+        for shift in range(8):
+            if shift:
+                window = (words >> np.uint64(shift)) | (next_bytes << np.uint64(64 - shift))
+            else:
+                window = words.copy()
+            window &= self.mask
+            for index, sync_word in enumerate(self.sync_words):
+                errors = _popcount(window ^ sync_word)
+                channel, byte = np.nonzero(errors <= self.max_errors)
+                if len(channel) == 0:
+                    continue
+                found = np.empty(len(channel), dtype=MATCH_DTYPE)
+                found["channel"] = channel
+                found["bit_offset"] = byte * 8 + shift
+                found["word"] = index
+                found["lap"] = self.labels[index]
+                found["errors"] = errors[channel, byte]
+                matches.append(found)
+
+        if not matches:
+            return np.zeros(0, dtype=MATCH_DTYPE)
+        matches = np.concatenate(matches)
+        matches["bit_offset"] += base
+        return matches[np.lexsort((matches["bit_offset"], matches["channel"]))]
@@ -1,6 +1,22 @@
+import time
 from abc import ABC, abstractmethod
+import numpy as np
+from sdrfly import metrics
+
+DEMODULATOR_METRICS = metrics.stage_metrics("sdrfly_demodulator", "demodulator")
 
 class DemodulatorBase(ABC):
+    def demodulate(self, samples, *args, **kwargs):
+        """Demodulate samples with the subclass's _demodulate(), recording the block in the metrics."""
+        try:
+            stage = self._metrics
+        except AttributeError:
+            stage = self._metrics = DEMODULATOR_METRICS.labels(type(self).__name__)
+        started = time.perf_counter()
+        output = self._demodulate(samples, *args, **kwargs)
+        stage.record(np.size(samples), time.perf_counter() - started)
+        return output
+
     @abstractmethod
-    def demodulate(self, samples):
+    def _demodulate(self, samples):
         pass
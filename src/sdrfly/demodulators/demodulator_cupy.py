@@ -5,7 +5,7 @@ class GFSKDemod(DemodulatorBase):
     def __init__(self, kf=0.5):
         self.kf = kf
 
-    def demodulate(self, samples):
+    def _demodulate(self, samples):
         num_samples = len(samples)
         demodulated = cp.zeros(num_samples, dtype=cp.float32)
         previous_sample = cp.array(0.0, dtype=cp.complex64)
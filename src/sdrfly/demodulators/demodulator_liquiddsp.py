@@ -22,7 +22,7 @@ class GFSKDemodLiquidDSP(DemodulatorBase):
     def __del__(self):
         libliquid.freqdem_destroy(self.demod)
 
-    def demodulate(self, samples):
+    def _demodulate(self, samples):
         num_samples = len(samples)
         demodulated = np.zeros(num_samples, dtype=np.float32)
         for i in range(num_samples):
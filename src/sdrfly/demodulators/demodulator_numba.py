@@ -19,5 +19,5 @@ class GFSKDemodNumba(DemodulatorBase):
 
         return demodulated
 
-    def demodulate(self, samples):
+    def _demodulate(self, samples):
         return self.gfsk_demodulate(samples, self.kf)
@@ -0,0 +1,50 @@
+import numpy as np
+from sdrfly.demodulators.demodulator_base import DemodulatorBase
+
+class GFSKDemodNumPy(DemodulatorBase):
+    """
+    Vectorized, stateful GFSK frequency discriminator.
+
+    Computes angle(x[n] * conj(x[n - 1])) / kf for a whole block in one pass.
+    The block may be a single channel of shape (n,) or the (num_channels, n)
+    output of a channelizer. The last sample of every channel is kept, so
+    consecutive blocks demodulate as one continuous stream.
+    """
+
+    def __init__(self, kf=0.5):
+        self.kf = kf
+        self.last_samples = None
+        self._products = np.empty(0, dtype=np.complex64)
+
+    def reset(self):
+        self.last_samples = None
+
+    def _demodulate(self, samples, out=None):
+        samples = np.asarray(samples, dtype=np.complex64)
+        channels = samples.reshape(-1, samples.shape[-1])
+        num_channels, num_samples = channels.shape
+        if out is None:
+            out = np.empty(samples.shape, dtype=np.float32)
+        elif out.shape != samples.shape:
+            raise ValueError(f"out has shape {out.shape}, expected {samples.shape}")
+        if num_samples == 0:
+            return out
+        if self.last_samples is None or len(self.last_samples) != num_channels:
+            self.last_samples = np.zeros(num_channels, dtype=np.complex64)
+
+        if self._products.size < channels.size:
+            self._products = np.empty(channels.size, dtype=np.complex64)
+        products = self._products[:channels.size].reshape(channels.shape)
+        np.conjugate(channels[:, :-1], out=products[:, 1:])
+        products[:, 1:] *= channels[:, 1:]
+        np.conjugate(self.last_samples, out=products[:, 0])
+        products[:, 0] *= channels[:, 0]
+        self.last_samples = channels[:, -1].copy()
+
+        # reshape() copies an out that is not contiguous, which is then written back
+        angles = out.reshape(channels.shape)
+        np.arctan2(products.imag, products.real, out=angles)
+        angles /= np.float32(self.kf)
+        if not np.shares_memory(angles, out):
+            out[...] = angles.reshape(out.shape)
+        return out
@@ -6,7 +6,7 @@ class GFSKDemodCuPy(DemodulatorBase):
     def __init__(self, kf):
         self.kf = kf
 
-    def demodulate(self, samples: np.ndarray) -> np.ndarray:
+    def _demodulate(self, samples: np.ndarray) -> np.ndarray:
         samples_gpu = cp.asarray(samples)
         demodulated = cp.zeros(samples_gpu.size, dtype=cp.float32)
         
@@ -0,0 +1,98 @@
+import hashlib
+import os
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+# Optional on-disk cache for designed filters, shared between processes and runs
+_cache_dir = os.environ.get("SDRFLY_FILTER_CACHE")
+
+
+def set_cache_dir(path):
+    """
+    Persist designed filters under path, or disable the disk cache with None.
+    Defaults to the SDRFLY_FILTER_CACHE environment variable.
+    """
+    global _cache_dir
+    _cache_dir = None if path is None else str(path)
+
+
+def prototype_filter(num_branches, taps_per_branch=None, passband=0.4, stopband=0.6, attenuation=70.0, oversampling=1):
+    """
+    Low-pass prototype for a filterbank of num_branches channels.
+
+    Parameters:
+        num_branches (int): Number of filterbank branches (channels on the grid).
+        taps_per_branch (int): Fixed length per branch, or None to derive the
+            shortest length that meets the spec.
+        passband (float): Passband edge in units of the channel spacing.
+        stopband (float): Stopband edge in units of the channel spacing.
+        attenuation (float): Stopband attenuation in dB.
+        oversampling (int): Output rate in units of the channel spacing; the
+            stopband may extend up to oversampling - passband before aliasing
+            into the passband.
+
+    Returns:
+        np.ndarray: Read-only float32 taps of length num_branches * taps_per_branch,
+        normalised to unity gain at DC. The same array is returned for equal specs.
+    """
+    return _design(int(num_branches), None if taps_per_branch is None else int(taps_per_branch),
+                   float(passband), float(stopband), float(attenuation), int(oversampling))
+
+
+def polyphase_filter(num_branches, taps_per_branch=None, passband=0.4, stopband=0.6, attenuation=70.0, oversampling=1):
+    """
+    Polyphase decomposition of prototype_filter() with the same parameters.
+
+    Returns:
+        np.ndarray: Read-only (num_branches, taps_per_branch) float32 view where
+        row r holds taps r, r + num_branches, r + 2 * num_branches, ...
+    """
+    taps = prototype_filter(num_branches, taps_per_branch, passband, stopband, attenuation, oversampling)
+    return taps.reshape(-1, num_branches).T
+
+
+@lru_cache(maxsize=64)
+def _design(num_branches, taps_per_branch, passband, stopband, attenuation, oversampling):
+    if not 0 < passband < stopband:
+        raise ValueError("Need 0 < passband < stopband")
+    if stopband > oversampling - passband:
+        raise ValueError("Stopband edge would alias into the passband at this oversampling")
+
+    spec = (num_branches, taps_per_branch, passband, stopband, attenuation, oversampling)
+    cache_file = _cache_file(spec)
+    if cache_file is not None and cache_file.exists():
+        taps = np.load(cache_file)
+    else:
+        taps = _kaiser_design(*spec)
+        if cache_file is not None:
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            partial = cache_file.with_suffix(f".{os.getpid()}.tmp")
+            with open(partial, "wb") as f:
+                np.save(f, taps)
+            os.replace(partial, cache_file)
+
+    taps.setflags(write=False)
+    return taps
+
+
+def _kaiser_design(num_branches, taps_per_branch, passband, stopband, attenuation, oversampling):
+    from scipy.signal import firwin, kaiser_beta, kaiserord
+
+    # Edges in units of the Nyquist rate of the filterbank input
+    cutoff = (passband + stopband) / num_branches
+    width = 2 * (stopband - passband) / num_branches
+    if taps_per_branch is None:
+        num_taps, _ = kaiserord(attenuation, width)
+        taps_per_branch = -(-num_taps // num_branches)
+    beta = kaiser_beta(attenuation)
+    taps = firwin(num_branches * taps_per_branch, cutoff, window=("kaiser", beta))
+    return taps.astype(np.float32)
+
+
+def _cache_file(spec):
+    if _cache_dir is None:
+        return None
+    key = hashlib.sha1(repr(spec).encode()).hexdigest()[:16]
+    return Path(_cache_dir).expanduser() / f"prototype_{key}.npy"
@@ -0,0 +1,55 @@
+import numpy as np
+
+# Interleaved integer IQ as delivered by SoapySDR's CS16 and CS8 stream formats. One
+# element is one complex sample, so buffers index and slice like complex64 ones.
+CS16 = np.dtype([("re", "<i2"), ("im", "<i2")])
+CS8 = np.dtype([("re", "i1"), ("im", "i1")])
+
+STREAM_FORMATS = {
+    "CF32": np.dtype(np.complex64),
+    "CS16": CS16,
+    "CS8": CS8,
+}
+
+# Integer value that maps to 1.0
+FULL_SCALE = {
+    "CF32": 1,
+    "CS16": 32768,
+    "CS8": 128,
+}
+
+def stream_format(dtype):
+    """SoapySDR format name of a sample dtype."""
+    dtype = np.dtype(dtype)
+    for name, format_dtype in STREAM_FORMATS.items():
+        if dtype == format_dtype:
+            return name
+    raise ValueError(f"{dtype} is not a supported stream format")
+
+def sample_scale(dtype):
+    """Factor taking samples of dtype to complex64 full scale 1.0."""
+    if np.dtype(dtype).fields is None:
+        return 1.0
+    return 1.0 / FULL_SCALE[stream_format(dtype)]
+
+def to_complex64(samples, out=None, scale=True):
+    """
+    Convert complex64, CS16 or CS8 samples to complex64 in one pass.
+
+    With scale=False integer samples keep their integer magnitude, so the caller can
+    fold sample_scale() into a later linear stage instead of spending a pass on it.
+    Complex64 input is returned as is when out is None.
+    """
+    samples = np.asarray(samples)
+    if samples.dtype.fields is None:
+        if out is None:
+            return np.asarray(samples, dtype=np.complex64)
+        out[...] = samples
+        return out
+    if out is None:
+        out = np.empty(samples.shape, dtype=np.complex64)
+    out.real = samples["re"]
+    out.imag = samples["im"]
+    if scale:
+        out *= np.float32(sample_scale(samples.dtype))
+    return out
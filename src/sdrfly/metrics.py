@@ -0,0 +1,302 @@
+import bisect
+import math
+import os
+import threading
+import time
+
+# Default histogram buckets in seconds, from 10 us to 10 s
+DURATION_BUCKETS = (1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3, 1e-2, 2.5e-2, 5e-2, 0.1, 0.25,
+                    0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+def _format_value(value):
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+class _GaugeChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value):
+        self.value = value
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def dec(self, amount=1):
+        self.value -= amount
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        # One slot per bucket plus +Inf, allocated once; bucket counts are not cumulative
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+class _Metric:
+    """A metric family: one child per combination of label values."""
+
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self._child(())
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _child(self, key):
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def labels(self, *values, **labels):
+        """
+        Child for the given label values. Look it up once and keep it: updating the
+        child is the hot path, finding it is not.
+        """
+        if labels:
+            values = tuple(labels[name] for name in self.labelnames)
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}")
+        return self._child(tuple(str(value) for value in values))
+
+    def _samples(self):
+        raise NotImplementedError
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self._default.value += amount
+
+    def _samples(self):
+        for key, child in list(self._children.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value)}"
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value):
+        self._default.value = value
+
+    def inc(self, amount=1):
+        self._default.value += amount
+
+    def dec(self, amount=1):
+        self._default.value -= amount
+
+    def _samples(self):
+        for key, child in list(self._children.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value)}"
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DURATION_BUCKETS):
+        self.bounds = tuple(sorted(float(bound) for bound in buckets if not math.isinf(bound)))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.bounds)
+
+    def observe(self, value):
+        self._default.observe(value)
+
+    def _samples(self):
+        for key, child in list(self._children.items()):
+            cumulative = 0
+            for bound, count in zip(self.bounds + (math.inf,), list(child.counts)):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, [("le", _format_value(bound))])
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(child.sum)}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+class MetricsRegistry:
+    """
+    Counters, gauges and fixed-bucket histograms, exported in the Prometheus text format.
+
+    Updates are a plain attribute or preallocated list slot increment on a
+    child looked up once, a couple of hundred nanoseconds including the call,
+    with no locks: each child is meant to be updated by one thread, such as a
+    device's capture thread. Export either by
+    serving render() at /metrics, with serve() or a route in the application's
+    own web server, or by writing a file for node_exporter's textfile collector
+    with write_textfile().
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+        self._server = None
+
+    def _get_or_create(self, metric_class, name, documentation, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = metric_class(name, documentation, labelnames, **kwargs)
+            elif type(metric) is not metric_class or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Metric {name} is already registered as a different {metric.kind}")
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DURATION_BUCKETS):
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def get(self, name):
+        return self._metrics.get(name)
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "".join(metric.render() + "\n" for metric in metrics)
+
+    def write_textfile(self, path):
+        """Atomically write render() to path, e.g. for node_exporter's textfile collector."""
+        partial = f"{path}.{os.getpid()}.tmp"
+        with open(partial, "w") as f:
+            f.write(self.render())
+        os.replace(partial, path)
+
+    def write_textfile_every(self, path, interval=10.0):
+        """Rewrite the text file every interval seconds from a daemon thread."""
+        def loop():
+            while True:
+                self.write_textfile(path)
+                time.sleep(interval)
+        thread = threading.Thread(target=loop, daemon=True)
+        thread.start()
+        return thread
+
+    def serve(self, port=9464, host=""):
+        """Serve /metrics over HTTP from a daemon thread, returning the server."""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self._server
+
+class _StageChild:
+    __slots__ = ("blocks", "samples", "rate", "seconds", "lock")
+
+    def __init__(self, blocks, samples, rate, seconds, lock):
+        self.blocks = blocks
+        self.samples = samples
+        self.rate = rate
+        self.seconds = seconds
+        self.lock = lock
+
+    def record(self, num_samples, seconds):
+        with self.lock:
+            self.blocks.value += 1
+            self.samples.value += num_samples
+            self.seconds.observe(seconds)
+            if seconds > 0:
+                self.rate.value = num_samples / seconds
+
+class StageMetrics:
+    """
+    Blocks, samples, throughput of the last block and time per block of a processing
+    stage such as the channelizers, labelled by implementation.
+
+    Every instance of an implementation reports to the same children, possibly
+    from different threads, so unlike plain children the stage children of one
+    label share a lock. It is taken once per block.
+    """
+
+    def __init__(self, registry, prefix, stage):
+        self.blocks = registry.counter(f"{prefix}_blocks_total", f"Blocks processed by the {stage}.", ["backend"])
+        self.samples = registry.counter(f"{prefix}_samples_total", f"Input samples processed by the {stage}.",
+                                        ["backend"])
+        self.rate = registry.gauge(f"{prefix}_samples_per_second",
+                                   f"Input samples per second of the {stage} on its last block.", ["backend"])
+        self.seconds = registry.histogram(f"{prefix}_block_seconds", f"Time the {stage} spent per block.",
+                                          ["backend"])
+        self._locks = {}
+
+    def labels(self, backend):
+        lock = self._locks.setdefault(str(backend), threading.Lock())
+        return _StageChild(self.blocks.labels(backend), self.samples.labels(backend), self.rate.labels(backend),
+                           self.seconds.labels(backend), lock)
+
+# Process-wide registry that sdrfly's drivers, channelizers and demodulators report to
+REGISTRY = MetricsRegistry()
+
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
+
+def stage_metrics(prefix, stage):
+    return StageMetrics(REGISTRY, prefix, stage)
@@ -1,43 +1,49 @@
 import numpy as np
-import matplotlib.pyplot as plt
-from scipy.fftpack import fft, ifft
-from scipy.signal import spectrogram
 
-def plot_fft(samples, sample_rate, title):
-    fft_samples = fft(samples)
-    freqs = np.fft.fftfreq(len(fft_samples), 1 / sample_rate)
+def _spectrum(samples, sample_rate, fft_size):
+    """Welch spectrum in dBFS of samples and its frequencies."""
+    from sdrfly.spectrum import SpectrumEngine
+    engine = SpectrumEngine(sample_rate, min(fft_size, len(samples)), name="plot")
+    return engine.freqs, engine.compute(samples)
+
+def plot_fft(samples, sample_rate, title, fft_size=4096):
+    import matplotlib.pyplot as plt
+    freqs, power_db = _spectrum(samples, sample_rate, fft_size)
     plt.figure(figsize=(10, 6))
-    plt.plot(np.fft.fftshift(freqs), np.fft.fftshift(20 * np.log10(np.abs(fft_samples))))
+    plt.plot(freqs, power_db)
     plt.title(title)
     plt.xlabel('Frequency (Hz)')
-    plt.ylabel('Magnitude (dB)')
+    plt.ylabel('Power (dBFS)')
     plt.grid(True)
     plt.show()
 
-def plot_fft_with_peak(samples, sample_rate, title, peak_freqs=None):
-    fft_samples = fft(samples)
-    freqs = np.fft.fftfreq(len(fft_samples), 1 / sample_rate)
-    magnitude = 20 * np.log10(np.abs(fft_samples))
-    
+def plot_fft_with_peak(samples, sample_rate, title, peak_freqs=None, fft_size=4096):
+    import matplotlib.pyplot as plt
+    freqs, power_db = _spectrum(samples, sample_rate, fft_size)
+
     plt.figure(figsize=(10, 6))
-    plt.plot(np.fft.fftshift(freqs), np.fft.fftshift(magnitude))
+    plt.plot(freqs, power_db)
     plt.title(title)
     plt.xlabel('Frequency (Hz)')
-    plt.ylabel('Magnitude (dB)')
+    plt.ylabel('Power (dBFS)')
     plt.grid(True)
-    
+
     if peak_freqs is not None:
+        bin_width = sample_rate / len(freqs)
         for peak_freq in peak_freqs:
-            peak_index = np.where(np.isclose(freqs, peak_freq, atol=sample_rate / len(fft_samples)))
+            peak_index = np.where(np.isclose(freqs, peak_freq, atol=bin_width))
             if len(peak_index[0]) > 0:
-                plt.plot(freqs[peak_index], magnitude[peak_index], 'ro', markersize=10, markerfacecolor='none', markeredgewidth=2)
-                plt.annotate('Peak', xy=(freqs[peak_index][0], magnitude[peak_index][0]),
-                             xytext=(freqs[peak_index][0], magnitude[peak_index][0] + 10),
+                plt.plot(freqs[peak_index], power_db[peak_index], 'ro', markersize=10, markerfacecolor='none', markeredgewidth=2)
+                plt.annotate('Peak', xy=(freqs[peak_index][0], power_db[peak_index][0]),
+                             xytext=(freqs[peak_index][0], power_db[peak_index][0] + 10),
                              arrowprops=dict(facecolor='black', shrink=0.05))
 
     plt.show()
 
 def plot_fft_and_relevant_plots(channel_samples, channel_idx, access_code, lap, sample_rate, channel_bw, min_power_level, max_power_level):
+    import matplotlib.pyplot as plt
+    from scipy.fftpack import fft, ifft
+    from scipy.signal import spectrogram
     from sdrfly.demodulators.demodulator_numba import GFSKDemodNumba
 
     # Initialize the GFSK demodulator
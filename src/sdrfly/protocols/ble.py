@@ -0,0 +1,228 @@
+from functools import lru_cache
+import numpy as np
+from sdrfly.correlator import BLE_ADVERTISING_ACCESS_ADDRESS, MATCH_DTYPE, SyncWordCorrelator
+
+# Advertising channel index to centre frequency in Hz
+ADVERTISING_CHANNELS = {37: 2402e6, 38: 2426e6, 39: 2480e6}
+
+# PDU types on the primary advertising channels (Core spec Vol 6 Part B 2.3)
+ADV_IND = 0x0
+ADV_DIRECT_IND = 0x1
+ADV_NONCONN_IND = 0x2
+SCAN_REQ = 0x3
+SCAN_RSP = 0x4
+CONNECT_IND = 0x5
+ADV_SCAN_IND = 0x6
+ADV_EXT_IND = 0x7
+
+# Preamble and access address
+SYNC_BITS = 40
+HEADER_BYTES = 2
+CRC_BYTES = 3
+MAX_PDU_BYTES = HEADER_BYTES + 255
+
+CRC_INIT = 0x555555
+# x^24 + x^10 + x^9 + x^6 + x^4 + x^3 + x + 1, bit reversed for LSB-first data
+CRC_POLY_REFLECTED = 0xDA6000
+
+PACKET_DTYPE = np.dtype([
+    ("timestamp", np.float64),
+    ("channel", np.uint8),
+    ("adv_address", np.uint64),
+    ("tx_add", np.uint8),
+    ("pdu_type", np.uint8),
+    ("length", np.uint8),
+    ("rssi", np.float32),
+    ("crc_ok", np.bool_),
+    ("pdu", np.uint8, MAX_PDU_BYTES),
+])
+
+def _reverse24(value):
+    return int(f"{value:024b}"[::-1], 2)
+
+def _crc_table():
+    table = np.zeros(256, dtype=np.uint32)
+    for byte in range(256):
+        state = byte
+        for _ in range(8):
+            state = (state >> 1) ^ (CRC_POLY_REFLECTED if state & 1 else 0)
+        table[byte] = state
+    return table
+
+CRC_TABLE = _crc_table()
+
+@lru_cache(maxsize=None)
+def whitening_keystream(channel, num_bytes=MAX_PDU_BYTES + CRC_BYTES):
+    """
+    Whitening keystream for a channel index, packed LSB first like the PDU bytes.
+
+    x^7 + x^4 + 1 LFSR with position 0 preset to one and positions 1 to 6 to the
+    channel index, MSB in position 1 (Core spec Vol 6 Part B 3.2).
+    """
+    lfsr = [1] + [(channel >> (5 - i)) & 1 for i in range(6)]
+    bits = np.empty(num_bytes * 8, dtype=np.uint8)
+    for i in range(len(bits)):
+        out = lfsr[6]
+        bits[i] = out
+        lfsr = [out, lfsr[0], lfsr[1], lfsr[2], lfsr[3] ^ out, lfsr[4], lfsr[5]]
+    keystream = np.packbits(bits, bitorder="little")
+    keystream.flags.writeable = False
+    return keystream
+
+@lru_cache(maxsize=None)
+def _whitening_table():
+    table = np.stack([whitening_keystream(channel) for channel in range(40)])
+    table.flags.writeable = False
+    return table
+
+def crc24(pdus, lengths, init=CRC_INIT):
+    """
+    CRC-24 of a batch of PDUs, (n, m) uint8 with the first lengths[i] bytes of row i used.
+
+    Byte-wise with a 256 entry table, vectorized across rows, so the loop runs once per
+    byte position. The result is the 24-bit value as sent on air, LSB first.
+    """
+    pdus = np.asarray(pdus, dtype=np.uint8).reshape(-1, np.shape(pdus)[-1])
+    lengths = np.broadcast_to(np.asarray(lengths), len(pdus))
+    state = np.full(len(pdus), _reverse24(init), dtype=np.uint32)
+    for position in range(int(lengths.max(initial=0))):
+        updated = (state >> 8) ^ CRC_TABLE[(state ^ pdus[:, position]) & 0xFF]
+        state = np.where(position < lengths, updated, state)
+    return state
+
+def read_bits(packed_bits, rows, bit_offsets, num_bytes):
+    """
+    Read num_bytes starting at arbitrary bit offsets from packed LSB-first bit rows.
+
+    Returns (len(rows), num_bytes) uint8. Bytes past the end of a row read as zero bits.
+    """
+    bit_offsets = np.asarray(bit_offsets, dtype=np.int64)
+    shift = (bit_offsets & 7).astype(np.uint16)[:, None]
+    index = (bit_offsets >> 3)[:, None] + np.arange(num_bytes + 1)
+    padded = np.pad(packed_bits, ((0, 0), (0, 1)))
+    raw = padded[np.asarray(rows)[:, None], np.minimum(index, padded.shape[1] - 1)].astype(np.uint16)
+    return ((raw[:, :-1] >> shift) | (raw[:, 1:] << (8 - shift))).astype(np.uint8)
+
+def decode_pdus(packed_bits, rows, bit_offsets, channels):
+    """
+    Dewhiten and CRC check advertising PDUs located by access address.
+
+    Parameters:
+        packed_bits (ndarray): (num_rows, num_bytes) packed bits, first bit in the LSB.
+        rows (ndarray): Row of packed_bits holding each candidate.
+        bit_offsets (ndarray): Bit offset of each candidate's preamble within its row.
+        channels (ndarray): BLE channel index of each candidate, selecting the whitening.
+
+    Returns:
+        tuple: (pdus, lengths, crc_ok) with pdus (n, MAX_PDU_BYTES) dewhitened header
+        and payload, zero past each PDU.
+    """
+    channels = np.asarray(channels)
+    raw = read_bits(packed_bits, rows, np.asarray(bit_offsets) + SYNC_BITS, MAX_PDU_BYTES + CRC_BYTES)
+    raw ^= _whitening_table()[channels]
+
+    lengths = raw[:, 1].astype(np.intp) + HEADER_BYTES
+    received_crc = np.take_along_axis(raw, lengths[:, None] + np.arange(CRC_BYTES), axis=1).astype(np.uint32)
+    received_crc = received_crc[:, 0] | received_crc[:, 1] << 8 | received_crc[:, 2] << 16
+    crc_ok = crc24(raw, lengths) == received_crc
+
+    pdus = raw[:, :MAX_PDU_BYTES]
+    pdus[np.arange(MAX_PDU_BYTES) >= lengths[:, None]] = 0
+    return pdus, lengths - HEADER_BYTES, crc_ok
+
+def advertiser_addresses(pdus):
+    """AdvA of each PDU as an integer, zero for PDU types that do not carry one in place."""
+    pdu_type = pdus[:, 0] & 0x0F
+    # SCAN_REQ and CONNECT_IND lead with the scanner or initiator address
+    start = np.where((pdu_type == SCAN_REQ) | (pdu_type == CONNECT_IND), 8, 2)
+    address_bytes = np.take_along_axis(pdus, start[:, None] + np.arange(6), axis=1)
+    addresses = np.pad(address_bytes, ((0, 0), (0, 2))).view("<u8")[:, 0].copy()
+    addresses[pdu_type == ADV_EXT_IND] = 0
+    return addresses
+
+class BLEAdvertisingDecoder:
+    """
+    Finds and decodes BLE advertising packets in streams of packed bits.
+
+    Each call takes a (num_rows, num_bytes) block from GFSKSlicer, one row per
+    advertising channel, locates the access address with SyncWordCorrelator and
+    decodes every candidate in one batch: bit-offset gathers, a table lookup
+    for dewhitening and a byte-wise CRC-24 vectorized across candidates. The
+    last bytes of each row are kept, so packets that straddle blocks are decoded
+    on the call that completes them.
+
+    Parameters:
+        channels (list): BLE channel index carried by each row.
+        bit_rate (float): Bits per second, for timestamps.
+        start_time (float): Time of the first bit of the first block.
+        max_errors (int): Bit errors tolerated in the preamble and access address.
+        crc_only (bool): Drop packets that fail the CRC.
+    """
+
+    # Enough bytes to hold the longest packet plus a partial byte
+    HISTORY_BYTES = (SYNC_BITS // 8) + MAX_PDU_BYTES + CRC_BYTES + 1
+
+    def __init__(self, channels=(37, 38, 39), bit_rate=1e6, start_time=0.0, max_errors=1, crc_only=False,
+                 access_address=BLE_ADVERTISING_ACCESS_ADDRESS):
+        self.channels = np.asarray(channels, dtype=np.uint8)
+        self.bit_rate = bit_rate
+        self.start_time = start_time
+        self.crc_only = crc_only
+        self.correlator = SyncWordCorrelator.for_access_addresses((access_address,), max_errors)
+        self.reset()
+
+    def reset(self):
+        self.correlator.reset()
+        self.history = np.zeros((len(self.channels), 0), dtype=np.uint8)
+        self.bit_position = 0
+        self.pending = np.zeros(0, dtype=MATCH_DTYPE)
+
+    def decode(self, packed_bits, rssi=None):
+        """
+        Decode the packets completed by a block.
+
+        Parameters:
+            packed_bits (ndarray): (num_rows, num_bytes) packed bits.
+            rssi (ndarray): Optional per-row signal level for this block, reported with each packet.
+
+        Returns:
+            ndarray: PACKET_DTYPE structured array in time order.
+        """
+        packed_bits = np.asarray(packed_bits, dtype=np.uint8).reshape(len(self.channels), -1)
+        candidates = np.concatenate((self.pending, self.correlator.correlate(packed_bits)))
+
+        buffer = np.concatenate((self.history, packed_bits), axis=1)
+        self.bit_position += packed_bits.shape[1] * 8
+        buffer_start = self.bit_position - buffer.shape[1] * 8
+        self.history = buffer[:, max(0, buffer.shape[1] - self.HISTORY_BYTES):].copy()
+
+        # A candidate is ready once its header and then its whole PDU and CRC have arrived
+        rows = candidates["channel"].astype(np.intp)
+        offsets = candidates["bit_offset"] - buffer_start
+        available = buffer.shape[1] * 8 - offsets
+        ready = available >= SYNC_BITS + HEADER_BYTES * 8
+        if ready.any():
+            header = read_bits(buffer, rows[ready], offsets[ready] + SYNC_BITS, HEADER_BYTES)
+            header ^= _whitening_table()[self.channels[rows[ready]], :HEADER_BYTES]
+            needed = SYNC_BITS + (HEADER_BYTES + header[:, 1].astype(np.int64) + CRC_BYTES) * 8
+            ready[ready] = available[ready] >= needed
+        self.pending = candidates[~ready]
+        candidates = candidates[ready]
+
+        pdus, lengths, crc_ok = decode_pdus(buffer, rows[ready], offsets[ready], self.channels[rows[ready]])
+        packets = np.zeros(len(candidates), dtype=PACKET_DTYPE)
+        packets["timestamp"] = self.start_time + candidates["bit_offset"] / self.bit_rate
+        packets["channel"] = self.channels[candidates["channel"]]
+        packets["adv_address"] = advertiser_addresses(pdus)
+        packets["tx_add"] = pdus[:, 0] >> 6 & 1
+        packets["pdu_type"] = pdus[:, 0] & 0x0F
+        packets["length"] = lengths
+        if rssi is None:
+            packets["rssi"] = np.nan
+        else:
+            packets["rssi"] = np.broadcast_to(np.asarray(rssi, dtype=np.float32), len(self.channels))[rows[ready]]
+        packets["crc_ok"] = crc_ok
+        packets["pdu"] = pdus
+        if self.crc_only:
+            packets = packets[crc_ok]
+        return packets[np.argsort(packets["timestamp"], kind="stable")]
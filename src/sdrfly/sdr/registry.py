@@ -0,0 +1,88 @@
+import importlib
+import logging
+import threading
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+# Driver name -> (module, class). Modules, and SoapySDR with them, are only imported
+# when a driver is requested.
+DRIVERS = {
+    "hackrf": ("sdrfly.sdr.sdr_hackrf", "HackRFSdr"),
+    "sidekiq": ("sdrfly.sdr.sdr_sidekiq", "SidekiqSdr"),
+    "airspy": ("sdrfly.sdr.sdr_airspy", "AirspySDR"),
+    "rtlsdr": ("sdrfly.sdr.sdr_rtlsdr", "RTLSDR"),
+    "file": ("sdrfly.sdr.sdr_file", "FileSDR"),
+    "scenario": ("sdrfly.sdr.sdr_scenario", "ScenarioSDR"),
+    "simulated": ("sdrfly.sdr.sdr_simulated", "SimulatedBluetoothSDR"),
+}
+
+# Other packages add drivers under this entry point group, e.g. in pyproject.toml:
+#   [project.entry-points."sdrfly.sdr_drivers"]
+#   usrp = "mypackage.usrp:UsrpSDR"
+ENTRY_POINT_GROUP = "sdrfly.sdr_drivers"
+
+_enumerate_cache = {}
+_enumerate_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def _entry_points():
+    """Driver entry points by name; reading them does not import the drivers."""
+    from importlib import metadata
+    entry_points = metadata.entry_points()
+    if hasattr(entry_points, "select"):
+        found = entry_points.select(group=ENTRY_POINT_GROUP)
+    else:
+        found = entry_points.get(ENTRY_POINT_GROUP, [])
+    return {entry_point.name: entry_point for entry_point in found}
+
+
+def register_driver(name, module_name, class_name):
+    """Add or replace a driver, imported from module_name on first use."""
+    DRIVERS[name] = (module_name, class_name)
+    load_driver.cache_clear()
+
+
+def driver_names():
+    return sorted(set(DRIVERS) | set(_entry_points()))
+
+
+@lru_cache(maxsize=None)
+def load_driver(name):
+    """Return the SDR class of a driver, importing its module on first use."""
+    if name in DRIVERS:
+        module_name, class_name = DRIVERS[name]
+        return getattr(importlib.import_module(module_name), class_name)
+    entry_point = _entry_points().get(name)
+    if entry_point is None:
+        raise ValueError(f"Unsupported SDR type: {name}, expected one of {driver_names()}")
+    return entry_point.load()
+
+
+def available_drivers():
+    """Drivers whose modules import on this host, e.g. with SoapySDR installed for the radios."""
+    available = []
+    for name in driver_names():
+        try:
+            load_driver(name)
+        except (ImportError, OSError) as e:
+            logger.debug(f"SDR driver {name} unavailable: {e}")
+            continue
+        available.append(name)
+    return available
+
+
+def enumerate_devices(args="", refresh=False):
+    """
+    SoapySDR.Device.enumerate(args), cached per args for the life of the process.
+
+    Enumeration probes every USB and network device and can take seconds, so it is
+    done once; pass refresh=True after plugging in or removing a radio.
+    """
+    with _enumerate_lock:
+        if refresh or args not in _enumerate_cache:
+            import SoapySDR
+            _enumerate_cache[args] = list(SoapySDR.Device.enumerate(args))
+        return _enumerate_cache[args]
+
@@ -0,0 +1,193 @@
+import threading
+from collections import namedtuple
+import numpy as np
+
+# Block flags
+BLOCK_HAS_TIME = 1 << 0        # time_ns was reported by the hardware, not extrapolated
+BLOCK_OVERFLOW = 1 << 1        # The device reported an overflow while the block was read
+BLOCK_DISCONTINUITY = 1 << 2   # Samples are missing before or inside the block
+BLOCK_READ_ERROR = 1 << 3      # A read failed with an error other than a timeout
+BLOCK_PARTIAL = 1 << 4         # The stream ended inside the block, only num_samples are samples
+
+BLOCK_DTYPE = np.dtype([
+    ("sequence", np.int64),
+    # Stream position of the first sample, counting samples known to be dropped
+    ("sample_index", np.int64),
+    # Hardware time of the first sample in ns, -1 if unknown
+    ("time_ns", np.int64),
+    # Wall clock time the block was committed
+    ("rx_time", np.float64),
+    ("flags", np.uint32),
+    # Samples known to be lost since the previous block; those lost inside this block are zero-filled
+    ("dropped", np.int64),
+    # Samples in the block, short of the block size only with BLOCK_PARTIAL
+    ("num_samples", np.int64),
+])
+
+class Block(namedtuple("Block", "sequence samples info")):
+    """A block handed out by RingReader: sequence number, zero-copy samples and a BLOCK_DTYPE record."""
+
+    __slots__ = ()
+
+    @property
+    def gap(self):
+        """True if samples are missing between the previous block and the end of this one."""
+        return bool(self.info["flags"] & BLOCK_DISCONTINUITY)
+
+class SampleRing:
+    """
+    Preallocated ring of fixed-size sample blocks with one writer and any number of readers.
+
+    The writer fills write_view() in place, e.g. straight from readStream, and
+    then calls commit(), which publishes the block under the next sequence
+    number. Block s lives in slot s % num_blocks and stays valid until the
+    writer laps it, i.e. while sequence - s < num_blocks. Readers get views of
+    the blocks, not copies; a reader that keeps a view past that point can
+    call valid(s) afterwards to find out whether it was overwritten. No lock
+    guards the samples, the condition only wakes readers waiting for a block.
+    Each slot also holds a BLOCK_DTYPE metadata record, filled by the writer
+    through write_info() before the commit. The last block of a stream that
+    ends mid-block is committed zero padded with BLOCK_PARTIAL set, and handed
+    out trimmed to its num_samples.
+
+    Parameters:
+        block_size (int): Samples per block.
+        num_blocks (int): Blocks in the ring.
+        dtype: Sample type.
+    """
+
+    def __init__(self, block_size, num_blocks=16, dtype=np.complex64):
+        if num_blocks < 2:
+            raise ValueError("A ring needs at least two blocks")
+        self.block_size = block_size
+        self.num_blocks = num_blocks
+        self.blocks = np.zeros((num_blocks, block_size), dtype=dtype)
+        self.metadata = np.zeros(num_blocks, dtype=BLOCK_DTYPE)
+        # Blocks committed so far, also the sequence number of the block being written
+        self.sequence = 0
+        # Blocks skipped by readers that fell behind, across all readers
+        self.overruns = 0
+        self.closed = False
+        self._ready = threading.Condition()
+
+    def write_view(self):
+        """The block the writer fills next."""
+        return self.blocks[self.sequence % self.num_blocks]
+
+    def write_info(self):
+        """Metadata record of the block the writer fills next."""
+        return self.metadata[self.sequence % self.num_blocks]
+
+    def commit(self):
+        self.metadata["sequence"][self.sequence % self.num_blocks] = self.sequence
+        self.sequence += 1
+        with self._ready:
+            self._ready.notify_all()
+
+    def close(self):
+        """Wake waiting readers; reads return None once they have caught up."""
+        self.closed = True
+        with self._ready:
+            self._ready.notify_all()
+
+    def valid(self, sequence):
+        return 0 <= sequence < self.sequence and self.sequence - sequence < self.num_blocks
+
+    def block(self, sequence):
+        if not self.valid(sequence):
+            raise IndexError(f"Block {sequence} is not in the ring")
+        return self._samples(sequence)
+
+    def _samples(self, sequence):
+        """View of the samples of block sequence, without its padding if it is partial."""
+        slot = sequence % self.num_blocks
+        info = self.metadata[slot]
+        if info["flags"] & BLOCK_PARTIAL:
+            return self.blocks[slot, :info["num_samples"]]
+        return self.blocks[slot]
+
+    def info(self, sequence):
+        """Copy of a block's metadata record."""
+        if not self.valid(sequence):
+            raise IndexError(f"Block {sequence} is not in the ring")
+        return self.metadata[sequence % self.num_blocks].copy()
+
+    def latest(self):
+        """(sequence, view) of the newest block, or None before the first commit."""
+        sequence = self.sequence - 1
+        if sequence < 0:
+            return None
+        return sequence, self._samples(sequence)
+
+    def reader(self, start="latest"):
+        """
+        New reader, starting at the next block to be committed ("latest"), the oldest
+        block still in the ring ("oldest") or a given sequence number. A reader whose
+        start has already been overwritten reports the loss on its first read.
+        """
+        if isinstance(start, int):
+            return RingReader(self, start)
+        if start == "latest":
+            return RingReader(self, self.sequence)
+        if start == "oldest":
+            return RingReader(self, max(0, self.sequence - self.num_blocks + 1))
+        raise ValueError(f"Unknown start {start!r}")
+
+    def wait(self, sequence, timeout=None):
+        """Wait until block sequence is committed or the ring is closed."""
+        with self._ready:
+            return self._ready.wait_for(lambda: self.sequence > sequence or self.closed, timeout)
+
+class RingReader:
+    """
+    Consumer position in a SampleRing.
+
+    read() hands out blocks in sequence order. If the writer has lapped the reader,
+    the blocks that were lost are counted in overruns, reading resumes at the
+    oldest block still in the ring and that block is marked as a gap, with the
+    skipped samples added to its dropped count. Consumers with filter state can
+    reset it whenever block.gap is set.
+    """
+
+    def __init__(self, ring, next_sequence):
+        self.ring = ring
+        self.next_sequence = next_sequence
+        self.overruns = 0
+
+    @property
+    def pending(self):
+        """Committed blocks not read yet."""
+        return self.ring.sequence - self.next_sequence
+
+    def read(self, timeout=None):
+        """
+        Next Block, waiting up to timeout for it.
+        Returns None on timeout or once the ring is closed and drained.
+        """
+        ring = self.ring
+        if ring.sequence <= self.next_sequence and not ring.wait(self.next_sequence, timeout):
+            return None
+        committed = ring.sequence
+        if committed <= self.next_sequence:
+            return None
+        # The slot after the newest block may already be half overwritten
+        oldest = committed - ring.num_blocks + 1
+        skipped = max(0, oldest - self.next_sequence)
+        if skipped:
+            self.overruns += skipped
+            ring.overruns += skipped
+            self.next_sequence = oldest
+        sequence = self.next_sequence
+        self.next_sequence += 1
+        info = ring.metadata[sequence % ring.num_blocks].copy()
+        if skipped:
+            info["flags"] |= BLOCK_DISCONTINUITY
+            info["dropped"] += skipped * ring.block_size
+        return Block(sequence, ring._samples(sequence), info)
+
+    def __iter__(self):
+        while True:
+            block = self.read()
+            if block is None:
+                return
+            yield block
@@ -1,23 +1,25 @@
 import SoapySDR
-import numpy as np
 import logging
 import time
-from sdrfly.sdr.sdr_base import SDR
+from sdrfly.sdr.registry import enumerate_devices
+from sdrfly.sdr.sdr_base import SDR, select_device
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG, format='%(asctime)s.%(msecs)03d %(levelname)s %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
 logger = logging.getLogger(__name__)
 
 class AirspySDR(SDR):
-    def __init__(self, center_freq, sample_rate, bandwidth, gain):
-        super().__init__(center_freq, sample_rate, bandwidth, gain)
+    native_format = "CS16"
+
+    def __init__(self, center_freq, sample_rate, bandwidth, gain, stream_format="CF32", serial=None):
+        super().__init__(center_freq, sample_rate, bandwidth, gain, stream_format)
 
         # Find and open the Airspy device
-        results = SoapySDR.Device.enumerate("driver=airspy")
+        results = enumerate_devices("driver=airspy")
         if len(results) == 0:
             raise RuntimeError("No Airspy devices found")
 
-        self.sdr = SoapySDR.Device(results[0])
+        self.sdr = SoapySDR.Device(select_device(results, serial))
+        if serial is not None:
+            self.name = f"{self.name}-{serial}"
         self.sdr.setSampleRate(SoapySDR.SOAPY_SDR_RX, 0, sample_rate)
         self.sdr.setFrequency(SoapySDR.SOAPY_SDR_RX, 0, center_freq)
         self.sdr.setBandwidth(SoapySDR.SOAPY_SDR_RX, 0, bandwidth)
@@ -25,33 +27,33 @@ class AirspySDR(SDR):
         self.rx_stream = None
         self.tx_stream = None
 
-    def capture_samples(self, num_samples):
+    def _read_into(self, buffer):
         if self.rx_stream is None:
-            self.rx_stream = self.sdr.setupStream(SoapySDR.SOAPY_SDR_RX, SoapySDR.SOAPY_SDR_CF32)
+            self.rx_stream = self.sdr.setupStream(SoapySDR.SOAPY_SDR_RX, self.stream_format)
             self.sdr.activateStream(self.rx_stream)
             time.sleep(0.1)  # Small delay to allow stream to activate
 
-        samples = np.empty(num_samples, dtype=np.complex64)
-        sr = self.sdr.readStream(self.rx_stream, [samples], num_samples)
-
-        logger.debug(f"readStream returned: {sr.ret} samples, flags: {sr.flags}, timeNs: {sr.timeNs}")
-
-        if sr.ret <= 0:
-            logger.warning(f"Requested {num_samples} samples but got {sr.ret} samples.")
-            return np.array([], dtype=np.complex64)
-
-        return samples[:sr.ret]
+        return self.sdr.readStream(self.rx_stream, [buffer], len(buffer))
 
-    def transmit_samples(self, samples):
+    def _setup_tx_stream(self):
         if self.tx_stream is None:
             self.tx_stream = self.sdr.setupStream(SoapySDR.SOAPY_SDR_TX, SoapySDR.SOAPY_SDR_CF32)
             self.sdr.activateStream(self.tx_stream)
 
-        samples = samples.astype(np.complex64)
-        self.sdr.writeStream(self.tx_stream, [samples], len(samples))
-        logger.info(f"Transmitted {len(samples)} samples")
+    def _write_from(self, buffer, flags=0):
+        self._setup_tx_stream()
+        return self.sdr.writeStream(self.tx_stream, [buffer], len(buffer), flags)
+
+    def _read_tx_status(self):
+        if self.tx_stream is None:
+            return 0
+        return self.sdr.readStreamStatus(self.tx_stream, timeoutUs=0).ret
+
+    def _tx_mtu(self):
+        self._setup_tx_stream()
+        return self.sdr.getStreamMTU(self.tx_stream)
 
-    def stop_transmission(self):
+    def _close_tx_stream(self):
         if self.tx_stream is not None:
             self.tune_away()
             self.sdr.deactivateStream(self.tx_stream)
@@ -69,14 +71,15 @@ class AirspySDR(SDR):
         self.sdr.setFrequency(SoapySDR.SOAPY_SDR_TX, 0, freq)
         logger.info(f"Frequency set to {freq / 1e6} MHz")
 
-    def close(self):
+    def _deactivate_stream(self):
         if self.rx_stream is not None:
             self.sdr.deactivateStream(self.rx_stream)
             self.sdr.closeStream(self.rx_stream)
             self.rx_stream = None
-        if self.tx_stream is not None:
-            self.sdr.deactivateStream(self.tx_stream)
-            self.sdr.closeStream(self.tx_stream)
-            self.tx_stream = None
+
+    def close(self):
+        self.stop()
+        self._deactivate_stream()
+        self.stop_transmission()
         self.sdr = None
         logger.info("Airspy SDR closed")
@@ -1,19 +1,568 @@
+import collections
+import threading
+import time
 from abc import ABC, abstractmethod
+from collections import namedtuple
+import numpy as np
+from sdrfly import metrics
+from sdrfly.iq import STREAM_FORMATS, to_complex64
+from sdrfly.sdr.ring_buffer import (BLOCK_DISCONTINUITY, BLOCK_HAS_TIME, BLOCK_OVERFLOW, BLOCK_PARTIAL, BLOCK_READ_ERROR,
+                                    Block, SampleRing)
+from sdrfly.sdr.transmit import Transmission, as_source
+
+# Same fields and values as SoapySDR's StreamResult and constants, so drivers can
+# return readStream's result as is
+ReadResult = namedtuple("ReadResult", "ret flags timeNs", defaults=(0, 0))
+SOAPY_SDR_TIMEOUT = -1
+SOAPY_SDR_OVERFLOW = -4
+SOAPY_SDR_HAS_TIME = 1 << 2
+
+SAMPLES_READ = metrics.counter("sdrfly_sdr_samples_read_total", "Samples read from the device.", ["device"])
+SHORT_READS = metrics.counter("sdrfly_sdr_short_reads_total",
+                              "Reads that returned no samples, by reason: timeout, overflow or error.",
+                              ["device", "reason"])
+DROPPED_SAMPLES = metrics.counter("sdrfly_sdr_dropped_samples_total",
+                                  "Samples lost by the device, from jumps in its timestamps.", ["device"])
+BLOCKS_CAPTURED = metrics.counter("sdrfly_sdr_blocks_total", "Blocks committed to the capture ring.", ["device"])
+RING_OVERRUNS = metrics.gauge("sdrfly_sdr_ring_overruns", "Ring blocks skipped by readers that fell behind.",
+                              ["device"])
+READ_SECONDS = metrics.histogram("sdrfly_sdr_read_seconds", "Duration of one read from the device.", ["device"])
+SAMPLES_WRITTEN = metrics.counter("sdrfly_sdr_samples_written_total", "Samples written to the device.", ["device"])
+SHORT_WRITES = metrics.counter("sdrfly_sdr_short_writes_total", "Writes that sent fewer samples than asked.",
+                               ["device"])
+TX_UNDERFLOWS = metrics.counter("sdrfly_sdr_tx_underflows_total", "Transmit underflows reported by the device.",
+                                ["device"])
+
+_DeviceMetrics = collections.namedtuple("_DeviceMetrics", "samples_read timeouts overflows errors dropped blocks "
+                                        "overruns read_seconds samples_written short_writes tx_underflows")
+
+# What stream() does when a consumer's queue is full: discard the oldest queued block,
+# or stop forwarding and let the consumer fall behind in the ring
+STREAM_POLICIES = ("drop_oldest", "block")
+
+def select_device(results, serial=None):
+    """
+    Pick a device from SoapySDR's enumerate() results: the one whose serial ends with
+    serial, which may be abbreviated to its last digits, or the first one.
+    """
+    if serial is None:
+        return results[0]
+    serial = str(serial).lower()
+    serials = [dict(result).get("serial", "") for result in results]
+    matches = [result for result, found in zip(results, serials) if found.lower().endswith(serial)]
+    if len(matches) != 1:
+        problem = "No device" if not matches else "Several devices"
+        raise RuntimeError(f"{problem} with serial {serial!r}, found {serials}")
+    return matches[0]
+
+class _StreamPump:
+    """
+    Forwards blocks from a RingReader to one asyncio consumer.
+
+    A thread waits on the ring and posts copies of the blocks to the event loop,
+    so the loop never waits on the device. Blocks lost to the policy or to the
+    ring are added to the dropped count of the next block delivered.
+    """
+
+    # Seconds between checks for cancellation while waiting
+    POLL_INTERVAL = 0.1
+
+    def __init__(self, reader, loop, queue_size, policy):
+        import asyncio
+        self.reader = reader
+        self.loop = loop
+        self.queue_size = queue_size
+        self.policy = policy
+        self.queue = collections.deque()
+        self.ready = asyncio.Event()
+        # Queue slots the pump may still fill, used by the "block" policy
+        self.space = threading.Semaphore(queue_size)
+        self.cancelled = False
+        self.thread = threading.Thread(target=self._run, name="sdrfly-stream-pump", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        lost = 0
+        try:
+            while not self.cancelled:
+                block = self.reader.read(self.POLL_INTERVAL)
+                if block is None:
+                    if self.reader.ring.closed and self.reader.pending <= 0:
+                        break
+                    continue
+                samples = block.samples.copy()
+                if not self.reader.ring.valid(block.sequence):
+                    # The writer lapped the block while it was being copied, so its
+                    # samples are lost along with any loss it was reporting
+                    lost += len(samples) + int(block.info["dropped"])
+                    continue
+                info = block.info
+                if lost:
+                    info["flags"] |= BLOCK_DISCONTINUITY
+                    info["dropped"] += lost
+                    lost = 0
+                if self.policy == "block":
+                    while not self.space.acquire(timeout=self.POLL_INTERVAL):
+                        if self.cancelled:
+                            return
+                self._post(Block(block.sequence, samples, info))
+        except Exception as error:
+            self._post(error)
+            return
+        self._post(None)
+
+    def _post(self, item):
+        try:
+            self.loop.call_soon_threadsafe(self._put, item)
+        except RuntimeError:
+            # The event loop is closed, nobody is left to receive
+            self.cancelled = True
+
+    def _put(self, item):
+        queue = self.queue
+        if self.policy == "drop_oldest" and isinstance(item, Block) and len(queue) >= self.queue_size:
+            oldest = queue.popleft()
+            successor = queue[0] if queue else item
+            successor.info["flags"] |= BLOCK_DISCONTINUITY
+            successor.info["dropped"] += len(oldest.samples) + oldest.info["dropped"]
+        queue.append(item)
+        self.ready.set()
+
+    async def get(self):
+        """Next Block, None at the end of the stream."""
+        while not self.queue:
+            self.ready.clear()
+            await self.ready.wait()
+        item = self.queue.popleft()
+        if self.policy == "block" and isinstance(item, Block):
+            self.space.release()
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+    def cancel(self):
+        self.cancelled = True
 
 class SDR(ABC):
-    def __init__(self, center_freq, sample_rate, bandwidth, gain):
+    """
+    Base class for receivers.
+
+    Subclasses implement _read_into(), which reads up to len(buffer) samples from
+    the device straight into buffer. On top of it the base class provides
+    one-shot capture_samples() and a capture engine: start() runs a thread that
+    fills a preallocated SampleRing block by block with no intermediate copies,
+    and consumers follow it through reader() without blocking each other.
+
+    With stream_format="native" samples stay in the device's own format (e.g. CS8
+    or CS16) from readStream through the ring, a quarter or half the memory
+    traffic of CF32. Ring blocks then hold CS8/CS16 elements, which the
+    channelizers widen in their staging copy; capture_samples() and
+    get_latest_samples() still return complex64.
+
+    Every block carries a BLOCK_DTYPE record: stream sample index, hardware time
+    of the first sample, wall clock receive time and flags. Overflows reported
+    by the device and jumps in the hardware timestamps mark the block as a gap,
+    and timestamp jumps also give the number of samples lost.
+
+    For asyncio code, stream() wraps the engine in an async iterator; see there.
+
+    Transmitters implement _write_from() and the transmit stream hooks, and
+    transmit() streams a burst or a generator to them in MTU-sized chunks.
+
+    Read errors are retried with a growing pause; after MAX_READ_ERRORS in a row
+    capture stops and capture_error is raised to consumers.
+
+    Reads, short reads by reason, dropped samples, ring overruns and read
+    latency are counted in the sdrfly_sdr_* metrics of sdrfly.metrics,
+    labelled with the device's name.
+    """
+
+    # Samples per ring block unless a subclass or start() says otherwise
+    block_size = 131072
+    # SoapySDR format the hardware produces without conversion in the driver
+    native_format = "CF32"
+    # Samples per transmit write for drivers that cannot report their stream MTU
+    tx_chunk_size = 65536
+    # Seconds to wait after a read error, doubling on each consecutive one up to MAX_ERROR_BACKOFF
+    ERROR_BACKOFF = 0.001
+    MAX_ERROR_BACKOFF = 0.1
+    # Consecutive read errors after which capture gives up on the device
+    MAX_READ_ERRORS = 100
+
+    def __init__(self, center_freq, sample_rate, bandwidth, gain, stream_format="CF32"):
+        stream_format = self.native_format if stream_format == "native" else stream_format
+        if stream_format not in STREAM_FORMATS:
+            raise ValueError(f"Unsupported stream format {stream_format!r}, expected one of {sorted(STREAM_FORMATS)} or 'native'")
+        self.stream_format = stream_format
         self.center_freq = center_freq
         self.sample_rate = sample_rate
         self.bandwidth = bandwidth
         self.gain = gain
+        self.ring = None
+        self.start_sequence = 0
+        self.running = False
+        self.thread = None
+        # Set by sources that can run out, such as files, once there is nothing left to read
+        self.exhausted = False
+        # Why capture stopped on its own, raised by reader(), stream() and capture_samples()
+        self.capture_error = None
+        self._read_errors = 0
+        self._reset_stream()
+        # Async consumers in stream(), and whether they started the capture themselves
+        self._stream_lock = threading.Lock()
+        self._stream_users = 0
+        self._stream_owned = False
+        # Label of this device in the metrics; drivers opened by serial append it
+        self.name = type(self).__name__
+        self._metrics = None
+        self.transmission = None
+
+    def _reset_stream(self, restarted=False):
+        self._sample_index = 0
+        # Expected hardware time of the next sample, once the device has reported one
+        self._next_time_ns = None
+        # Samples were missed while capture was stopped
+        self._restarted = restarted
+        # (samples, time in ns) read but not yet placed in a block
+        self._carry = None
+
+    def _read_into(self, buffer):
+        """
+        Read up to len(buffer) samples into buffer.
+
+        Returns:
+            ReadResult or SoapySDR StreamResult: ret is the number of samples read or a
+            negative SoapySDR error code, flags and timeNs as from readStream.
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support receiving")
+
+    @property
+    def metrics(self):
+        """This device's children of the sdrfly_sdr_* metrics, bound on first use."""
+        if self._metrics is None:
+            name = self.name
+            self._metrics = _DeviceMetrics(
+                SAMPLES_READ.labels(name), SHORT_READS.labels(name, "timeout"), SHORT_READS.labels(name, "overflow"),
+                SHORT_READS.labels(name, "error"), DROPPED_SAMPLES.labels(name), BLOCKS_CAPTURED.labels(name),
+                RING_OVERRUNS.labels(name), READ_SECONDS.labels(name), SAMPLES_WRITTEN.labels(name),
+                SHORT_WRITES.labels(name), TX_UNDERFLOWS.labels(name))
+        return self._metrics
+
+    def _record_write(self, requested, written):
+        """Count a transmit write in the metrics."""
+        device_metrics = self.metrics
+        device_metrics.samples_written.inc(max(written, 0))
+        if written != requested:
+            device_metrics.short_writes.inc()
+
+    def _fill(self, buffer, info=None):
+        """Fill buffer from the device, recording the block's metadata in info."""
+        device_metrics = self.metrics
+        filled = 0
+        flags = BLOCK_DISCONTINUITY if self._restarted else 0
+        self._restarted = False
+        dropped = 0
+        # Samples lost before the block's first sample, which move its stream position
+        leading = 0
+        time_ns = -1 if self._next_time_ns is None else round(self._next_time_ns)
+        sample_period_ns = 1e9 / self.sample_rate
+        while (filled < len(buffer) and (self.running or self.thread is None)
+               and (not self.exhausted or self._carry is not None) and self.capture_error is None):
+            if self._carry is not None:
+                # Samples read into the previous block that did not fit after a gap
+                carried, carry_time_ns = self._carry
+                self._carry = None
+                buffer[filled:filled + len(carried)] = carried
+                result = ReadResult(len(carried), SOAPY_SDR_HAS_TIME, carry_time_ns)
+            else:
+                started = time.perf_counter()
+                result = self._read_into(buffer[filled:])
+                device_metrics.read_seconds.observe(time.perf_counter() - started)
+            if result.ret <= 0:
+                if result.ret == SOAPY_SDR_OVERFLOW:
+                    flags |= BLOCK_OVERFLOW | BLOCK_DISCONTINUITY
+                    device_metrics.overflows.inc()
+                elif result.ret == SOAPY_SDR_TIMEOUT:
+                    device_metrics.timeouts.inc()
+                elif not self.exhausted:
+                    flags |= BLOCK_READ_ERROR
+                    device_metrics.errors.inc()
+                    self._read_error(result.ret)
+                continue
+            self._read_errors = 0
+            count = result.ret
+            if result.flags & SOAPY_SDR_HAS_TIME:
+                read_time_ns = result.timeNs
+                if self._next_time_ns is not None:
+                    gap = round((result.timeNs - self._next_time_ns) / sample_period_ns)
+                    if gap > 0 and filled:
+                        # Lost inside the block: zero-fill the gap so the samples after it keep
+                        # their position, carrying what no longer fits over to the next block
+                        zeros = min(gap, len(buffer) - filled)
+                        count = min(count, len(buffer) - filled - zeros)
+                        if count < result.ret:
+                            self._carry = (buffer[filled + count:filled + result.ret].copy(),
+                                           round(result.timeNs + count * sample_period_ns))
+                        buffer[filled + zeros:filled + zeros + count] = buffer[filled:filled + count]
+                        buffer[filled:filled + zeros] = 0
+                        filled += zeros
+                        dropped += zeros
+                        read_time_ns = self._next_time_ns + zeros * sample_period_ns
+                    elif gap > 0:
+                        leading += gap
+                        dropped += gap
+                    if gap > 0:
+                        flags |= BLOCK_DISCONTINUITY
+                if not flags & BLOCK_HAS_TIME:
+                    time_ns = round(read_time_ns - filled * sample_period_ns)
+                    flags |= BLOCK_HAS_TIME
+                self._next_time_ns = read_time_ns + count * sample_period_ns
+            elif self._next_time_ns is not None:
+                self._next_time_ns += count * sample_period_ns
+            filled += count
+
+        if info is not None:
+            info["sample_index"] = self._sample_index + leading
+            info["time_ns"] = time_ns
+            info["rx_time"] = time.time()
+            info["flags"] = flags
+            info["dropped"] = dropped
+            info["num_samples"] = filled
+        self._sample_index += leading + filled
+        device_metrics.samples_read.inc(filled - dropped + leading)
+        device_metrics.dropped.inc(dropped)
+        return filled
+
+    def _read_error(self, ret):
+        """Back off after a failed read, giving up once MAX_READ_ERRORS have failed in a row."""
+        self._read_errors += 1
+        if self._read_errors >= self.MAX_READ_ERRORS:
+            self.capture_error = RuntimeError(f"{self.name}: {self._read_errors} consecutive read errors, last {ret}")
+            return
+        # An unplugged or wedged device fails at once, so retrying straight away would spin
+        time.sleep(min(self.ERROR_BACKOFF * 2 ** (self._read_errors - 1), self.MAX_ERROR_BACKOFF))
+
+    @property
+    def sample_dtype(self):
+        """dtype of the samples read from the device and held in the ring."""
+        return STREAM_FORMATS[self.stream_format]
 
-    @abstractmethod
     def capture_samples(self, num_samples):
-        pass
+        self._clear_error()
+        samples = np.empty(num_samples, dtype=self.sample_dtype)
+        filled = self._fill(samples)
+        if self.capture_error is not None:
+            raise self.capture_error
+        return to_complex64(samples[:filled])
+
+    def _clear_error(self):
+        self.capture_error = None
+        self._read_errors = 0
+
+    def start(self, block_size=None, num_blocks=16):
+        """Start filling the ring with blocks of block_size samples in a background thread."""
+        if self.running:
+            return
+        block_size = block_size or self.block_size
+        if (self.ring is None or self.ring.block_size != block_size or self.ring.num_blocks != num_blocks
+                or self.ring.blocks.dtype != self.sample_dtype):
+            self.ring = SampleRing(block_size, num_blocks, self.sample_dtype)
+        self.ring.closed = False
+        self._clear_error()
+        self._reset_stream(restarted=self.ring.sequence > 0)
+        # First block of this capture, for readers that must not miss it
+        self.start_sequence = self.ring.sequence
+        self.running = True
+        self.thread = threading.Thread(target=self._capture_thread, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        if self.ring is not None:
+            self.ring.close()
+
+    def _capture_thread(self):
+        ring = self.ring
+        while self.running and not self.exhausted and self.capture_error is None:
+            block = ring.write_view()
+            info = ring.write_info()
+            filled = self._fill(block, info)
+            if 0 < filled < len(block) and self.exhausted:
+                # The tail of a finite stream goes out zero padded
+                block[filled:] = 0
+                info["flags"] |= BLOCK_PARTIAL
+            elif filled < len(block):
+                # A block cut short by stop() or a failed device is not published
+                continue
+            ring.commit()
+            self.metrics.blocks.inc()
+            self.metrics.overruns.set(ring.overruns)
+        if self.capture_error is not None:
+            self.running = False
+        if self.exhausted or self.capture_error is not None:
+            ring.close()
+
+    def reader(self, start="latest"):
+        """
+        RingReader over the captured blocks, handing out Block(sequence, samples, info); call start() first.
+        start is as for SampleRing.reader(); start_sequence is the first block of the current capture.
+
+        A reader ends once the ring is closed and drained; if the device failed,
+        capture_error says why.
+        """
+        if self.capture_error is not None:
+            raise self.capture_error
+        if self.ring is None:
+            raise RuntimeError("Capture has not been started")
+        return self.ring.reader(start)
+
+    # Optional hook: sources without a device stream have nothing to deactivate
+    def _deactivate_stream(self):  # noqa: B027
+        """Deactivate and close the device's receive stream; the next read sets it up again."""
+        return
+
+    def _acquire_stream(self, block_size, num_blocks):
+        with self._stream_lock:
+            start = "latest"
+            if self._stream_users == 0 and not self.running:
+                self.start(block_size, num_blocks)
+                self._stream_owned = True
+                # The ring can already have moved on, so start from the capture's first block
+                start = self.start_sequence
+            self._stream_users += 1
+            return start
+
+    def _release_stream(self):
+        with self._stream_lock:
+            self._stream_users -= 1
+            if self._stream_users == 0 and self._stream_owned:
+                self._stream_owned = False
+                self.stop()
+                self._deactivate_stream()
+
+    async def stream(self, block_size=None, num_blocks=16, queue_size=4, policy="drop_oldest"):
+        """
+        Asynchronously iterate over captured blocks:
+
+            async with contextlib.aclosing(sdr.stream()) as blocks:
+                async for block in blocks:
+                    ...
+
+        The blocking reads stay in the capture thread and in one forwarding thread
+        per consumer, so the event loop is never held up by the device. Any number
+        of consumers can stream at once, each at its own pace, from a shared
+        capture. The first consumer starts the capture unless start() already
+        has, with block_size and num_blocks as for start(); when the last one
+        finishes or is cancelled, capture stops and the device stream is
+        deactivated.
+
+        Up to queue_size blocks wait for a consumer. policy decides what happens
+        when it falls further behind: "drop_oldest" discards the oldest queued
+        block, keeping latency bounded, and "block" stops forwarding so the
+        consumer lags in the ring, losing blocks only when the writer laps it.
+        Either way the next block delivered after a loss has gap set and the
+        lost samples in its dropped count. If the device keeps failing, the
+        blocks already captured are delivered and then capture_error is raised.
+
+        Yields:
+            Block: sequence, samples and BLOCK_DTYPE info. Samples are a copy, in
+            sample_dtype, that stays valid after the ring moves on.
+        """
+        if policy not in STREAM_POLICIES:
+            raise ValueError(f"Unknown policy {policy!r}, expected one of {STREAM_POLICIES}")
+        if queue_size < 1:
+            raise ValueError("queue_size must be at least 1")
+        # asyncio is imported here so plain capture does not pay for it at import
+        import asyncio
+        loop = asyncio.get_running_loop()
+        start = await loop.run_in_executor(None, self._acquire_stream, block_size, num_blocks)
+        pump = None
+        try:
+            # The consumer that started the capture sees it from the first block
+            pump = _StreamPump(self.reader(start), loop, queue_size, policy)
+            while True:
+                block = await pump.get()
+                if block is None:
+                    if self.capture_error is not None:
+                        raise self.capture_error
+                    return
+                yield block
+        finally:
+            if pump is not None:
+                pump.cancel()
+            await loop.run_in_executor(None, self._release_stream)
+
+    def get_latest_samples(self):
+        """Copy of the newest captured block as complex64, empty before the first one."""
+        latest = self.ring.latest() if self.ring is not None else None
+        if latest is None:
+            return np.zeros(0, dtype=np.complex64)
+        return to_complex64(latest[1], out=np.empty(len(latest[1]), dtype=np.complex64))
+
+    def _write_from(self, buffer, flags=0):
+        """
+        Write up to len(buffer) samples to the device, opening the transmit stream if needed.
+
+        Returns:
+            ReadResult or SoapySDR StreamResult: ret is the number of samples written or a
+            negative SoapySDR error code.
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support transmission")
+
+    def _read_tx_status(self):
+        """Pending transmit stream status code without waiting, e.g. SOAPY_SDR_UNDERFLOW, or 0."""
+        return 0
+
+    def _tx_mtu(self):
+        """Samples per transmit write, the stream MTU where the driver can tell."""
+        return self.tx_chunk_size
+
+    # Optional hook: drivers without a transmit stream have nothing to close
+    def _close_tx_stream(self):  # noqa: B027
+        """Deactivate and close the transmit stream; the next write opens it again."""
+        return
+
+    def transmit(self, source, num_samples=None, duration=None, loop=False, chunk_size=None):
+        """
+        Start transmitting source in the background and return its Transmission.
+
+        source is either a burst (an array, sent once, or repeated gaplessly with
+        loop=True), a sdrfly.synth generator, or an iterable of arrays of any
+        length, such as a generator producing the waveform on the fly. num_samples, or duration in seconds,
+        stops the transmission after exactly that many samples; a looped burst
+        without either runs until stop_transmission(). Samples are streamed in
+        chunks of chunk_size, by default the stream MTU, through two
+        preallocated buffers, so memory does not grow with the duration.
+        """
+        if self.transmission is not None and self.transmission.running:
+            raise RuntimeError("A transmission is already in progress")
+        if duration is not None:
+            num_samples = round(duration * self.sample_rate)
+        source = as_source(source, num_samples, loop)
+        self.transmission = Transmission(self, source, chunk_size or self._tx_mtu())
+        return self.transmission
 
-    @abstractmethod
     def transmit_samples(self, samples):
-        pass
+        """Transmit samples as one burst, returning once they are sent."""
+        transmission = self.transmit(samples)
+        transmission.wait()
+        if transmission.error is not None:
+            raise transmission.error
+        return transmission.sent
+
+    def transmit_data_async(self, samples, duration=1):
+        """Transmit samples repeated for duration seconds in the background."""
+        return self.transmit(samples, duration=duration, loop=True)
+
+    def stop_transmission(self):
+        """Stop the transmission in progress, if any, and close the transmit stream."""
+        if self.transmission is not None:
+            self.transmission.stop()
+            self.transmission.wait()
+        self._close_tx_stream()
 
     @abstractmethod
     def set_frequency(self, frequency):
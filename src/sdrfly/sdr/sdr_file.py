@@ -0,0 +1,264 @@
+import json
+import time
+from pathlib import Path
+import numpy as np
+from sdrfly.iq import CS8, CS16
+from sdrfly.sdr.ring_buffer import BLOCK_DTYPE, BLOCK_HAS_TIME, Block
+from sdrfly.sdr.sdr_base import SDR, ReadResult, SOAPY_SDR_HAS_TIME
+
+# Raw IQ formats: interleaved component type and scale to full scale 1.0
+IQ_FORMATS = {
+    "cf32": (np.float32, 1.0, 0.0),
+    "cs16": (np.int16, 1 / 32768, 0.0),
+    "cs8": (np.int8, 1 / 128, 0.0),
+    "cu8": (np.uint8, 1 / 128, 127.5),
+}
+
+# Ring element type for formats that can be replayed at native width
+NATIVE_DTYPES = {
+    "cf32": np.dtype(np.complex64),
+    "cs16": CS16,
+    "cs8": CS8,
+}
+
+SIGMF_DATATYPES = {
+    "cf32_le": "cf32",
+    "ci16_le": "cs16",
+    "ci8": "cs8",
+    "ci8_le": "cs8",
+    "cu8": "cu8",
+    "cu8_le": "cu8",
+}
+
+class Recording:
+    """One memory-mapped IQ file with its centre frequency and sample rate."""
+
+    def __init__(self, path, iq_format, sample_rate, center_freq):
+        if iq_format not in IQ_FORMATS:
+            raise ValueError(f"Unsupported IQ format {iq_format!r}, expected one of {sorted(IQ_FORMATS)}")
+        self.path = Path(path)
+        self.iq_format = iq_format
+        self.sample_rate = sample_rate
+        self.center_freq = center_freq
+        component, self.scale, self.offset = IQ_FORMATS[iq_format]
+        self.data = np.memmap(self.path, dtype=component, mode="r")
+        self.data = self.data[:len(self.data) // 2 * 2].reshape(-1, 2)
+        # cf32 files are complex64 already and can be handed out without a copy
+        self.samples = self.data.view(np.complex64)[:, 0] if iq_format == "cf32" else None
+        # Same for the int formats when the consumer takes them at native width
+        self.native = self.data.view(NATIVE_DTYPES[iq_format])[:, 0] if iq_format in NATIVE_DTYPES else None
+
+    def __len__(self):
+        return len(self.data)
+
+    def read(self, start, stop, out=None):
+        """
+        Samples [start, stop) as complex64, a view of the file when the format allows and
+        out is None. A CS16 or CS8 out receives the samples at native width instead.
+        """
+        if out is not None and out.dtype.fields is not None:
+            if self.native is None or out.dtype != self.native.dtype:
+                raise ValueError(f"Cannot replay {self.iq_format} samples as {out.dtype}")
+            out[:stop - start] = self.native[start:stop]
+            return out[:stop - start]
+        if self.samples is not None:
+            if out is None:
+                return self.samples[start:stop]
+            out[:stop - start] = self.samples[start:stop]
+            return out[:stop - start]
+        pairs = self.data[start:stop]
+        if out is None:
+            out = np.empty(stop - start, dtype=np.complex64)
+        out = out[:stop - start]
+        out.real = pairs[:, 0]
+        out.imag = pairs[:, 1]
+        if self.offset:
+            out -= np.complex64(self.offset + 1j * self.offset)
+        out *= np.float32(self.scale)
+        return out
+
+    @classmethod
+    def open(cls, path, iq_format=None, sample_rate=None, center_freq=None):
+        """
+        Open a SigMF recording (either file of the pair, or their common stem) or a raw
+        file, whose format is given or taken from the extension (.cf32, .cs16, .cs8, .cu8).
+        """
+        path = Path(path)
+        meta_path = path.with_suffix(".sigmf-meta")
+        if path.suffix in (".sigmf-meta", ".sigmf-data", "") and meta_path.exists():
+            with open(meta_path) as meta_file:
+                meta = json.load(meta_file)
+            datatype = meta["global"]["core:datatype"]
+            if datatype not in SIGMF_DATATYPES:
+                raise ValueError(f"Unsupported SigMF datatype {datatype!r}")
+            captures = meta.get("captures") or [{}]
+            return cls(path.with_suffix(".sigmf-data"), SIGMF_DATATYPES[datatype],
+                       meta["global"].get("core:sample_rate", sample_rate),
+                       captures[0].get("core:frequency", center_freq))
+        return cls(path, iq_format or path.suffix.lstrip(".") or "cf32", sample_rate, center_freq)
+
+class FileSDR(SDR):
+    """
+    Replays IQ recordings from disk as if they came from a receiver.
+
+    Files are memory mapped, so multi-gigabyte captures stream at disk speed.
+    Each path is a SigMF recording or a raw cf32/cs16/cs8/cu8 file; SigMF
+    metadata supplies the centre frequency and sample rate, raw files take
+    them from the arguments. With several recordings, set_frequency() switches
+    to the one whose centre frequency is nearest, keeping the stream position.
+
+    The usual SDR interface (capture_samples, start and reader) copies into the
+    caller's buffer or the ring, once, with int formats scaled to complex64
+    unless stream_format="native" keeps them at file width. blocks() instead
+    hands out views of the file itself for cf32 recordings, and for cs16/cs8
+    ones in native mode.
+    Timestamps are the sample position in the replay. With loop the replay
+    wraps around at the end, otherwise the stream ends and readers are woken,
+    after a last BLOCK_PARTIAL block holding the tail of the recording.
+    With realtime reads are paced to the sample rate.
+
+    Parameters:
+        paths (str or list): Recording paths.
+        sample_rate (float): Sample rate of raw files.
+        center_freq (float): Centre frequency of raw files.
+        iq_format (str): Format of raw files without a known extension.
+        loop (bool): Restart from the beginning at the end of the recording.
+        realtime (bool): Pace reads to the sample rate instead of reading as fast as possible.
+        stream_format (str): "CF32", or "native" or the format of the first recording
+            by name (e.g. "CS16") to replay it at file width.
+    """
+
+    def __init__(self, paths, sample_rate=None, center_freq=None, iq_format=None, loop=False, realtime=False,
+                 bandwidth=None, gain=0, stream_format="CF32"):
+        paths = [paths] if isinstance(paths, (str, Path)) else list(paths)
+        self.recordings = [Recording.open(path, iq_format, sample_rate, center_freq) for path in paths]
+        self.recording = self.recordings[0]
+        if self.recording.sample_rate is None:
+            raise ValueError("The sample rate of raw recordings must be given")
+        # cu8 has no SoapySDR equivalent and is always widened
+        self.native_format = self.recording.iq_format.upper() if self.recording.native is not None else "CF32"
+        super().__init__(self.recording.center_freq, self.recording.sample_rate,
+                         bandwidth or self.recording.sample_rate, gain, stream_format)
+        if self.stream_format != "CF32" and self.stream_format != self.native_format:
+            raise ValueError(f"{self.recording.path} is {self.recording.iq_format}, not {self.stream_format}")
+        self.loop = loop
+        self.realtime = realtime
+        # Samples delivered since the start of the replay, and position in the recording
+        self.delivered = 0
+        self.position = 0
+        self._pace_start = None
+
+    def _pace(self, count):
+        if not self.realtime:
+            return
+        if self._pace_start is None:
+            self._pace_start = time.monotonic() - self.delivered / self.sample_rate
+        delay = self._pace_start + (self.delivered + count) / self.sample_rate - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def _advance(self, max_samples):
+        """Claim up to max_samples of the recording, returning (start, stop) or None at the end."""
+        if self.position >= len(self.recording):
+            if not self.loop or len(self.recording) == 0:
+                self.exhausted = True
+                return None
+            self.position = 0
+        start = self.position
+        stop = min(start + max_samples, len(self.recording))
+        self._pace(stop - start)
+        self.position = stop
+        return start, stop
+
+    def _read_into(self, buffer):
+        span = self._advance(len(buffer))
+        if span is None:
+            return ReadResult(0)
+        start, stop = span
+        self.recording.read(start, stop, buffer)
+        time_ns = round(self.delivered * 1e9 / self.sample_rate)
+        self.delivered += stop - start
+        return ReadResult(stop - start, SOAPY_SDR_HAS_TIME, time_ns)
+
+    def blocks(self, block_size):
+        """
+        Yield Block(sequence, samples, info) of block_size samples straight from the file,
+        bypassing the ring. Samples are in sample_dtype: read-only views of the recording
+        for cf32 and at native width, fresh complex64 arrays otherwise. A partial block at
+        the end of a recording is returned as is when not looping.
+        """
+        sequence = 0
+        while True:
+            start_index = self.delivered
+            parts = []
+            needed = block_size
+            while needed:
+                span = self._advance(needed)
+                if span is None:
+                    break
+                if self.stream_format == "CF32":
+                    parts.append(self.recording.read(*span))
+                else:
+                    parts.append(self.recording.native[span[0]:span[1]])
+                self.delivered += span[1] - span[0]
+                needed -= span[1] - span[0]
+            if not parts:
+                return
+            info = np.zeros((), dtype=BLOCK_DTYPE)[()]
+            info["sequence"] = sequence
+            info["sample_index"] = start_index
+            info["time_ns"] = round(start_index * 1e9 / self.sample_rate)
+            info["rx_time"] = time.time()
+            info["flags"] = BLOCK_HAS_TIME
+            samples = parts[0] if len(parts) == 1 else np.concatenate(parts)
+            info["num_samples"] = len(samples)
+            yield Block(sequence, samples, info)
+            sequence += 1
+
+    def rewind(self):
+        self.position = 0
+        self.delivered = 0
+        self.exhausted = False
+        self._pace_start = None
+
+    def set_frequency(self, frequency):
+        known = [recording for recording in self.recordings if recording.center_freq is not None]
+        if not known:
+            raise ValueError("No recording has a known centre frequency")
+        recording = min(known, key=lambda recording: abs(recording.center_freq - frequency))
+        if recording.sample_rate is not None and recording.sample_rate != self.sample_rate:
+            raise ValueError(f"{recording.path} is at {recording.sample_rate} Hz, not {self.sample_rate} Hz")
+        if self.stream_format != "CF32" and recording.iq_format.upper() != self.stream_format:
+            raise ValueError(f"{recording.path} is {recording.iq_format}, not {self.stream_format}")
+        self.recording = recording
+        self.center_freq = recording.center_freq
+        self.position = min(self.position, len(self.recording))
+
+    def close(self):
+        self.stop()
+        for recording in self.recordings:
+            # Every view of the memmap has to go for the file to be unmapped
+            recording.data = recording.samples = recording.native = None
+
+def save_sigmf(path, samples, sample_rate, center_freq=None):
+    """
+    Write samples as a SigMF recording at their own width: complex64 as cf32_le,
+    CS16 as ci16_le and CS8 as ci8. path is the stem or either file of the pair.
+    """
+    path = Path(path)
+    samples = np.asarray(samples)
+    iq_format = {dtype: name for name, dtype in NATIVE_DTYPES.items()}.get(samples.dtype)
+    if iq_format is None:
+        raise ValueError(f"Cannot record {samples.dtype} samples")
+    datatype = {"cf32": "cf32_le", "cs16": "ci16_le", "cs8": "ci8"}[iq_format]
+    samples.tofile(path.with_suffix(".sigmf-data"))
+    capture = {"core:sample_start": 0}
+    if center_freq is not None:
+        capture["core:frequency"] = center_freq
+    meta = {
+        "global": {"core:datatype": datatype, "core:sample_rate": sample_rate, "core:version": "1.0.0"},
+        "captures": [capture],
+        "annotations": [],
+    }
+    with open(path.with_suffix(".sigmf-meta"), "w") as meta_file:
+        json.dump(meta, meta_file, indent=2)
@@ -1,22 +1,15 @@
-
-import numpy as np
-import SoapySDR
-import threading
-from sdrfly.sdr.sdr_base import SDR
-from sdrfly.sdr.sdr_hackrf import HackRFSdr
-from sdrfly.sdr.sdr_sidekiq import SidekiqSdr
+from sdrfly.sdr.registry import load_driver
 
 class SDRGeneric:
+    """
+    Construct an SDR by driver name. Drivers come from sdrfly.sdr.registry and are
+    imported on request, so only the requested one's dependencies are loaded.
+    """
+
     def __new__(cls, sdr_type, *args, **kwargs):
-        if sdr_type == "hackrf":
-            from sdrfly.sdr.sdr_hackrf import HackRFSdr
-            return HackRFSdr(*args, **kwargs)
-        elif sdr_type == "sidekiq":
-            from sdrfly.sdr.sdr_sidekiq import SidekiqSdr
-            return SidekiqSdr(*args, **kwargs)
-        else:
-            raise ValueError(f"Unsupported SDR type: {sdr_type}")
+        return load_driver(sdr_type)(*args, **kwargs)
 
 # Example usage:
 # sdr = SDRGeneric("hackrf", center_freq=915e6, sample_rate=10e6, bandwidth=5e6, gain=20, size=1024)
 # sdr = SDRGeneric("sidekiq", center_freq=915e6, sample_rate=10e6, bandwidth=5e6, gain=20, size=1024)
+# sdr = SDRGeneric("rtlsdr", center_freq=915e6, sample_rate=2.4e6, bandwidth=2.4e6, gain=20, serial="00000001")
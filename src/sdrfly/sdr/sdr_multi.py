@@ -0,0 +1,271 @@
+import numpy as np
+from sdrfly.sdr.ring_buffer import BLOCK_DISCONTINUITY, BLOCK_DTYPE, BLOCK_HAS_TIME, BLOCK_OVERFLOW, Block
+
+# How the streams of different devices are put on one timeline
+ALIGN_MODES = ("samples", "time")
+
+class _Aligner:
+    """
+    Cuts one device's ring blocks into blocks on the common timeline.
+
+    offset maps the common sample index to the device's stream sample index. It is
+    anchored on the device's first block, and again on every gap in time mode or,
+    in samples mode, on gaps whose size the device could not tell.
+    """
+
+    def __init__(self, sdr, reader, align):
+        self.sdr = sdr
+        self.reader = reader
+        self.align = align
+        self.current = None
+        self.current_start = 0
+        self.offset = None
+        # Drop statistics
+        self.overflows = 0
+        self.dropped = 0
+        self.zero_filled = 0
+        self.torn = 0
+
+    @property
+    def current_end(self):
+        return self.current_start + len(self.current.samples)
+
+    def next_block(self):
+        """Read the next ring block, returning False at the end of the stream."""
+        block = self.reader.read()
+        if block is None:
+            return False
+        info = block.info
+        self.current = block
+        self.current_start = int(info["sample_index"])
+        self.dropped += int(info["dropped"])
+        if info["flags"] & BLOCK_OVERFLOW:
+            self.overflows += 1
+        return True
+
+    def anchor_time(self):
+        """Time in ns of the first sample of the current block, or None if it gives no anchor."""
+        info = self.current.info
+        if self.align == "time":
+            return int(info["time_ns"]) if info["flags"] & BLOCK_HAS_TIME else None
+        # Wall clock receive time, less the time it took to fill the block
+        return round(info["rx_time"] * 1e9 - len(self.current.samples) * 1e9 / self.sdr.sample_rate)
+
+    def anchor(self, t0):
+        """Set offset so common index 0 falls at time t0 in ns, if the current block has a time."""
+        block_time = self.anchor_time()
+        if block_time is None:
+            return False
+        self.offset = self.current_start - round((block_time - t0) * self.sdr.sample_rate / 1e9)
+        return True
+
+    def fill(self, out, start, t0):
+        """
+        Fill out with the device's samples from common index start.
+        Returns (flags, zero_filled), or None at the end of the stream.
+        """
+        flags = 0
+        zero_filled = 0
+        done = 0
+        while done < len(out):
+            pos = start + self.offset + done
+            if self.current_end <= pos:
+                if not self.next_block():
+                    return None
+                if self.current.gap:
+                    flags |= BLOCK_DISCONTINUITY
+                    if self.align == "time" or not self.current.info["dropped"]:
+                        # Hardware time says where the block really belongs; without it
+                        # the samples lost are unknown and only the wall clock can say
+                        self.anchor(t0)
+                continue
+            if self.current_start > pos:
+                # Samples lost by the device or the ring
+                count = min(self.current_start - pos, len(out) - done)
+                out[done:done + count] = 0
+                zero_filled += count
+                flags |= BLOCK_DISCONTINUITY
+            else:
+                count = min(self.current_end - pos, len(out) - done)
+                offset = pos - self.current_start
+                out[done:done + count] = self.current.samples[offset:offset + count]
+                if not self.reader.ring.valid(self.current.sequence):
+                    # The writer lapped the block while it was being copied
+                    self.torn += 1
+                    flags |= BLOCK_DISCONTINUITY
+            done += count
+        self.zero_filled += zero_filled
+        return flags, zero_filled
+
+class MultiSDR:
+    """
+    Captures from several receivers at once and hands out time-aligned blocks.
+
+    Every device runs its own capture engine: a thread reading straight into
+    the device's own ring, so readStream calls on different devices proceed in
+    parallel and throughput scales with the number of devices. Iterating over
+    blocks() then cuts the rings into tuples of blocks, one per device, that
+    cover the same span of time; this costs one copy per sample.
+
+    With align="time" the streams are put on one timeline by hardware
+    timestamps, which is only meaningful when the devices share a time base
+    (e.g. a PPS and reference clock, with the hardware time set). With
+    align="samples" each stream is placed once, from the wall clock time of
+    its first block, and followed by sample counter from then on, which lines
+    devices up to within the capture jitter, typically well under a
+    millisecond. Samples a device lost are zero-filled so the tuple stays
+    aligned. A device that reports an overflow without saying how much it lost
+    is placed again from the wall clock. Either way every block of the tuple is
+    marked as a gap, since the devices no longer line up sample for sample.
+
+    The per-device copies run in one loop on the consuming thread. They are
+    memory copies of one block per device, small next to the reads, which run
+    in parallel in the capture threads.
+
+    All devices must run at the same sample rate.
+
+    Parameters:
+        sdrs (list): Opened SDR instances.
+        align (str): "samples" or "time".
+
+    Example:
+        multi = MultiSDR.open([
+            {"type": "hackrf", "serial": "a3c1", "center_freq": 2402e6, ...},
+            {"type": "hackrf", "serial": "77f0", "center_freq": 2426e6, ...},
+            {"type": "hackrf", "serial": "90b2", "center_freq": 2480e6, ...},
+        ])
+        multi.start()
+        for blocks in multi.blocks():
+            ...
+    """
+
+    def __init__(self, sdrs, align="samples"):
+        if align not in ALIGN_MODES:
+            raise ValueError(f"Unknown align {align!r}, expected one of {ALIGN_MODES}")
+        if not sdrs:
+            raise ValueError("MultiSDR needs at least one device")
+        rates = {sdr.sample_rate for sdr in sdrs}
+        if len(rates) != 1:
+            raise ValueError(f"All devices must use the same sample rate, got {sorted(rates)}")
+        self.sdrs = list(sdrs)
+        self.align = align
+        self.sample_rate = self.sdrs[0].sample_rate
+        self._aligners = None
+
+    @classmethod
+    def open(cls, devices, align="samples"):
+        """
+        Open devices described by dicts holding the SDRGeneric type under "type" and the
+        driver's arguments, including serial, and wrap them in a MultiSDR.
+        """
+        from sdrfly.sdr.sdr_generic import SDRGeneric
+        sdrs = []
+        try:
+            for device in devices:
+                device = dict(device)
+                sdrs.append(SDRGeneric(device.pop("type"), **device))
+        except Exception:
+            for sdr in sdrs:
+                sdr.close()
+            raise
+        return cls(sdrs, align)
+
+    def start(self, block_size=None, num_blocks=16):
+        """Start every device's capture thread."""
+        for sdr in self.sdrs:
+            sdr.start(block_size, num_blocks)
+        self._aligners = [_Aligner(sdr, sdr.reader("oldest"), self.align) for sdr in self.sdrs]
+
+    def stop(self):
+        for sdr in self.sdrs:
+            sdr.stop()
+
+    def close(self):
+        for sdr in self.sdrs:
+            sdr.close()
+
+    def blocks(self, block_size=None):
+        """
+        Yield tuples with one Block per device, in the order of sdrs, covering the same
+        block_size samples of time; call start() first.
+
+        Each Block has a fresh array of samples, as complex64 or at native width like the
+        device's ring, and a BLOCK_DTYPE record whose sample_index is the position in the
+        device's own stream and whose time_ns is the common time of the first sample.
+        sequence counts the tuples. dropped is the number of zero-filled samples.
+        Iteration ends when any device's stream ends.
+        """
+        if self._aligners is None:
+            raise RuntimeError("Capture has not been started")
+        aligners = self._aligners
+        block_size = block_size or aligners[0].reader.ring.block_size
+        for aligner in aligners:
+            if aligner.current is None and not aligner.next_block():
+                return
+        # In time mode, a device that has not reported a time yet cannot be placed
+        while self.align == "time":
+            missing = [aligner for aligner in aligners if aligner.anchor_time() is None]
+            if not missing:
+                break
+            for aligner in missing:
+                if not aligner.next_block():
+                    return
+
+        # Common index 0 is the first sample of the first device's block
+        t0 = aligners[0].anchor_time()
+        for aligner in aligners:
+            if aligner.offset is None:
+                aligner.anchor(t0)
+        # Start at the first sample every device has
+        start = max(aligner.current_start - aligner.offset for aligner in aligners)
+        sample_period_ns = 1e9 / self.sample_rate
+
+        sequence = 0
+        while True:
+            blocks = []
+            gap = 0
+            for aligner in aligners:
+                samples = np.empty(block_size, dtype=aligner.reader.ring.blocks.dtype)
+                result = aligner.fill(samples, start, t0)
+                if result is None:
+                    return
+                flags, zero_filled = result
+                info = np.zeros((), dtype=BLOCK_DTYPE)[()]
+                info["sequence"] = sequence
+                info["sample_index"] = start + aligner.offset
+                info["time_ns"] = round(t0 + start * sample_period_ns)
+                info["rx_time"] = aligner.current.info["rx_time"]
+                info["flags"] = flags | (BLOCK_HAS_TIME if self.align == "time" else 0)
+                info["dropped"] = zero_filled
+                info["num_samples"] = block_size
+                gap |= flags & BLOCK_DISCONTINUITY
+                blocks.append(Block(sequence, samples, info))
+            for block in blocks:
+                block.info["flags"] |= gap
+            yield tuple(blocks)
+            start += block_size
+            sequence += 1
+
+    def __iter__(self):
+        return self.blocks()
+
+    def drop_stats(self):
+        """
+        Per-device loss counters since start(), as a list of dicts in the order of sdrs:
+        blocks captured, overflows reported by the device, samples dropped by the device
+        or skipped when the ring was lapped, ring overruns in blocks, blocks torn by the
+        writer while being copied, and samples zero-filled in the aligned output. device
+        is the SDR's name as in its metrics, which tells apart devices opened by serial.
+        """
+        if self._aligners is None:
+            return []
+        return [{
+            "device": aligner.sdr.name,
+            "center_freq": aligner.sdr.center_freq,
+            "blocks": aligner.reader.ring.sequence,
+            "overflows": aligner.overflows,
+            "dropped": aligner.dropped,
+            "overruns": aligner.reader.overruns,
+            "torn": aligner.torn,
+            "zero_filled": aligner.zero_filled,
+        } for aligner in self._aligners]
@@ -1,40 +1,35 @@
 import SoapySDR
-import numpy as np
 import time
-from sdrfly.sdr.sdr_base import SDR
+from sdrfly.sdr.registry import enumerate_devices
+from sdrfly.sdr.sdr_base import SDR, select_device
 
 class RTLSDR(SDR):
-    def __init__(self, center_freq, sample_rate, bandwidth, gain):
-        super().__init__(center_freq, sample_rate, bandwidth, gain)
+    native_format = "CS8"
+
+    def __init__(self, center_freq, sample_rate, bandwidth, gain, stream_format="CF32", serial=None):
+        super().__init__(center_freq, sample_rate, bandwidth, gain, stream_format)
 
         # Find and open the RTL-SDR device
-        results = SoapySDR.Device.enumerate("driver=rtlsdr")
+        results = enumerate_devices("driver=rtlsdr")
         if len(results) == 0:
             raise RuntimeError("No RTL-SDR devices found")
 
-        self.sdr = SoapySDR.Device(results[0])
+        self.sdr = SoapySDR.Device(select_device(results, serial))
+        if serial is not None:
+            self.name = f"{self.name}-{serial}"
         self.sdr.setSampleRate(SoapySDR.SOAPY_SDR_RX, 0, sample_rate)
         self.sdr.setFrequency(SoapySDR.SOAPY_SDR_RX, 0, center_freq)
         self.sdr.setBandwidth(SoapySDR.SOAPY_SDR_RX, 0, bandwidth)
         self.sdr.setGain(SoapySDR.SOAPY_SDR_RX, 0, gain)
         self.rx_stream = None
 
-    def capture_samples(self, num_samples):
+    def _read_into(self, buffer):
         if self.rx_stream is None:
-            self.rx_stream = self.sdr.setupStream(SoapySDR.SOAPY_SDR_RX, SoapySDR.SOAPY_SDR_CF32)
+            self.rx_stream = self.sdr.setupStream(SoapySDR.SOAPY_SDR_RX, self.stream_format)
             self.sdr.activateStream(self.rx_stream)
             time.sleep(0.1)  # Small delay to allow stream to activate
 
-        samples = np.empty(num_samples, dtype=np.complex64)
-        sr = self.sdr.readStream(self.rx_stream, [samples], num_samples)
-
-        # print("readStream returned: {} samples, flags: {}, timeNs: {}".format(sr.ret, sr.flags, sr.timeNs))
-
-        if sr.ret <= 0:
-            print("Requested {} samples but got {} samples.".format(num_samples, sr.ret))
-            return np.array([], dtype=np.complex64)
-
-        return samples[:sr.ret]
+        return self.sdr.readStream(self.rx_stream, [buffer], len(buffer))
 
     def transmit_samples(self, samples):
         raise NotImplementedError("RTL-SDR does not support transmission")
@@ -43,10 +38,14 @@ class RTLSDR(SDR):
         self.sdr.setFrequency(SoapySDR.SOAPY_SDR_RX, 0, freq)
         print("Frequency set to {} MHz".format(freq / 1e6))
 
-    def close(self):
+    def _deactivate_stream(self):
         if self.rx_stream is not None:
             self.sdr.deactivateStream(self.rx_stream)
             self.sdr.closeStream(self.rx_stream)
             self.rx_stream = None
+
+    def close(self):
+        self.stop()
+        self._deactivate_stream()
         self.sdr = None
         print("RTL-SDR closed")
@@ -0,0 +1,319 @@
+from collections import deque
+import numpy as np
+from sdrfly.protocols.ble import ADVERTISING_CHANNELS
+from sdrfly.sdr.sdr_base import SDR, ReadResult, SOAPY_SDR_HAS_TIME
+from sdrfly.synth import NCO, ble_advertising_bits, br_access_code_bits, gfsk_waveform
+
+# Ground truth for every packet put on the air
+TRANSMISSION_DTYPE = np.dtype([
+    ("sample_index", np.int64),
+    ("time", np.float64),
+    ("kind", np.uint8),
+    ("channel", np.uint8),
+    ("address", np.uint64),
+])
+
+KIND_BLE = 0
+KIND_BR = 1
+
+def br_channel_frequency(channel):
+    return 2402e6 + channel * 1e6
+
+class Emitter:
+    """
+    Something on the air. prepare() is called once by the scenario with the
+    emitter's own random generator, retune() after prepare() and on every
+    retune, and render() per block.
+    """
+
+    def prepare(self, scenario, rng):
+        self.scenario = scenario
+
+    def retune(self):
+        """Rebuild whatever depends on the scenario's centre frequency."""
+
+    def render(self, buffer, start, log):
+        """Add this emitter's samples [start, start + len(buffer)) into buffer."""
+        raise NotImplementedError("This method should be implemented by subclasses")
+
+    def _amplitude(self, power_db):
+        return 10 ** (power_db / 20)
+
+    def _offset(self, frequency):
+        """Baseband frequency of an RF frequency, None if it is outside the capture."""
+        offset = frequency - self.scenario.center_freq
+        return offset if abs(offset) < self.scenario.sample_rate / 2 else None
+
+class NoiseEmitter(Emitter):
+    """
+    White Gaussian noise of a given total power in dBFS, read at random offsets from a
+    precomputed table so each block costs one add.
+    """
+
+    def __init__(self, power_db=-30, table_size=1 << 21):
+        self.power_db = power_db
+        self.table_size = table_size
+
+    def prepare(self, scenario, rng):
+        super().prepare(scenario, rng)
+        self.rng = rng
+        noise = rng.standard_normal((self.table_size, 2), dtype=np.float32)
+        noise *= np.float32(self._amplitude(self.power_db) / np.sqrt(2))
+        self.table = noise.view(np.complex64)[:, 0]
+
+    def render(self, buffer, start, log):
+        done = 0
+        while done < len(buffer):
+            offset = int(self.rng.integers(self.table_size))
+            count = min(len(buffer) - done, self.table_size - offset)
+            buffer[done:done + count] += self.table[offset:offset + count]
+            done += count
+
+class ToneEmitter(Emitter):
+    """Continuous wave interferer at an RF frequency, phase continuous across blocks."""
+
+    def __init__(self, frequency, power_db=-20, cfo=0.0):
+        self.frequency = frequency
+        self.power_db = power_db
+        self.cfo = cfo
+
+    def prepare(self, scenario, rng):
+        super().prepare(scenario, rng)
+        self.initial_phase = rng.uniform(0, 2 * np.pi)
+
+    def retune(self):
+        self.offset = self._offset(self.frequency + self.cfo)
+        if self.offset is not None:
+            self.nco = NCO(self.offset, self.scenario.sample_rate, self._amplitude(self.power_db), self.initial_phase)
+        self._next = None
+
+    def render(self, buffer, start, log):
+        if self.offset is None:
+            return
+        # Phase from the absolute sample index after a retune, so it never drifts
+        if start != self._next:
+            self.nco.seek(start)
+        self.nco.add_to(buffer)
+        self._next = start + len(buffer)
+
+class PacketEmitter(Emitter):
+    """
+    Emitter of precomputed packet waveforms at scheduled sample indices.
+
+    Subclasses implement _schedule(), a generator of (sample_index, channel, address)
+    in time order, and _waveform(channel), the packet's template for the current
+    tuning or None if the channel is not captured. The schedule carries on
+    across retunes; only the templates are rebuilt. Packets straddling blocks
+    continue into the next one.
+    """
+
+    kind = None
+
+    def prepare(self, scenario, rng):
+        super().prepare(scenario, rng)
+        self.rng = rng
+        self._events = self._schedule()
+        self._upcoming = next(self._events, None)
+        self._active = []
+
+    def retune(self):
+        # Packets on the air carry on at their channel's new offset
+        self._active = [(sample_index, channel, self._waveform(channel)) for sample_index, channel, _ in self._active]
+        self._active = [packet for packet in self._active if packet[2] is not None]
+
+    def _waveform(self, channel):
+        raise NotImplementedError("This method should be implemented by subclasses")
+
+    def render(self, buffer, start, log):
+        end = start + len(buffer)
+        while self._upcoming is not None and self._upcoming[0] < end:
+            sample_index, channel, address = self._upcoming
+            waveform = self._waveform(channel)
+            if waveform is not None and sample_index + len(waveform) > start:
+                self._active.append((sample_index, channel, waveform))
+                log.append((sample_index, sample_index / self.scenario.sample_rate, self.kind, channel, address))
+            self._upcoming = next(self._events, None)
+        still_active = []
+        for sample_index, channel, waveform in self._active:
+            low, high = max(sample_index, start), min(sample_index + len(waveform), end)
+            if high > low:
+                buffer[low - start:high - start] += waveform[low - sample_index:high - sample_index]
+            if sample_index + len(waveform) > end:
+                still_active.append((sample_index, channel, waveform))
+        self._active = still_active
+
+    def _baseband(self, bits, modulation_index):
+        return gfsk_waveform(bits, self.scenario.sample_rate / 1e6, modulation_index)
+
+    def _template(self, baseband, frequency, power_db, cfo):
+        """Packet baseband shifted to its channel and scaled, None if the channel is not captured."""
+        offset = self._offset(frequency + cfo)
+        if offset is None:
+            return None
+        return baseband * NCO(offset, self.scenario.sample_rate, self._amplitude(power_db)).generate(len(baseband))
+
+class BLEAdvertiser(PacketEmitter):
+    """
+    BLE device sending ADV_NONCONN_IND on each advertising channel in turn every
+    interval plus the 0-10 ms random advDelay.
+
+    Parameters:
+        address (int): AdvA, random by default.
+        interval (float): Advertising interval in seconds.
+        power_db (float): Signal power in dBFS.
+        cfo (float): Carrier frequency offset in Hz.
+        payload_len (int): AdvData bytes, up to 31.
+        channels (tuple): Advertising channels used, in order.
+    """
+
+    kind = KIND_BLE
+    # Gap between the packets of one advertising event
+    CHANNEL_GAP = 150e-6
+
+    def __init__(self, address=None, interval=0.1, power_db=-20, cfo=0.0, payload_len=20, channels=(37, 38, 39)):
+        self.requested_address = address
+        self.address = address
+        self.interval = interval
+        self.power_db = power_db
+        self.cfo = cfo
+        self.payload_len = payload_len
+        self.channels = channels
+
+    def prepare(self, scenario, rng):
+        self.scenario = scenario
+        # Drawn afresh on every reset unless given, so a reset replays the same scenario
+        self.address = int(rng.integers(1 << 48)) if self.requested_address is None else self.requested_address
+        payload = rng.integers(0, 256, self.payload_len, dtype=np.uint8).tobytes()
+        self.basebands = {channel: self._baseband(ble_advertising_bits(self.address, payload, channel), 0.5)
+                          for channel in self.channels}
+        super().prepare(scenario, rng)
+
+    def retune(self):
+        self.templates = {channel: self._template(baseband, ADVERTISING_CHANNELS[channel], self.power_db, self.cfo)
+                          for channel, baseband in self.basebands.items()}
+        super().retune()
+
+    def _waveform(self, channel):
+        return self.templates[channel]
+
+    def _schedule(self):
+        sample_rate = self.scenario.sample_rate
+        packet_len = max(len(baseband) for baseband in self.basebands.values())
+        step = packet_len + int(self.CHANNEL_GAP * sample_rate)
+        event = int(self.rng.uniform(0, self.interval) * sample_rate)
+        while True:
+            for i, channel in enumerate(self.channels):
+                yield event + i * step, channel, self.address
+            event += int((self.interval + self.rng.uniform(0, 10e-3)) * sample_rate)
+
+class BRPiconet(PacketEmitter):
+    """
+    BR/EDR piconet hopping over the 79 channels at 1600 hops per second, putting a
+    packet with its LAP's access code in a fraction of the slots.
+
+    Parameters:
+        lap (int): Lower address part of the master, random by default.
+        duty (float): Fraction of 625 us slots carrying a packet.
+        power_db (float): Signal power in dBFS.
+        cfo (float): Carrier frequency offset in Hz.
+        payload_bits (int): Header and payload bits after the access code.
+    """
+
+    kind = KIND_BR
+    SLOT = 625e-6
+
+    def __init__(self, lap=None, duty=0.5, power_db=-20, cfo=0.0, payload_bits=180):
+        self.requested_lap = lap
+        self.lap = lap
+        self.duty = duty
+        self.power_db = power_db
+        self.cfo = cfo
+        self.payload_bits = payload_bits
+
+    def prepare(self, scenario, rng):
+        self.scenario = scenario
+        # Drawn afresh on every reset unless given, so a reset replays the same scenario
+        self.lap = int(rng.integers(1 << 24)) if self.requested_lap is None else self.requested_lap
+        bits = np.concatenate((br_access_code_bits(self.lap), rng.integers(0, 2, self.payload_bits, dtype=np.uint8)))
+        self.baseband = self._baseband(bits, 0.32)
+        super().prepare(scenario, rng)
+
+    def retune(self):
+        self.templates = {}
+        super().retune()
+
+    def _waveform(self, channel):
+        if channel not in self.templates:
+            self.templates[channel] = self._template(self.baseband, br_channel_frequency(channel), self.power_db, self.cfo)
+        return self.templates[channel]
+
+    def _schedule(self):
+        slot = self.SLOT * self.scenario.sample_rate
+        number = int(self.rng.integers(1000))
+        while True:
+            number += 1
+            if self.rng.random() < self.duty:
+                channel = int(self.rng.integers(79))
+                yield int(number * slot), channel, self.lap
+
+class ScenarioSDR(SDR):
+    """
+    Simulated receiver mixing any number of emitters, for load testing without radios.
+
+    Emitters are NoiseEmitter, ToneEmitter, BLEAdvertiser and BRPiconet, or any
+    Emitter subclass. Packet waveforms are precomputed complex64 templates
+    already shifted to their channel, so a block costs one add per packet in
+    it plus a pass each for noise and tones, and runs well past real time.
+    Everything is driven by one seeded generator, so a scenario replays
+    exactly, and all signals are phase continuous across reads. A retune only
+    rebuilds the emitters' frequency dependent parts: their random streams and
+    schedules carry on, so it costs the same whenever it happens. The last
+    log_size packets put on the air are recorded in transmissions() as ground
+    truth.
+
+    Parameters:
+        center_freq (float): Tuned frequency in Hz.
+        sample_rate (float): Sample rate in Hz.
+        emitters (list): Emitters on the air.
+        seed (int): Seed for the emitters' random choices.
+        log_size (int): Packets kept for transmissions(), 0 to record none.
+    """
+
+    def __init__(self, center_freq=2.441e9, sample_rate=20e6, emitters=(), seed=0, bandwidth=None, gain=0,
+                 log_size=100000):
+        super().__init__(center_freq, sample_rate, bandwidth or sample_rate, gain)
+        self.emitters = list(emitters)
+        self.seed = seed
+        self.log_size = log_size
+        self.reset()
+
+    def reset(self):
+        """Rewind to sample zero with the same seed."""
+        self.position = 0
+        self._log = deque(maxlen=self.log_size)
+        seeds = np.random.SeedSequence(self.seed).spawn(len(self.emitters))
+        for emitter, seed in zip(self.emitters, seeds):
+            emitter.prepare(self, np.random.default_rng(seed))
+            emitter.retune()
+
+    def _read_into(self, buffer):
+        buffer[:] = 0
+        for emitter in self.emitters:
+            emitter.render(buffer, self.position, self._log)
+        time_ns = round(self.position * 1e9 / self.sample_rate)
+        self.position += len(buffer)
+        return ReadResult(len(buffer), SOAPY_SDR_HAS_TIME, time_ns)
+
+    def transmissions(self, since=0.0):
+        """Ground truth TRANSMISSION_DTYPE array of packets started at or after since seconds."""
+        log = np.array(list(self._log), dtype=TRANSMISSION_DTYPE)
+        return log[log["time"] >= since]
+
+    def set_frequency(self, frequency):
+        """Retune, keeping the stream position and the emitters' schedules."""
+        self.center_freq = frequency
+        for emitter in self.emitters:
+            emitter.retune()
+
+    def close(self):
+        self.stop()
@@ -1,28 +1,27 @@
-import numpy as np
-from sdrfly.sdr.sdr_base import SDR
+from sdrfly.sdr.sdr_base import SDR, ReadResult
+from sdrfly.synth import AWGN, NCO
 
 class SimulatedBluetoothSDR(SDR):
     def __init__(self, center_freq, sample_rate, bandwidth, gain):
         super().__init__(center_freq, sample_rate, bandwidth, gain)
+        # 1 MHz Bluetooth-like tone in noise of 0.1 rms per component, as 17 dB SNR
+        self._tone = NCO(1e6, sample_rate)
+        self._noise = AWGN(17.0)
 
-    def capture_samples(self, num_samples):
-        t = np.arange(num_samples) / self.sample_rate
-        freq = 1e6  # 1 MHz Bluetooth-like signal
-        signal = np.exp(2j * np.pi * freq * t)
-        noise = 0.1 * (np.random.randn(num_samples) + 1j * np.random.randn(num_samples))
-        samples = (signal + noise).astype(np.complex64)  # Ensure the samples are complex64
-
+    def _read_into(self, buffer):
+        self._tone.fill(buffer)
+        self._noise.add_to(buffer)
         # Adding a simulated peak
-        peak_position = num_samples // 2
-        samples[peak_position:peak_position + 10] += 2.0
-        return samples
+        peak_position = len(buffer) // 2
+        buffer[peak_position:peak_position + 10] += 2.0
+        return ReadResult(len(buffer))
 
     def set_frequency(self, frequency):
         self.center_freq = frequency
 
-    def transmit_samples(self, samples):
-        # Simulate transmission by printing a message
-        print(f"Simulated transmission of {len(samples)} samples")
+    def _write_from(self, buffer, flags=0):
+        # Simulated transmission accepts every sample at once
+        return ReadResult(len(buffer))
 
     def close(self):
-        pass  # No resources to release in simulation
+        self.stop()  # No device resources to release in simulation
@@ -0,0 +1,223 @@
+import queue
+import threading
+import numpy as np
+
+# SoapySDR stream flags and status codes used by the transmit path
+SOAPY_SDR_END_BURST = 1 << 1
+SOAPY_SDR_TIMEOUT = -1
+SOAPY_SDR_UNDERFLOW = -7
+
+class CyclicSource:
+    """
+    Chunks of a burst, played once or looped gaplessly, optionally for exactly
+    num_samples samples (which may end mid-burst).
+    """
+
+    def __init__(self, burst, num_samples=None, loop=False):
+        self.burst = np.asarray(burst, dtype=np.complex64).ravel()
+        if len(self.burst) == 0:
+            raise ValueError("Cannot transmit an empty burst")
+        if num_samples is None and not loop:
+            num_samples = len(self.burst)
+        elif num_samples is not None and not loop:
+            num_samples = min(num_samples, len(self.burst))
+        # Samples left to produce, None to loop until stopped
+        self.remaining = num_samples
+        self.position = 0
+
+    def fill(self, out):
+        """Fill out from the burst; returns the count, short only at the end."""
+        want = len(out) if self.remaining is None else min(len(out), self.remaining)
+        burst = self.burst
+        done = 0
+        while done < want:
+            count = min(want - done, len(burst) - self.position)
+            out[done:done + count] = burst[self.position:self.position + count]
+            self.position = (self.position + count) % len(burst)
+            done += count
+        if self.remaining is not None:
+            self.remaining -= done
+        return done
+
+class GeneratorSource:
+    """Chunks of the arrays an iterable yields, of any length, up to num_samples in total."""
+
+    def __init__(self, iterable, num_samples=None):
+        self.iterator = iter(iterable)
+        self.pending = np.zeros(0, dtype=np.complex64)
+        self.remaining = num_samples
+
+    def fill(self, out):
+        want = len(out) if self.remaining is None else min(len(out), self.remaining)
+        done = 0
+        while done < want:
+            if not len(self.pending):
+                try:
+                    self.pending = np.asarray(next(self.iterator)).ravel()
+                except StopIteration:
+                    break
+                continue
+            count = min(want - done, len(self.pending))
+            out[done:done + count] = self.pending[:count]
+            self.pending = self.pending[count:]
+            done += count
+        if self.remaining is not None:
+            self.remaining -= done
+        return done
+
+class SynthSource:
+    """Chunks of a sdrfly.synth generator, endless or up to num_samples in total."""
+
+    def __init__(self, generator, num_samples=None):
+        self.generator = generator
+        self.remaining = num_samples
+
+    def fill(self, out):
+        want = len(out) if self.remaining is None else min(len(out), self.remaining)
+        self.generator.fill(out[:want])
+        if self.remaining is not None:
+            self.remaining -= want
+        return want
+
+def as_source(source, num_samples=None, loop=False):
+    """CyclicSource for arrays, SynthSource for synth generators, GeneratorSource for other iterables."""
+    if isinstance(source, (np.ndarray, list, tuple)):
+        return CyclicSource(source, num_samples, loop)
+    if hasattr(source, "fill"):
+        return SynthSource(source, num_samples)
+    if loop:
+        raise ValueError("Only array bursts can be looped; loop inside the generator instead")
+    return GeneratorSource(source, num_samples)
+
+class Transmission:
+    """
+    One transmission in progress, streamed in chunks through a double buffer.
+
+    A producer thread fills one preallocated chunk from the source while a
+    writer thread sends the other, so memory is two chunks whatever the
+    duration, and a slow generator only delays the chunk after the one on the
+    air. The last chunk goes out with END_BURST, a burst cut short by stop()
+    or an error is ended with an empty END_BURST write, and the device's
+    transmit stream is closed when the transmission ends.
+
+    Underflows are counted two ways: underflows are reported by the device,
+    starved counts chunks the writer had to wait for because the source was
+    late. sent is the number of samples the device accepted and error the
+    exception that ended the transmission, if any.
+    """
+
+    # Seconds between checks for stop() while waiting on a queue
+    POLL_INTERVAL = 0.1
+
+    def __init__(self, sdr, source, chunk_size):
+        self.sdr = sdr
+        self.source = source
+        self.chunk_size = chunk_size
+        self.sent = 0
+        self.underflows = 0
+        self.starved = 0
+        self.error = None
+        # A burst has been started on the device and not yet ended with END_BURST
+        self._burst_open = False
+        self._free = queue.Queue()
+        self._filled = queue.Queue()
+        for _ in range(2):
+            self._free.put(np.empty(chunk_size, dtype=np.complex64))
+        self._stopping = threading.Event()
+        self._done = threading.Event()
+        self._producer = threading.Thread(target=self._produce, daemon=True)
+        self._writer = threading.Thread(target=self._write, daemon=True)
+        self._producer.start()
+        self._writer.start()
+
+    @property
+    def running(self):
+        return not self._done.is_set()
+
+    def _get(self, chunks):
+        """Next item from chunks, or None once stop() is called."""
+        while not self._stopping.is_set():
+            try:
+                return chunks.get(timeout=self.POLL_INTERVAL)
+            except queue.Empty:
+                continue
+        return None
+
+    def _produce(self):
+        try:
+            while True:
+                buffer = self._get(self._free)
+                if buffer is None:
+                    return
+                count = self.source.fill(buffer)
+                self._filled.put((buffer, count))
+                if count < len(buffer):
+                    return
+        except Exception as error:
+            self.error = error
+            self._stopping.set()
+
+    def _write(self):
+        first = True
+        try:
+            while True:
+                try:
+                    item = self._filled.get_nowait()
+                except queue.Empty:
+                    if not first:
+                        self.starved += 1
+                    item = self._get(self._filled)
+                    if item is None:
+                        return
+                first = False
+                buffer, count = item
+                last = count < len(buffer)
+                self._send(buffer, count, last)
+                self._free.put(buffer)
+                if last or self._stopping.is_set():
+                    return
+        except Exception as error:
+            self.error = error
+        finally:
+            self._stopping.set()
+            try:
+                if self._burst_open:
+                    # Stopped or failed mid-burst: end it so the device does not wait for more
+                    self.sdr._write_from(np.zeros(0, dtype=np.complex64), SOAPY_SDR_END_BURST)
+                    self._burst_open = False
+            except Exception as error:
+                self.error = self.error or error
+            try:
+                self.sdr._close_tx_stream()
+            except Exception as error:
+                self.error = self.error or error
+            self._done.set()
+
+    def _send(self, buffer, count, last):
+        written = 0
+        while written < count and not self._stopping.is_set():
+            flags = SOAPY_SDR_END_BURST if last else 0
+            result = self.sdr._write_from(buffer[written:count], flags)
+            self._burst_open = not last
+            if result.ret == SOAPY_SDR_TIMEOUT:
+                continue
+            if result.ret < 0:
+                raise RuntimeError(f"writeStream failed with {result.ret}")
+            written += result.ret
+        if last and count == 0:
+            # Nothing left in the final chunk, but the burst still needs its end
+            self.sdr._write_from(buffer[:0], SOAPY_SDR_END_BURST)
+            self._burst_open = False
+        self.sdr._record_write(count, written)
+        self.sent += written
+        if self.sdr._read_tx_status() == SOAPY_SDR_UNDERFLOW:
+            self.underflows += 1
+            self.sdr.metrics.tx_underflows.inc()
+
+    def stop(self):
+        """Stop after the current write, ending the burst with END_BURST."""
+        self._stopping.set()
+
+    def wait(self, timeout=None):
+        """Wait for the transmission to end; returns False on timeout."""
+        return self._done.wait(timeout)
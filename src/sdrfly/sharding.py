@@ -0,0 +1,220 @@
+import multiprocessing
+import os
+import queue
+import time
+import traceback
+from multiprocessing import shared_memory
+import numpy as np
+from sdrfly.correlator import SyncWordCorrelator
+from sdrfly.demodulators.demodulator_numpy import GFSKDemodNumPy
+from sdrfly.demodulators.gfsk_slicer import GFSKSlicer
+
+class GFSKStage:
+    """
+    Demodulates and slices one shard of channels, returning packed bits.
+
+    Stages are built inside each worker from the channelizer rows it owns and keep
+    their filter and timing state across blocks. Subclasses decode the bits.
+    """
+
+    def __init__(self, rows, samples_per_symbol, kf=0.5, bt=0.5):
+        self.rows = np.asarray(rows)
+        self.demodulator = GFSKDemodNumPy(kf)
+        self.slicer = GFSKSlicer(samples_per_symbol, bt)
+
+    def bits(self, samples):
+        return self.slicer.slice(self.demodulator.demodulate(samples))
+
+    def __call__(self, samples):
+        return self.bits(samples)
+
+class CorrelatorStage(GFSKStage):
+    """GFSKStage followed by SyncWordCorrelator, reporting channelizer rows as channels."""
+
+    def __init__(self, rows, samples_per_symbol, sync_words, length=64, max_errors=0, labels=None, **kwargs):
+        super().__init__(rows, samples_per_symbol, **kwargs)
+        self.correlator = SyncWordCorrelator(sync_words, length, max_errors, labels)
+
+    def __call__(self, samples):
+        matches = self.correlator.correlate(self.bits(samples))
+        matches["channel"] = self.rows[matches["channel"]]
+        return matches
+
+class BLEStage(GFSKStage):
+    """
+    GFSKStage followed by BLEAdvertisingDecoder.
+
+    channels gives the BLE channel index of every channelizer row, not only this shard's.
+    """
+
+    def __init__(self, rows, samples_per_symbol, channels, kf=0.5, bt=0.5, **decoder_args):
+        from sdrfly.protocols.ble import BLEAdvertisingDecoder
+
+        super().__init__(rows, samples_per_symbol, kf, bt)
+        self.decoder = BLEAdvertisingDecoder(np.asarray(channels)[self.rows], **decoder_args)
+
+    def __call__(self, samples):
+        return self.decoder.decode(self.bits(samples))
+
+def _worker(shm_name, shape, rows, stage_factory, tasks, results):
+    first, last = rows[0], rows[-1] + 1
+    samples = None
+    try:
+        shm = shared_memory.SharedMemory(name=shm_name)
+    except Exception:
+        results.put((None, first, traceback.format_exc()))
+        return
+    try:
+        samples = np.ndarray(shape, dtype=np.complex64, buffer=shm.buf)
+        try:
+            stage = stage_factory(rows)
+        except Exception:
+            results.put((None, first, traceback.format_exc()))
+            return
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            block_id, slot, num_samples = task
+            try:
+                results.put((block_id, first, stage(samples[slot, first:last, :num_samples])))
+            except Exception:
+                results.put((block_id, first, traceback.format_exc()))
+                break
+    finally:
+        # The view must go before the mapping can be closed
+        samples = None
+        shm.close()
+
+class ShardedPipeline:
+    """
+    Runs per-channel demodulation and decoding across a persistent process pool.
+
+    Channelizer output is copied once into a ring of slots in a shared memory
+    block; each worker owns a fixed, contiguous range of channel rows and reads
+    them in place, so no sample data is pickled. Workers are told which slot to
+    read over their own queue and send back only their decoded results, which
+    are concatenated per block in submission order. With num_slots slots the
+    workers can be that many blocks behind the producer.
+
+    Parameters:
+        num_channels (int): Rows in each channelizer block.
+        block_len (int): Largest number of samples per row in a block.
+        stage_factory (callable): Called in each worker with its rows, e.g.
+            functools.partial(CorrelatorStage, samples_per_symbol=2, sync_words=...);
+            returns a callable mapping a (len(rows), n) block to a result array.
+        num_workers (int): Worker processes, at most num_channels. Defaults to the CPU count.
+        num_slots (int): Blocks in flight.
+        start_method (str): multiprocessing start method. Defaults to forkserver, or
+            spawn where that is missing: forking a process whose channelizer has
+            started numba's thread pool can deadlock, so stage_factory must pickle.
+    """
+
+    # Seconds between checks that the workers are still alive while waiting for results
+    POLL_INTERVAL = 0.5
+
+    def __init__(self, num_channels, block_len, stage_factory, num_workers=None, num_slots=4, start_method=None):
+        num_workers = min(num_workers or os.cpu_count() or 1, num_channels)
+        self.num_channels = num_channels
+        self.block_len = block_len
+        self.num_slots = num_slots
+        shape = (num_slots, num_channels, block_len)
+        self._shm = shared_memory.SharedMemory(create=True, size=int(np.prod(shape)) * np.dtype(np.complex64).itemsize)
+        self._samples = np.ndarray(shape, dtype=np.complex64, buffer=self._shm.buf)
+
+        if start_method is None:
+            start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        context = multiprocessing.get_context(start_method)
+        self._results = context.Queue()
+        self._tasks = []
+        self._workers = []
+        for rows in np.array_split(np.arange(num_channels), num_workers):
+            tasks = context.Queue()
+            worker = context.Process(target=_worker, args=(self._shm.name, shape, rows, stage_factory, tasks, self._results),
+                                     daemon=True)
+            worker.start()
+            self._tasks.append(tasks)
+            self._workers.append(worker)
+
+        self._next_block = 0
+        self._next_result = 0
+        # block_id -> {first row: result} while workers report
+        self._partial = {}
+        self._closed = False
+
+    @property
+    def in_flight(self):
+        return self._next_block - self._next_result
+
+    def submit(self, samples, timeout=None):
+        """
+        Queue a (num_channels, n) block, n <= block_len. Blocks while every slot is
+        in use, returning finished blocks' results collected in the meantime.
+        """
+        samples = np.asarray(samples)
+        if samples.shape[0] != self.num_channels or samples.shape[1] > self.block_len:
+            raise ValueError(f"Expected at most ({self.num_channels}, {self.block_len}) samples, got {samples.shape}")
+        finished = []
+        while self.in_flight >= self.num_slots:
+            finished.append(self._collect(timeout))
+        slot = self._next_block % self.num_slots
+        self._samples[slot, :, :samples.shape[1]] = samples
+        for tasks in self._tasks:
+            tasks.put((self._next_block, slot, samples.shape[1]))
+        self._next_block += 1
+        return finished
+
+    def get(self, timeout=None):
+        """Results of the oldest outstanding block, concatenated across workers."""
+        if self.in_flight == 0:
+            raise queue.Empty("No blocks in flight")
+        return self._collect(timeout)
+
+    def drain(self, timeout=None):
+        """Results of every outstanding block, oldest first."""
+        return [self._collect(timeout) for _ in range(self.in_flight)]
+
+    def _collect(self, timeout):
+        block_id = self._next_result
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while len(self._partial.get(block_id, ())) < len(self._workers):
+            wait = self.POLL_INTERVAL if deadline is None else min(self.POLL_INTERVAL, deadline - time.monotonic())
+            try:
+                result_block, first, result = self._results.get(timeout=max(wait, 0))
+            except queue.Empty:
+                self._check_workers()
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise
+                continue
+            if isinstance(result, str):
+                raise RuntimeError(f"Worker for rows from {first} failed:\n{result}")
+            self._partial.setdefault(result_block, {})[first] = result
+        parts = self._partial.pop(block_id)
+        self._next_result += 1
+        parts = [parts[first] for first in sorted(parts) if parts[first] is not None]
+        return np.concatenate(parts) if parts else None
+
+    def _check_workers(self):
+        for worker in self._workers:
+            if not worker.is_alive():
+                raise RuntimeError(f"Worker process {worker.pid} exited with code {worker.exitcode}")
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        for tasks in self._tasks:
+            tasks.put(None)
+        for worker in self._workers:
+            worker.join(timeout=5)
+            if worker.is_alive():
+                worker.terminate()
+        del self._samples
+        self._shm.close()
+        self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
@@ -0,0 +1,229 @@
+import threading
+import numpy as np
+
+# Per-channel hit counts saturate here rather than wrap
+MAX_CHANNEL_HITS = np.iinfo(np.uint16).max
+
+SIGHTING_DTYPE = np.dtype([
+    ("key", np.uint64),
+    ("first_seen", np.float64),
+    ("last_seen", np.float64),
+    ("count", np.uint64),
+    ("rssi", np.float32),
+])
+
+class SightingTable:
+    """
+    In-memory table of devices seen, keyed by LAP or advertiser address.
+
+    Rows live in preallocated NumPy columns with a dict from key to row, so a
+    batch of sightings costs one dict lookup per distinct key and a handful of
+    vectorized scatters, however many sightings share a key. Each row tracks
+    first and last seen, a sighting count, hits per channel and an exponentially
+    weighted RSSI average. Columns start small and double as rows are added,
+    and hits per channel are uint16 counts saturating at MAX_CHANNEL_HITS, so a
+    full table of a million rows over 40 channels holds 80 MB of them. Memory is bounded by a TTL and a row limit: update()
+    expires rows older than ttl before the newest sighting, sweeping at most
+    every ttl * EXPIRE_FRACTION seconds of sighting time, and once full the
+    least recently seen rows are evicted in bulk. All access goes
+    through one lock held only for array work, so snapshots and queries can
+    run from other threads while ingestion continues.
+
+    Parameters:
+        num_channels (int): Channel indices reported by update() are below this.
+        max_entries (int): Rows kept before the least recently seen are evicted.
+        ttl (float): Seconds after last sighting before a row expires, None to keep rows.
+        rssi_alpha (float): Weight of each new RSSI sample in the average.
+    """
+
+    # Fraction of rows dropped when the table is full, so eviction is amortized
+    EVICT_FRACTION = 0.125
+    # Fraction of the TTL between expiry sweeps in update(), so expiry is amortized too
+    EXPIRE_FRACTION = 0.125
+
+    def __init__(self, num_channels=40, max_entries=1_000_000, ttl=None, rssi_alpha=0.125):
+        self.num_channels = num_channels
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.rssi_alpha = rssi_alpha
+        self._lock = threading.Lock()
+        self._index = {}
+        self._size = 0
+        self._last_expiry = -np.inf
+        self._allocate(1024)
+
+    def _allocate(self, capacity):
+        self._rows = np.zeros(capacity, dtype=SIGHTING_DTYPE)
+        self._channel_hits = np.zeros((capacity, self.num_channels), dtype=np.uint16)
+
+    def _grow(self, needed):
+        capacity = len(self._rows)
+        while capacity < needed:
+            capacity *= 2
+        rows, channel_hits = self._rows[:self._size], self._channel_hits[:self._size]
+        self._allocate(capacity)
+        self._rows[:self._size] = rows
+        self._channel_hits[:self._size] = channel_hits
+
+    def _keep(self, keep):
+        # Compact the surviving rows to the front and rebuild the index
+        size = int(keep.sum())
+        self._rows[:size] = self._rows[:self._size][keep]
+        self._channel_hits[:size] = self._channel_hits[:self._size][keep]
+        self._rows[size:self._size] = 0
+        self._channel_hits[size:self._size] = 0
+        self._size = size
+        self._index = dict(zip(self._rows["key"][:size].tolist(), range(size)))
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, key):
+        return int(key) in self._index
+
+    def update(self, keys, timestamps, channels=None, rssi=None):
+        """
+        Record a batch of sightings.
+
+        Parameters:
+            keys (ndarray): LAP or address of each sighting.
+            timestamps (ndarray): Time of each sighting in seconds.
+            channels (ndarray): Optional channel index of each sighting.
+            rssi (ndarray): Optional signal level of each sighting, NaN where unknown.
+        """
+        keys = np.atleast_1d(np.asarray(keys, dtype=np.uint64))
+        if len(keys) == 0:
+            return
+        timestamps = np.broadcast_to(np.asarray(timestamps, dtype=np.float64), keys.shape)
+        # Sort by key then time so each key's sightings are one contiguous, ordered run
+        order = np.lexsort((timestamps, keys))
+        keys, timestamps = keys[order], timestamps[order]
+        unique_keys, starts, counts = np.unique(keys, return_index=True, return_counts=True)
+        ends = starts + counts - 1
+
+        with self._lock:
+            new_keys = [key for key in unique_keys.tolist() if key not in self._index]
+            if new_keys:
+                if self._size + len(new_keys) > len(self._rows):
+                    self._grow(self._size + len(new_keys))
+                first_new = self._size
+                self._index.update(zip(new_keys, range(first_new, first_new + len(new_keys))))
+                new_rows = self._rows[first_new:first_new + len(new_keys)]
+                new_rows["key"] = new_keys
+                new_rows["first_seen"] = np.inf
+                new_rows["rssi"] = np.nan
+                self._size += len(new_keys)
+            rows = np.fromiter(map(self._index.__getitem__, unique_keys.tolist()), dtype=np.intp, count=len(unique_keys))
+
+            table = self._rows
+            table["first_seen"][rows] = np.minimum(table["first_seen"][rows], timestamps[starts])
+            table["last_seen"][rows] = np.maximum(table["last_seen"][rows], timestamps[ends])
+            table["count"][rows] += counts.astype(np.uint64)
+            sighting_rows = np.repeat(rows, counts)
+            if channels is not None:
+                channels = np.broadcast_to(np.asarray(channels, dtype=np.intp), order.shape)[order]
+                self._add_channel_hits(sighting_rows, channels)
+            if rssi is not None:
+                rssi = np.broadcast_to(np.asarray(rssi, dtype=np.float32), order.shape)[order]
+                self._update_rssi(sighting_rows, rssi)
+            if self.ttl is not None:
+                now = float(timestamps[ends].max())
+                if now - self._last_expiry >= self.ttl * self.EXPIRE_FRACTION:
+                    self._expire(now)
+            if self._size > self.max_entries:
+                self._evict()
+
+    def _add_channel_hits(self, sighting_rows, channels):
+        # One saturating add per distinct (row, channel) pair
+        cells, hits = np.unique(sighting_rows * self.num_channels + channels, return_counts=True)
+        flat = self._channel_hits.reshape(-1)
+        flat[cells] = np.minimum(flat[cells] + hits, MAX_CHANNEL_HITS)
+
+    def _update_rssi(self, sighting_rows, rssi):
+        # EWMA over each key's run in closed form: after k samples the old value is
+        # weighted by (1 - a)^k and sample j by a(1 - a)^(k - 1 - j)
+        valid = np.isfinite(rssi)
+        sighting_rows, rssi = sighting_rows[valid], rssi[valid].astype(np.float64)
+        if len(rssi) == 0:
+            return
+        # Each row's samples are one contiguous run
+        starts = np.flatnonzero(np.diff(sighting_rows, prepend=-1))
+        counts = np.diff(starts, append=len(rssi))
+        rows = sighting_rows[starts]
+        position = np.arange(len(rssi)) - np.repeat(starts, counts)
+        decay = 1 - self.rssi_alpha
+        weights = self.rssi_alpha * decay ** (np.repeat(counts, counts) - 1 - position)
+        previous = self._rows["rssi"][rows].astype(np.float64)
+        # A row's first sample seeds the average
+        previous = np.where(np.isnan(previous), rssi[starts], previous)
+        self._rows["rssi"][rows] = decay ** counts * previous + np.add.reduceat(weights * rssi, starts)
+
+    def _evict(self):
+        # Drop the least recently seen rows, at least EVICT_FRACTION of the table
+        num_evicted = min(self._size, max(self._size - self.max_entries, int(self.max_entries * self.EVICT_FRACTION)))
+        last_seen = self._rows["last_seen"][:self._size]
+        keep = np.ones(self._size, dtype=bool)
+        keep[np.argpartition(last_seen, num_evicted - 1)[:num_evicted]] = False
+        self._keep(keep)
+
+    def expire(self, now):
+        """Remove rows not seen within ttl of now, returning how many were removed."""
+        if self.ttl is None:
+            return 0
+        with self._lock:
+            return self._expire(now)
+
+    def _expire(self, now):
+        self._last_expiry = now
+        keep = self._rows["last_seen"][:self._size] >= now - self.ttl
+        removed = self._size - int(keep.sum())
+        if removed:
+            self._keep(keep)
+        return removed
+
+    def snapshot(self, seen_since=None, seen_until=None):
+        """
+        Copy of the table, or of the rows last seen in [seen_since, seen_until].
+
+        Returns:
+            tuple: (rows, channel_hits) with rows a SIGHTING_DTYPE array and channel_hits
+            (len(rows), num_channels) uint16.
+        """
+        with self._lock:
+            last_seen = self._rows["last_seen"][:self._size]
+            selected = np.ones(self._size, dtype=bool)
+            if seen_since is not None:
+                selected &= last_seen >= seen_since
+            if seen_until is not None:
+                selected &= last_seen <= seen_until
+            return self._rows[:self._size][selected], self._channel_hits[:self._size][selected]
+
+    def recent(self, window, now):
+        """Rows seen in the last window seconds before now."""
+        return self.snapshot(seen_since=now - window)[0]
+
+    def lookup(self, key):
+        """Row and channel hits for a key, or None if it is not in the table."""
+        with self._lock:
+            row = self._index.get(int(key))
+            if row is None:
+                return None
+            return self._rows[row].copy(), self._channel_hits[row].copy()
+
+    def update_packets(self, packets, crc_only=True):
+        """
+        Record BLE advertising packets from BLEAdvertisingDecoder, keyed by AdvA.
+        Packets without an AdvA in place, such as ADV_EXT_IND, are skipped.
+        """
+        if crc_only:
+            packets = packets[packets["crc_ok"]]
+        packets = packets[packets["adv_address"] != 0]
+        self.update(packets["adv_address"], packets["timestamp"], packets["channel"], packets["rssi"])
+
+    def update_laps(self, laps, timestamp, channel=None, rssi=None):
+        """
+        Record BR/EDR LAPs, as integers or "AB:CD:EF" strings as returned by
+        extract_lap_and_access_code.
+        """
+        laps = [int(lap.replace(":", ""), 16) if isinstance(lap, str) else int(lap) for lap in laps]
+        self.update(laps, timestamp, channel, rssi)
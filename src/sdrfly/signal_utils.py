@@ -1,12 +1,9 @@
-import numpy as np
+from sdrfly.synth import NCO, MultiTone
 
 def generate_cw_tone(freq, sample_rate, num_samples):
-    t = np.arange(num_samples) / sample_rate
-    signal = np.exp(2j * np.pi * freq * t)
-    return signal
+    """Complex64 unit tone; use synth.NCO directly to carry the phase across calls."""
+    return NCO(freq, sample_rate).generate(num_samples)
 
 def generate_two_cw_tones(freq1, freq2, sample_rate, num_samples):
-    t = np.arange(num_samples) / sample_rate
-    signal1 = np.exp(2j * np.pi * freq1 * t)
-    signal2 = np.exp(2j * np.pi * freq2 * t)
-    return signal1 + signal2
+    """Complex64 sum of two unit tones; use synth.MultiTone directly to carry the phase across calls."""
+    return MultiTone([freq1, freq2], sample_rate).generate(num_samples)
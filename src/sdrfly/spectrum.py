@@ -0,0 +1,216 @@
+import time
+from functools import lru_cache
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from sdrfly.metrics import stage_metrics
+
+SPECTRUM_METRICS = stage_metrics("sdrfly_spectrum", "spectrum engine")
+
+AVERAGING_MODES = ("linear", "ewma", "max_hold", "min_hold")
+
+# Windows numpy builds itself; anything else goes to scipy.signal.get_window
+_NUMPY_WINDOWS = {
+    "hann": np.hanning,
+    "hamming": np.hamming,
+    "blackman": np.blackman,
+    "rectangular": np.ones,
+}
+
+# Samples transformed per FFT call, bounding the scratch buffers whatever the input length
+BATCH_SAMPLES = 1 << 18
+
+@lru_cache(maxsize=None)
+def get_window(window, fft_size):
+    """Read-only float32 window of fft_size points, cached per name and size."""
+    if window is None or window in _NUMPY_WINDOWS:
+        values = _NUMPY_WINDOWS[window or "rectangular"](fft_size)
+    else:
+        from scipy.signal import get_window as scipy_window
+        values = scipy_window(window, fft_size, fftbins=True)
+    values = np.asarray(values, dtype=np.float32)
+    values.flags.writeable = False
+    return values
+
+class SpectrumEngine:
+    """
+    Windowed, averaged power spectra of complex samples, shared by every front end.
+
+    Samples are cut into fft_size frames overlapping by overlap, windowed
+    into a preallocated complex64 batch and transformed in place by scipy.fft
+    with workers threads; scipy keeps the plan for the size cached between
+    calls. Power is computed in float32 in place and averaged per averaging
+    mode: linear (Welch mean over an output frame's FFTs), ewma
+    (exponentially weighted with weight alpha on the newest FFT), max_hold or
+    min_hold (held until reset()). Spectra are in dB relative to full scale, so
+    a full scale tone reads 0 dB, and centred like freqs.
+
+    push() takes streaming blocks of any length and returns the output frames
+    they complete. An output frame covers num_average FFTs, or with frame_rate
+    set, 1 / frame_rate seconds of signal of which at most num_average FFTs are
+    computed and the rest skipped, so the CPU cost is frame_rate * num_average
+    FFTs per second whatever the sample rate. compute() averages a whole
+    buffer at once. An engine is not meant to be shared between threads.
+
+    Parameters:
+        sample_rate (float): Sample rate in Hz.
+        fft_size (int): FFT bins.
+        window (str): Window name, e.g. "hann", "blackman" or "rectangular".
+        overlap (float): Fraction of a frame shared with the next, in [0, 1).
+        averaging (str): One of AVERAGING_MODES.
+        num_average (int): FFTs averaged per output frame, or the most per output
+            frame with frame_rate.
+        frame_rate (float): Output frames per second of signal, None for one per
+            num_average FFTs.
+        alpha (float): Weight of the newest FFT with ewma averaging.
+        center_freq (float): Added to freqs, in Hz.
+        workers (int): FFT threads, -1 for one per core.
+        name (str): Label of the engine's metrics.
+    """
+
+    def __init__(self, sample_rate, fft_size=1024, window="hann", overlap=0.5, averaging="linear", num_average=16,
+                 frame_rate=None, alpha=0.1, center_freq=0.0, workers=-1, name="spectrum"):
+        if averaging not in AVERAGING_MODES:
+            raise ValueError(f"averaging must be one of {AVERAGING_MODES}")
+        if not 0 <= overlap < 1:
+            raise ValueError("overlap must be in [0, 1)")
+        from scipy import fft as sp_fft
+
+        self._fft = sp_fft.fft
+        self.sample_rate = sample_rate
+        self.fft_size = fft_size
+        self.window = get_window(window, fft_size)
+        self.hop = max(1, int(round(fft_size * (1 - overlap))))
+        self.averaging = averaging
+        self.num_average = max(1, num_average)
+        self.alpha = np.float32(alpha)
+        self.center_freq = center_freq
+        self.workers = workers
+        self.metrics = SPECTRUM_METRICS.labels(name)
+        if frame_rate is None:
+            self.frames_per_output = self.num_average
+        else:
+            self.frames_per_output = max(1, int(round(sample_rate / frame_rate / self.hop)))
+        # Power relative to full scale, so a full scale tone reads 0 dB
+        self.scale = np.float32(1.0 / np.sum(self.window, dtype=np.float64) ** 2)
+
+        batch = max(1, BATCH_SAMPLES // fft_size)
+        self._batch = np.empty((batch, fft_size), dtype=np.complex64)
+        self._squares = np.empty((batch, 2 * fft_size), dtype=np.float32)
+        self._power = np.empty((batch, fft_size), dtype=np.float32)
+        self.reset()
+
+    @property
+    def freqs(self):
+        """Frequency of each bin of a spectrum in Hz, centred, plus center_freq."""
+        return np.fft.fftshift(np.fft.fftfreq(self.fft_size, 1 / self.sample_rate)) + self.center_freq
+
+    def reset(self):
+        """Drop buffered samples and averaging state, including held maxima and minima."""
+        self._pending = np.zeros(0, dtype=np.complex64)
+        self._state = None
+        self._count = 0
+        # FFT frames into the current output frame, computed or skipped
+        self._position = 0
+        self.latest = None
+
+    def _transform(self, frames):
+        """Float32 power of each row of frames, unscaled, in a scratch buffer."""
+        count = len(frames)
+        batch = self._batch[:count]
+        np.multiply(frames, self.window, out=batch)
+        spectra = self._fft(batch, axis=1, overwrite_x=True, workers=self.workers)
+        squares = self._squares[:count]
+        np.square(spectra.view(np.float32), out=squares)
+        power = self._power[:count]
+        np.add(squares[:, 0::2], squares[:, 1::2], out=power)
+        return power
+
+    def _accumulate(self, frames):
+        """Fold the power of frames into the averaging state, in batches."""
+        batch = len(self._batch)
+        for start in range(0, len(frames), batch):
+            power = self._transform(frames[start:start + batch])
+            if self._state is None:
+                self._state = power[0].copy()
+                self._count = 1
+                power = power[1:]
+            if self.averaging == "linear":
+                self._state += power.sum(axis=0)
+            elif self.averaging == "ewma":
+                for row in power:
+                    self._state += self.alpha * (row - self._state)
+            elif self.averaging == "max_hold" and len(power):
+                np.maximum(self._state, power.max(axis=0), out=self._state)
+            elif self.averaging == "min_hold" and len(power):
+                np.minimum(self._state, power.min(axis=0), out=self._state)
+            self._count += len(power)
+
+    def _spectrum(self, db=True):
+        """The averaging state as a centred spectrum."""
+        spectrum = np.fft.fftshift(self._state) * self.scale
+        if self.averaging == "linear":
+            spectrum /= self._count
+        if db:
+            spectrum += np.float32(1e-20)
+            np.log10(spectrum, out=spectrum)
+            spectrum *= np.float32(10)
+        return spectrum
+
+    def _frames(self, samples):
+        """Strided view of the complete frames of samples."""
+        if len(samples) < self.fft_size:
+            return samples[:0].reshape(0, self.fft_size)
+        return sliding_window_view(samples, self.fft_size)[::self.hop]
+
+    def compute(self, samples, db=True):
+        """
+        Spectrum averaged over every complete frame of samples, leaving the
+        streaming state untouched.
+
+        Returns:
+            numpy.ndarray: float32 spectrum in dB, or linear power with db=False.
+        """
+        samples = np.asarray(samples)
+        frames = self._frames(samples)
+        if not len(frames):
+            raise ValueError(f"Need at least {self.fft_size} samples, got {len(samples)}")
+        started = time.perf_counter()
+        saved = self._state, self._count
+        self._state, self._count = None, 0
+        try:
+            self._accumulate(frames)
+            spectrum = self._spectrum(db)
+        finally:
+            self._state, self._count = saved
+        self.metrics.record(len(samples), time.perf_counter() - started)
+        return spectrum
+
+    def push(self, samples):
+        """
+        Feed a block of samples; returns the list of output frames it completed,
+        each a float32 spectrum in dB, possibly empty. The last is kept in latest.
+        """
+        started = time.perf_counter()
+        samples = np.asarray(samples)
+        if len(self._pending):
+            samples = np.concatenate((self._pending, samples))
+        frames = self._frames(samples)
+        outputs = []
+        done = 0
+        while done < len(frames):
+            count = min(len(frames) - done, self.frames_per_output - self._position)
+            computed = max(0, min(count, self.num_average - self._position))
+            if computed:
+                self._accumulate(frames[done:done + computed])
+            done += count
+            self._position += count
+            if self._position == self.frames_per_output:
+                outputs.append(self._spectrum())
+                self._position = 0
+                if self.averaging == "linear":
+                    self._state = None
+        self._pending = samples[done * self.hop:].copy()
+        if outputs:
+            self.latest = outputs[-1]
+        self.metrics.record(len(samples) - len(self._pending), time.perf_counter() - started)
+        return outputs
@@ -0,0 +1,170 @@
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from sdrfly.spectrum import SpectrumEngine
+
+SweepResult = namedtuple("SweepResult", "freqs power_db step_freqs step_power_db duration rate")
+SweepResult.__doc__ = """
+One panoramic sweep.
+
+freqs and power_db are the stitched spectrum over [start_freq, stop_freq], in Hz
+and dB relative to full scale. step_freqs are the centre frequencies tuned and
+step_power_db the trimmed spectrum of each step, one row per step, as for a
+waterfall. duration is the sweep time in seconds and rate the sweep rate in GHz/s.
+"""
+
+def measure_settle_samples(sdr, freq_a, freq_b, window=1024, num_windows=256, tolerance_db=1.0, repeats=3,
+                           max_samples=None):
+    """
+    Measure how many samples after a retune are unusable.
+
+    Retunes from freq_a to freq_b repeats times and captures num_windows windows
+    of window samples right after each retune. The settle point is the start of
+    the first window from which the power stays within tolerance_db of its
+    final level, the median of the last half. This covers both the PLL settling
+    and samples from the old frequency still buffered in the driver.
+
+    Bursty signals at freq_b also move the power, and read as a tuner that has
+    not settled, so measure between quiet frequencies where possible. The result
+    is capped at max_samples, a quarter of the capture by default, so a busy
+    band costs at most that much per sweep step rather than most of it.
+
+    Returns:
+        int: Samples to discard, the worst case over the repeats, in whole windows.
+    """
+    if max_samples is None:
+        max_samples = window * num_windows // 4
+    settle = 0
+    for _ in range(repeats):
+        sdr.set_frequency(freq_a)
+        sdr.capture_samples(window * num_windows // 4)
+        sdr.set_frequency(freq_b)
+        samples = sdr.capture_samples(window * num_windows)
+        samples = samples[:len(samples) // window * window].reshape(-1, window)
+        power_db = 10 * np.log10(np.mean(np.abs(samples) ** 2, axis=1) + 1e-20)
+        final = np.median(power_db[len(power_db) // 2:])
+        outside = np.flatnonzero(np.abs(power_db - final) > tolerance_db)
+        if len(outside):
+            settle = max(settle, (outside[-1] + 1) * window)
+    return int(min(settle, max_samples))
+
+class Sweep:
+    """
+    Wideband spectrum sweep, pipelined so the radio never waits on processing.
+
+    Each step retunes and captures settle_samples plus num_frames * fft_size
+    samples in one read, discarding the settle samples rather than sleeping
+    while the tuner settles. The Welch average of step k (a SpectrumEngine with
+    a Hann window, power averaged over frames) runs in a worker thread while
+    step k+1 is captured. Only the middle usable_fraction of each step's band
+    is kept, away from the anti-alias filter roll-off, and neighbouring steps
+    overlap by overlap of that, where they are crossfaded in linear power into
+    one panorama.
+
+    The receiver must be idle, not running its capture engine, since retunes
+    have to line up with reads.
+
+    Parameters:
+        sdr (SDR): Receiver to sweep.
+        start_freq (float): Lowest frequency of the panorama in Hz.
+        stop_freq (float): Highest frequency of the panorama in Hz.
+        fft_size (int): FFT bins per step.
+        num_frames (int): FFTs averaged per step.
+        usable_fraction (float): Fraction of the sample rate kept per step.
+        overlap (float): Fraction of the kept band shared with the next step.
+        settle_samples (int): Samples discarded after each retune, measured with
+            measure_settle_samples() on the first sweep if None.
+        settle_freqs (tuple): Quiet frequencies in Hz to measure settling between,
+            the ends of the sweep if None.
+    """
+
+    def __init__(self, sdr, start_freq, stop_freq, fft_size=1024, num_frames=20, usable_fraction=0.8,
+                 overlap=0.1, settle_samples=None, settle_freqs=None):
+        if stop_freq <= start_freq:
+            raise ValueError("stop_freq must be above start_freq")
+        if not 0 < usable_fraction <= 1 or not 0 <= overlap < 1:
+            raise ValueError("usable_fraction must be in (0, 1] and overlap in [0, 1)")
+        self.sdr = sdr
+        self.start_freq = start_freq
+        self.stop_freq = stop_freq
+        self.fft_size = fft_size
+        self.num_frames = num_frames
+        self.settle_samples = settle_samples
+        self.settle_freqs = settle_freqs
+        self.sample_rate = sdr.sample_rate
+        self.bin_width = self.sample_rate / fft_size
+
+        # Kept bins of each step, centred, and the step between centres in whole bins
+        # so every step lands on the same frequency grid
+        self.kept_bins = max(1, int(fft_size * usable_fraction))
+        self.first_kept = (fft_size - self.kept_bins) // 2
+        self.step_bins = max(1, round(self.kept_bins * (1 - overlap)))
+        kept_span = self.kept_bins * self.bin_width
+        step = self.step_bins * self.bin_width
+        num_steps = max(1, int(np.ceil((stop_freq - start_freq - kept_span) / step)) + 1)
+        first_center = start_freq - (self.first_kept - fft_size // 2) * self.bin_width
+        self.step_freqs = first_center + step * np.arange(num_steps)
+        self.num_bins = (num_steps - 1) * self.step_bins + self.kept_bins
+        # Frequency of every bin of the panorama before cropping to [start_freq, stop_freq]
+        self.grid = first_center + (np.arange(self.num_bins) + self.first_kept - fft_size // 2) * self.bin_width
+
+        # Welch average of each step, non-overlapping frames so a step is exactly num_frames FFTs
+        self.engine = SpectrumEngine(self.sample_rate, fft_size, "hann", overlap=0, name="sweep")
+        # Crossfade weights across the kept bins, never quite zero so edges still count
+        self.weights = np.hanning(self.kept_bins + 2)[1:-1] + 1e-3
+
+        self.rate = None
+        self.duration = None
+
+    def _process(self, samples):
+        """Welch power spectrum of one step's samples, trimmed to the kept bins."""
+        power = self.engine.compute(samples[:self.num_frames * self.fft_size], db=False)
+        return power[self.first_kept:self.first_kept + self.kept_bins]
+
+    def run(self):
+        """Sweep once from start_freq to stop_freq and return a SweepResult."""
+        if self.sdr.running:
+            raise RuntimeError("Stop the receiver's capture engine before sweeping")
+        if self.settle_samples is None:
+            freq_a, freq_b = self.settle_freqs or (self.step_freqs[-1], self.step_freqs[0])
+            self.settle_samples = measure_settle_samples(self.sdr, freq_a, freq_b)
+        needed = self.settle_samples + self.num_frames * self.fft_size
+        num_steps = len(self.step_freqs)
+        step_power = np.zeros((num_steps, self.kept_bins))
+
+        def process(index, samples):
+            step_power[index] = self._process(samples[self.settle_samples:])
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=1) as worker:
+            pending = None
+            for index, frequency in enumerate(self.step_freqs):
+                self.sdr.set_frequency(frequency)
+                samples = self.sdr.capture_samples(needed)
+                if len(samples) < needed:
+                    raise RuntimeError(f"Captured {len(samples)} of {needed} samples at {frequency / 1e6:.3f} MHz")
+                if pending is not None:
+                    pending.result()
+                pending = worker.submit(process, index, samples)
+            pending.result()
+
+        # Crossfade the overlapping steps on the common grid
+        accumulated = np.zeros(self.num_bins)
+        weight = np.zeros(self.num_bins)
+        for index in range(num_steps):
+            span = slice(index * self.step_bins, index * self.step_bins + self.kept_bins)
+            accumulated[span] += step_power[index] * self.weights
+            weight[span] += self.weights
+        panorama = accumulated / weight
+
+        self.duration = time.monotonic() - started
+        self.rate = (self.stop_freq - self.start_freq) / 1e9 / self.duration
+        crop = (self.grid >= self.start_freq) & (self.grid <= self.stop_freq)
+        return SweepResult(self.grid[crop], 10 * np.log10(panorama[crop] + 1e-20), self.step_freqs.copy(),
+                           10 * np.log10(step_power + 1e-20), self.duration, self.rate)
+
+    def __iter__(self):
+        """Sweep repeatedly, yielding a SweepResult per sweep."""
+        while True:
+            yield self.run()
@@ -0,0 +1,380 @@
+from collections import deque
+from fractions import Fraction
+from functools import lru_cache
+import numpy as np
+from sdrfly.correlator import BLE_ADVERTISING_ACCESS_ADDRESS, ble_sync_word, br_sync_word
+from sdrfly.demodulators.gfsk_slicer import gaussian_frequency_pulse
+from sdrfly.protocols.ble import ADV_NONCONN_IND, CRC_BYTES, crc24, whitening_keystream
+
+# Phase accumulators are 64 bit, a full turn being 2**64, so a frequency is exact to
+# sample_rate / 2**64 and the phase never drifts however long a generator runs
+PHASE_BITS = 64
+FULL_TURN = 1 << PHASE_BITS
+
+# Top phase bits indexing the sine table; truncating the rest puts spurs near -96 dBc
+TABLE_BITS = 16
+
+@lru_cache(maxsize=None)
+def _phase_table(table_bits):
+    """Unit phasors for table_bits of phase, shared by every generator."""
+    table = np.exp(2j * np.pi * np.arange(1 << table_bits) / (1 << table_bits)).astype(np.complex64)
+    table.flags.writeable = False
+    return table
+
+def phase_increment(frequency, sample_rate):
+    """Phase step per sample of a frequency in Hz, in 2**-64 turns, wrapped for negative frequencies."""
+    # Exact ratio: in float64 the step would only be good to 53 of its 64 bits
+    return round(Fraction(float(frequency)) / Fraction(float(sample_rate)) * FULL_TURN) % FULL_TURN
+
+def _to_phase(radians):
+    return round(radians / (2 * np.pi) * FULL_TURN) % FULL_TURN
+
+class SignalGenerator:
+    """
+    Stateful complex64 signal generator.
+
+    fill(out) writes the next len(out) samples into a caller supplied buffer,
+    add_to(out) adds them, and generate(n) returns them in a new array. The
+    signal carries on from one call to the next whatever the block sizes, so
+    blocks can be fed straight to SDR.transmit() or a simulator's reads.
+    """
+
+    def __init__(self):
+        self._scratch = np.empty(0, dtype=np.complex64)
+
+    def fill(self, out):
+        """Write the next len(out) samples into out and return len(out)."""
+        raise NotImplementedError("This method should be implemented by subclasses")
+
+    def add_to(self, out):
+        """Add the next len(out) samples into out."""
+        if len(self._scratch) < len(out):
+            self._scratch = np.empty(len(out), dtype=np.complex64)
+        scratch = self._scratch[:len(out)]
+        self.fill(scratch)
+        out += scratch
+
+    def generate(self, num_samples):
+        out = np.empty(num_samples, dtype=np.complex64)
+        self.fill(out)
+        return out
+
+class NCO(SignalGenerator):
+    """
+    Numerically controlled oscillator: a 64 bit phase accumulator looking up a
+    shared table of unit phasors.
+
+    The phase ramp for a block is a cached multiple of the increment plus the
+    block's starting phase, so a block costs an add, a shift and a table
+    lookup, with no float time vector. The frequency can change between
+    blocks without a phase jump.
+
+    Parameters:
+        frequency (float): Frequency in Hz, negative below the centre.
+        sample_rate (float): Sample rate in Hz.
+        amplitude (float): Peak amplitude.
+        phase (float): Starting phase in radians.
+        table_bits (int): Phase bits looked up, 2**table_bits phasors in the table.
+    """
+
+    def __init__(self, frequency, sample_rate, amplitude=1.0, phase=0.0, table_bits=TABLE_BITS):
+        super().__init__()
+        self.sample_rate = sample_rate
+        self.amplitude = np.float32(amplitude)
+        self.table = _phase_table(table_bits)
+        self.shift = np.uint64(PHASE_BITS - table_bits)
+        self.initial_phase = _to_phase(phase)
+        self.phase = self.initial_phase
+        self._ramp = np.empty(0, dtype=np.uint64)
+        self._index = np.empty(0, dtype=np.uint64)
+        self.frequency = frequency
+
+    @property
+    def frequency(self):
+        return self._frequency
+
+    @frequency.setter
+    def frequency(self, frequency):
+        self._frequency = frequency
+        self.increment = phase_increment(frequency, self.sample_rate)
+        self._ramp = np.empty(0, dtype=np.uint64)
+
+    def seek(self, sample_index):
+        """Jump to the phase sample_index samples after the start, as if generated continuously."""
+        self.phase = (self.initial_phase + self.increment * sample_index) % FULL_TURN
+
+    def _phases(self, count):
+        """Accumulator value of each of the next count samples, advancing the accumulator."""
+        if len(self._ramp) < count:
+            # uint64 arithmetic wraps modulo a full turn, just like the accumulator
+            self._ramp = np.arange(count, dtype=np.uint64) * np.uint64(self.increment)
+            self._index = np.empty(count, dtype=np.uint64)
+        index = self._index[:count]
+        np.add(self._ramp[:count], np.uint64(self.phase), out=index)
+        self.phase = (self.phase + self.increment * count) % FULL_TURN
+        return index
+
+    def fill(self, out):
+        index = self._phases(len(out))
+        np.right_shift(index, self.shift, out=index)
+        np.take(self.table, index, out=out)
+        if self.amplitude != 1:
+            out *= self.amplitude
+        return len(out)
+
+class MultiTone(SignalGenerator):
+    """
+    Sum of continuous wave tones, one NCO each.
+
+    Parameters:
+        frequencies (list): Tone frequencies in Hz.
+        sample_rate (float): Sample rate in Hz.
+        amplitudes (list): Peak amplitude of each tone, 1 by default.
+        phases (list): Starting phase of each tone in radians, 0 by default.
+    """
+
+    def __init__(self, frequencies, sample_rate, amplitudes=None, phases=None):
+        super().__init__()
+        amplitudes = [1.0] * len(frequencies) if amplitudes is None else amplitudes
+        phases = [0.0] * len(frequencies) if phases is None else phases
+        if not len(frequencies) == len(amplitudes) == len(phases):
+            raise ValueError("Give one amplitude and phase per frequency")
+        self.tones = [NCO(frequency, sample_rate, amplitude, phase)
+                      for frequency, amplitude, phase in zip(frequencies, amplitudes, phases)]
+
+    def fill(self, out):
+        if not self.tones:
+            out[:] = 0
+            return len(out)
+        self.tones[0].fill(out)
+        for tone in self.tones[1:]:
+            tone.add_to(out)
+        return len(out)
+
+class Chirp(SignalGenerator):
+    """
+    Linear frequency sweep from start_freq to stop_freq over duration seconds,
+    repeated back to back with the phase continuous across the jump.
+
+    The phase of sample k of a block is the starting phase plus k increments
+    plus the chirp rate times k(k - 1) / 2, all in wrapping 64 bit integers, so
+    the sweep is exact however many periods are generated.
+
+    Parameters:
+        start_freq (float): Frequency at the start of each sweep in Hz.
+        stop_freq (float): Frequency at the end of each sweep in Hz.
+        duration (float): Sweep period in seconds.
+        sample_rate (float): Sample rate in Hz.
+        amplitude (float): Peak amplitude.
+    """
+
+    def __init__(self, start_freq, stop_freq, duration, sample_rate, amplitude=1.0, table_bits=TABLE_BITS):
+        super().__init__()
+        self.period = max(1, round(duration * sample_rate))
+        self.start_increment = phase_increment(start_freq, sample_rate)
+        # Increment added per sample, in 2**-64 turns per sample squared
+        self.rate = round((stop_freq - start_freq) / sample_rate / self.period * FULL_TURN) % FULL_TURN
+        self.amplitude = np.float32(amplitude)
+        self.table = _phase_table(table_bits)
+        self.shift = np.uint64(PHASE_BITS - table_bits)
+        self.phase = 0
+        self.position = 0
+        self._ramp = np.empty(0, dtype=np.uint64)
+        self._triangle = np.empty(0, dtype=np.uint64)
+        self._index = np.empty(0, dtype=np.uint64)
+
+    def _segment(self, out):
+        count = len(out)
+        if len(self._ramp) < count:
+            self._ramp = np.arange(count, dtype=np.uint64)
+            self._triangle = self._ramp * (self._ramp - np.uint64(1)) // np.uint64(2)
+            self._index = np.empty(count, dtype=np.uint64)
+        increment = (self.start_increment + self.rate * self.position) % FULL_TURN
+        index = self._index[:count]
+        np.multiply(self._ramp[:count], np.uint64(increment), out=index)
+        index += self._triangle[:count] * np.uint64(self.rate)
+        index += np.uint64(self.phase)
+        np.right_shift(index, self.shift, out=index)
+        np.take(self.table, index, out=out)
+        triangle = count * (count - 1) // 2
+        self.phase = (self.phase + increment * count + self.rate * triangle) % FULL_TURN
+        self.position = (self.position + count) % self.period
+
+    def fill(self, out):
+        done = 0
+        while done < len(out):
+            count = min(len(out) - done, self.period - self.position)
+            self._segment(out[done:done + count])
+            done += count
+        if self.amplitude != 1:
+            out *= self.amplitude
+        return len(out)
+
+class AWGN(SignalGenerator):
+    """
+    Complex white Gaussian noise.
+
+    The noise power is signal_power / 10**(snr_db / 10). With signal_power None,
+    add_to() measures the power of each block it adds to, so the block comes out
+    at snr_db whatever its level, and fill() assumes unit power.
+
+    Parameters:
+        snr_db (float): Signal to noise ratio in dB.
+        signal_power (float): Signal power the SNR is relative to, None to measure it.
+        seed (int): Seed for the noise, random by default.
+    """
+
+    def __init__(self, snr_db, signal_power=1.0, seed=None):
+        super().__init__()
+        self.snr_db = snr_db
+        self.signal_power = signal_power
+        self.rng = np.random.default_rng(seed)
+
+    def _fill_at(self, out, noise_power):
+        # Draw float32 straight into the buffer's real and imaginary parts
+        self.rng.standard_normal(dtype=np.float32, out=out.view(np.float32))
+        out *= np.float32(np.sqrt(noise_power / 2))
+
+    def fill(self, out):
+        signal_power = 1.0 if self.signal_power is None else self.signal_power
+        self._fill_at(out, signal_power / 10 ** (self.snr_db / 10))
+        return len(out)
+
+    def add_to(self, out):
+        signal_power = self.signal_power
+        if signal_power is None:
+            signal_power = float(np.vdot(out, out).real) / max(len(out), 1)
+        if len(self._scratch) < len(out):
+            self._scratch = np.empty(len(out), dtype=np.complex64)
+        scratch = self._scratch[:len(out)]
+        self._fill_at(scratch, signal_power / 10 ** (self.snr_db / 10))
+        out += scratch
+
+def gfsk_phase(bits, samples_per_symbol, modulation_index=0.5, bt=0.5):
+    """
+    Float64 GFSK phase in radians for a bit sequence at a possibly fractional
+    samples_per_symbol, starting from zero and including the filter's tail.
+
+    The phase is built at the next integer oversampling ratio and interpolated, which
+    is exact enough as the phase of a Gaussian filtered signal is smooth.
+    """
+    oversampling = int(np.ceil(samples_per_symbol))
+    pulse = gaussian_frequency_pulse(oversampling, bt).astype(np.float64)
+    frequency = np.convolve(np.repeat(np.asarray(bits, dtype=np.float64) * 2 - 1, oversampling), pulse)
+    # Each symbol turns the phase by pi * h, spread over its samples
+    phase = np.pi * modulation_index / oversampling * np.cumsum(frequency)
+    num_samples = int(len(phase) * samples_per_symbol / oversampling)
+    if oversampling != samples_per_symbol:
+        phase = np.interp(np.arange(num_samples) * oversampling / samples_per_symbol, np.arange(len(phase)), phase)
+    return phase
+
+def gfsk_waveform(bits, samples_per_symbol, modulation_index=0.5, bt=0.5):
+    """Complex64 GFSK baseband for a bit sequence at a possibly fractional samples_per_symbol."""
+    return np.exp(1j * gfsk_phase(bits, samples_per_symbol, modulation_index, bt)).astype(np.complex64)
+
+def ble_advertising_bits(address, payload, channel, tx_add=1, pdu_type=ADV_NONCONN_IND):
+    """On-air bits of a BLE advertising packet: preamble, access address and whitened PDU and CRC."""
+    pdu = bytes([pdu_type | tx_add << 6, 6 + len(payload)]) + int(address).to_bytes(6, "little") + bytes(payload)
+    pdu = np.frombuffer(pdu, dtype=np.uint8)
+    crc = int(crc24(pdu[None], len(pdu))[0])
+    body = np.concatenate((pdu, np.frombuffer(crc.to_bytes(CRC_BYTES, "little"), dtype=np.uint8)))
+    body ^= whitening_keystream(channel)[:len(body)]
+    sync = np.frombuffer(ble_sync_word(BLE_ADVERTISING_ACCESS_ADDRESS).to_bytes(5, "little"), dtype=np.uint8)
+    return np.unpackbits(np.concatenate((sync, body)), bitorder="little")
+
+def br_access_code_bits(lap):
+    """On-air bits of a BR/EDR access code: preamble, sync word and trailer."""
+    sync = np.unpackbits(np.frombuffer(br_sync_word(lap).to_bytes(8, "little"), dtype=np.uint8), bitorder="little")
+    # Preamble and trailer alternate into and out of the sync word
+    preamble = np.array([1, 0, 1, 0] if sync[0] else [0, 1, 0, 1], dtype=np.uint8)
+    trailer = np.array([1, 0, 1, 0] if sync[-1] == 0 else [0, 1, 0, 1], dtype=np.uint8)
+    return np.concatenate((preamble, sync, trailer))
+
+class GFSKModulator(SignalGenerator):
+    """
+    GFSK packet modulator: packets queued with send() come out of fill() in
+    order, with silence between them and whenever the queue is empty.
+
+    Each packet is modulated once when queued, starting from the phase the
+    previous packet ended on, so consecutive packets are phase continuous and
+    fill() only copies. frequency shifts the packets off the centre.
+
+    Parameters:
+        sample_rate (float): Sample rate in Hz.
+        symbol_rate (float): Symbols per second.
+        modulation_index (float): Frequency deviation over half the symbol rate.
+        bt (float): Bandwidth time product of the Gaussian filter.
+        amplitude (float): Peak amplitude.
+        frequency (float): Carrier offset in Hz.
+    """
+
+    def __init__(self, sample_rate, symbol_rate=1e6, modulation_index=0.5, bt=0.5, amplitude=1.0, frequency=0.0):
+        super().__init__()
+        self.sample_rate = sample_rate
+        self.samples_per_symbol = sample_rate / symbol_rate
+        self.modulation_index = modulation_index
+        self.bt = bt
+        self.amplitude = amplitude
+        self.carrier = NCO(frequency, sample_rate) if frequency else None
+        self.phase = 0.0
+        self._queue = deque()
+        self._offset = 0
+
+    @property
+    def pending(self):
+        """Samples queued, silences included, not yet returned by fill()."""
+        return sum(len(item) if isinstance(item, np.ndarray) else item for item in self._queue) - self._offset
+
+    def send(self, bits, gap=0):
+        """Queue a packet of bits after gap samples of silence; returns the packet's length in samples."""
+        phase = gfsk_phase(bits, self.samples_per_symbol, self.modulation_index, self.bt) + self.phase
+        self.phase = phase[-1] % (2 * np.pi) if len(phase) else self.phase
+        waveform = (self.amplitude * np.exp(1j * phase)).astype(np.complex64)
+        if gap:
+            self._queue.append(int(gap))
+        self._queue.append(waveform)
+        return len(waveform)
+
+    def fill(self, out):
+        done = 0
+        while done < len(out) and self._queue:
+            item = self._queue[0]
+            if isinstance(item, np.ndarray):
+                count = min(len(out) - done, len(item) - self._offset)
+                out[done:done + count] = item[self._offset:self._offset + count]
+                length = len(item)
+            else:
+                count = min(len(out) - done, item - self._offset)
+                out[done:done + count] = 0
+                length = item
+            done += count
+            self._offset += count
+            if self._offset == length:
+                self._queue.popleft()
+                self._offset = 0
+        out[done:] = 0
+        if self.carrier is not None:
+            # Keep the carrier running through silences so packets stay coherent
+            if len(self._scratch) < len(out):
+                self._scratch = np.empty(len(out), dtype=np.complex64)
+            carrier = self._scratch[:len(out)]
+            self.carrier.fill(carrier)
+            out *= carrier
+        return len(out)
+
+class BLEModulator(GFSKModulator):
+    """
+    GFSK modulator for BLE LE 1M packets: 1 Msym/s, modulation index 0.5 and BT 0.5.
+
+    Parameters:
+        sample_rate (float): Sample rate in Hz.
+        amplitude (float): Peak amplitude.
+        frequency (float): Carrier offset in Hz.
+    """
+
+    def __init__(self, sample_rate, amplitude=1.0, frequency=0.0):
+        super().__init__(sample_rate, 1e6, 0.5, 0.5, amplitude, frequency)
+
+    def send_advertisement(self, address, payload, channel, tx_add=1, pdu_type=ADV_NONCONN_IND, gap=0):
+        """Queue an advertising packet on channel after gap samples of silence."""
+        return self.send(ble_advertising_bits(address, payload, channel, tx_add, pdu_type), gap)
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+from sdrfly.channelizers.channelizer_fft import ChannelizerFFT
+from sdrfly.channelizers.channelizer_pfb import ChannelizerPFB
+from sdrfly.channelizers.channelizer_sparse import ChannelizerSparse
+from sdrfly.iq import CS16, to_complex64
+
+def _off_bin_tones(num_samples):
+    n = np.arange(num_samples)
+    return (np.exp(2j * np.pi * 0.1234 * n) + 0.3 * np.exp(-2j * np.pi * 0.377 * n)).astype(np.complex64)
+
+@pytest.mark.parametrize("num_channels, decimation", [(10, 10), (8, 20), (16, 16)])
+def test_fft_matches_pfb(num_channels, decimation):
+    samples = _off_bin_tones(40007)
+    pfb = ChannelizerPFB(num_channels, 1e6, decimation * 1e6).channelize(samples)
+    fft = ChannelizerFFT(num_channels, 1e6, decimation * 1e6).channelize(samples)
+    assert fft.shape == pfb.shape == (num_channels, 40007 // decimation)
+    # Equal to within the prototype's stopband left unfolded, below -80 dB
+    assert np.abs(fft - pfb).max() < 1e-4 * np.abs(pfb).max()
+
+STREAMING_CHANNELIZERS = {
+    "pfb": lambda: ChannelizerPFB(10, 1e6, 10e6),
+    "fft": lambda: ChannelizerFFT(10, 1e6, 10e6),
+    "sparse_ddc": lambda: ChannelizerSparse([-2.3e6, 0.4e6, 3.1e6], 1e6, 10e6),
+    "sparse_pfb": lambda: ChannelizerSparse([-4e6, -3e6, -1e6, 0, 2e6, 4e6], 1e6, 10e6),
+    "sparse_dft": lambda: ChannelizerSparse([-2.3e6, 0.4e6, 3.1e6], 1e6, 10e6, mode="power"),
+    "numba": lambda: pytest.importorskip("sdrfly.channelizers.channelizer_numba").ChannelizerNumba(10, 1e6, 10e6),
+}
+
+def _stream(channelizer, samples, block_sizes):
+    bounds = np.cumsum([0] + block_sizes)
+    outputs = [channelizer.channelize_stream(samples[start:stop]) for start, stop in zip(bounds[:-1], bounds[1:])]
+    return np.concatenate(outputs, axis=1)
+
+@pytest.mark.parametrize("name", sorted(STREAMING_CHANNELIZERS))
+def test_channelize_stream_matches_channelize(name):
+    samples = _off_bin_tones(40007)
+    block_sizes = [1, 9, 777, 4096, 13, 15000, 3, 20108]
+    one_shot = STREAMING_CHANNELIZERS[name]().channelize(samples)
+    streamed = _stream(STREAMING_CHANNELIZERS[name](), samples, block_sizes)
+    assert streamed.shape == one_shot.shape
+    np.testing.assert_allclose(streamed, one_shot, rtol=0, atol=1e-5 * np.abs(one_shot).max())
+
+@pytest.mark.parametrize("name", ["pfb", "sparse_ddc", "sparse_dft"])
+def test_channelize_stream_of_cs16_matches_complex64(name):
+    samples = _off_bin_tones(20000) * 0.5
+    native = np.zeros(len(samples), dtype=CS16)
+    native["re"] = np.round(samples.real * 32767)
+    native["im"] = np.round(samples.imag * 32767)
+    expected = STREAMING_CHANNELIZERS[name]().channelize(to_complex64(native))
+    # Mixed formats within one stream keep the staged history at a common scale
+    channelizer = STREAMING_CHANNELIZERS[name]()
+    streamed = np.concatenate((channelizer.channelize_stream(native[:7001]),
+                               channelizer.channelize_stream(to_complex64(native[7001:12000])),
+                               channelizer.channelize_stream(native[12000:])), axis=1)
+    assert streamed.shape == expected.shape
+    np.testing.assert_allclose(streamed, expected, rtol=0, atol=1e-5 * np.abs(expected).max())
+
+def test_numba_decimation_matches_pfb_for_inexact_ratio():
+    numba_module = pytest.importorskip("sdrfly.channelizers.channelizer_numba")
+    # 20e6 / (20e6 / 29) is 28.999999999999996 in floating point
+    channel_bw = 20e6 / 29
+    pfb = ChannelizerPFB(29, channel_bw, 20e6)
+    channelizer = numba_module.ChannelizerNumba(29, channel_bw, 20e6)
+    assert channelizer.decimation_factor == pfb.num_branches == 29
+    samples = _off_bin_tones(29 * 400)
+    np.testing.assert_allclose(channelizer.channelize(samples), pfb.channelize(samples), rtol=0, atol=1e-5)
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+from sdrfly.correlator import SyncWordCorrelator, br_sync_word
+from sdrfly.synth import br_access_code_bits
+
+def _reverse64(value):
+    return int(f"{value:064b}"[::-1], 2)
+
+# Sync words from the Core spec sample data (Vol 2 Part G), written there with the last bit on air first
+@pytest.mark.parametrize("lap, printed", [
+    (0x000000, 0x7E7041E34000000D),
+    (0xFFFFFF, 0xE758B5227FFFFFF2),
+    (0x9E8B33, 0x475C58CC73345E72),
+])
+def test_br_sync_word_matches_spec_vectors(lap, printed):
+    assert br_sync_word(lap) == _reverse64(printed)
+
+def test_br_sync_word_carries_lap():
+    # a0 to a23 of the LAP are sent as bits 34 to 57, before the Barker sequence
+    for lap in (0x000000, 0x123456, 0x9E8B33, 0xFFFFFF):
+        assert br_sync_word(lap) >> 34 & 0xFFFFFF == lap
+
+def test_correlator_finds_access_code_across_blocks():
+    laps = [0x9E8B33, 0x123456]
+    rng = np.random.default_rng(3)
+    bits = rng.integers(0, 2, (2, 1024), dtype=np.uint8)
+    # Straddling the boundary between the first and second 64 byte block
+    bits[1, 500:572] = br_access_code_bits(laps[1])
+    bits[1, 530] ^= 1
+    packed = np.packbits(bits, axis=1, bitorder="little")
+    correlator = SyncWordCorrelator.for_laps(laps, max_errors=2)
+    matches = np.concatenate([correlator.correlate(packed[:, i:i + 64]) for i in range(0, packed.shape[1], 64)])
+    matches = matches[matches["errors"] <= 2]
+    assert len(matches) == 1
+    match = matches[0]
+    assert (match["channel"], match["bit_offset"], match["lap"], match["errors"]) == (1, 504, laps[1], 1)
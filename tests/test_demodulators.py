@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+from sdrfly.demodulators.demodulator_numpy import GFSKDemodNumPy
+from sdrfly.demodulators.gfsk_slicer import GFSKSlicer, gaussian_frequency_pulse
+from sdrfly.synth import AWGN, gfsk_waveform
+
+def _tone_bursts(num_channels, num_samples, seed=1):
+    """Channels of unit-amplitude samples with random frequency steps, as from a channelizer."""
+    rng = np.random.default_rng(seed)
+    steps = rng.uniform(-1.5, 1.5, (num_channels, num_samples))
+    return np.exp(1j * np.cumsum(steps, axis=1)).astype(np.complex64), steps
+
+@pytest.mark.parametrize("num_channels", [1, 4])
+def test_blocks_demodulate_like_one_shot(num_channels):
+    samples, _ = _tone_bursts(num_channels, 1000)
+    samples = samples[0] if num_channels == 1 else samples
+    expected = GFSKDemodNumPy().demodulate(samples)
+    demod = GFSKDemodNumPy()
+    blocks = [demod.demodulate(samples[..., start:stop]) for start, stop in [(0, 1), (1, 250), (250, 251), (251, 1000)]]
+    # The first sample of every block is taken against the last sample of the one before
+    np.testing.assert_allclose(np.concatenate(blocks, axis=-1), expected, atol=1e-5)
+
+def test_output_is_the_frequency_step_over_kf():
+    samples, steps = _tone_bursts(2, 500)
+    output = GFSKDemodNumPy(kf=0.5).demodulate(samples)
+    np.testing.assert_allclose(output[:, 1:], steps[:, 1:] / 0.5, atol=1e-4)
+
+def test_reset_forgets_the_previous_block():
+    samples, _ = _tone_bursts(1, 200)
+    demod = GFSKDemodNumPy()
+    demod.demodulate(samples[0, :100])
+    demod.reset()
+    np.testing.assert_array_equal(demod.demodulate(samples[0, 100:]), GFSKDemodNumPy().demodulate(samples[0, 100:]))
+
+def test_out_is_filled_in_place():
+    samples, _ = _tone_bursts(3, 400)
+    expected = GFSKDemodNumPy().demodulate(samples)
+    out = np.empty((3, 400), dtype=np.float32)
+    assert GFSKDemodNumPy().demodulate(samples, out=out) is out
+    np.testing.assert_array_equal(out, expected)
+
+def test_non_contiguous_out_is_written():
+    samples, _ = _tone_bursts(6, 100)
+    samples = samples.reshape(2, 3, 100)
+    expected = GFSKDemodNumPy().demodulate(samples)
+    # Flattening the channels of this view needs a copy
+    storage = np.zeros((3, 2, 100), dtype=np.float32)
+    out = storage.transpose(1, 0, 2)
+    assert GFSKDemodNumPy().demodulate(samples, out=out) is out
+    np.testing.assert_array_equal(storage.transpose(1, 0, 2), expected)
+
+def test_out_of_the_wrong_shape_is_rejected():
+    samples, _ = _tone_bursts(2, 100)
+    with pytest.raises(ValueError, match="shape"):
+        GFSKDemodNumPy().demodulate(samples, out=np.empty(200, dtype=np.float32))
+
+def _bit_error_rate(received, sent, settle=500, max_lag=8):
+    """Error rate at the best alignment of received with sent, after the timing has settled."""
+    rates = []
+    for lag in range(max_lag):
+        count = min(len(received) - lag, len(sent)) - settle
+        rates.append(np.mean(received[lag + settle:lag + settle + count] != sent[settle:settle + count]))
+    return min(rates)
+
+def test_gaussian_frequency_pulse_is_symmetric_with_unit_sum():
+    pulse = gaussian_frequency_pulse(8)
+    assert len(pulse) == 24
+    np.testing.assert_allclose(pulse.sum(), 1, rtol=1e-6)
+    np.testing.assert_allclose(pulse, pulse[::-1], atol=1e-7)
+    assert pulse.argmax() in (11, 12)
+
+@pytest.mark.parametrize("timing_offset", [0, 1, 2, 3])
+def test_slicer_recovers_noisy_gfsk_at_any_timing_offset(timing_offset):
+    samples_per_symbol = 4
+    bits = np.random.default_rng(3).integers(0, 2, 20000).astype(np.uint8)
+    samples = np.concatenate((np.ones(timing_offset, np.complex64), gfsk_waveform(bits, samples_per_symbol)))
+    AWGN(12, seed=5).add_to(samples)
+    demod = GFSKDemodNumPy()
+    slicer = GFSKSlicer(samples_per_symbol)
+    packed, phases = [], []
+    for start in range(0, len(samples), 4096):
+        packed.append(slicer.slice(demod.demodulate(samples[start:start + 4096])))
+        phases.append(int(slicer.symbol_phase[0]))
+    received = np.unpackbits(np.concatenate(packed, axis=1)[0], bitorder="little")
+    assert len(received) == slicer.bit_count
+    assert _bit_error_rate(received, bits) < 2e-3
+    # The eye opening picks the sampling phase on the first block, and hysteresis keeps it
+    assert len(set(phases)) == 1
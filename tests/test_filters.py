@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+from sdrfly import filters
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    filters.set_cache_dir(tmp_path)
+    filters._design.cache_clear()
+    yield tmp_path
+    filters.set_cache_dir(None)
+    filters._design.cache_clear()
+
+def test_prototype_filter_is_cached_and_read_only():
+    taps = filters.prototype_filter(10, 12)
+    assert taps is filters.prototype_filter(10, 12)
+    assert taps.dtype == np.float32 and len(taps) == 120
+    assert not taps.flags.writeable
+    assert abs(taps.sum() - 1) < 1e-3
+
+def test_disk_cache_round_trip(cache_dir):
+    designed = filters.prototype_filter(16, None, attenuation=60.0).copy()
+    cached = list(cache_dir.glob("prototype_*.npy"))
+    assert len(cached) == 1
+    assert not list(cache_dir.glob("*.tmp"))
+
+    # A fresh process would find the file; emulate it by dropping the memory cache
+    filters._design.cache_clear()
+    np.save(cached[0], designed * 2)
+    loaded = filters.prototype_filter(16, None, attenuation=60.0)
+    np.testing.assert_array_equal(loaded, designed * 2)
+    assert not loaded.flags.writeable
+
+def test_disk_cache_keys_on_spec(cache_dir):
+    filters.prototype_filter(8, 12)
+    filters.prototype_filter(8, 12, passband=0.35)
+    filters.prototype_filter(8, 12)
+    assert len(list(cache_dir.glob("prototype_*.npy"))) == 2
+
+def test_polyphase_filter_rows():
+    taps = filters.prototype_filter(4, 6)
+    branches = filters.polyphase_filter(4, 6)
+    assert branches.shape == (4, 6)
+    np.testing.assert_array_equal(branches[1], taps[1::4])
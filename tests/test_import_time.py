@@ -0,0 +1,30 @@
+import json
+import os
+import subprocess
+import sys
+
+# Generous for CI machines; a cold import takes a few tens of milliseconds
+IMPORT_BUDGET = 0.5
+
+HEAVY_MODULES = ("SoapySDR", "scipy", "matplotlib", "numba", "asyncio")
+
+PROBE = f"""
+import json, sys, time
+started = time.perf_counter()
+import sdrfly.sdr.sdr_generic
+elapsed = time.perf_counter() - started
+print(json.dumps({{"elapsed": elapsed, "loaded": [name for name in {HEAVY_MODULES!r} if name in sys.modules]}}))
+"""
+
+def _import_sdr_generic():
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(path for path in sys.path if path))
+    result = subprocess.run([sys.executable, "-c", PROBE], capture_output=True, text=True, env=env, check=True)
+    return json.loads(result.stdout.splitlines()[-1])
+
+def test_sdr_generic_does_not_import_heavy_dependencies():
+    assert _import_sdr_generic()["loaded"] == []
+
+def test_sdr_generic_import_time_budget():
+    # Best of three, so one slow start on a busy machine does not fail the test
+    elapsed = min(_import_sdr_generic()["elapsed"] for _ in range(3))
+    assert elapsed < IMPORT_BUDGET, f"import sdrfly.sdr.sdr_generic took {elapsed * 1000:.0f} ms"
@@ -0,0 +1,56 @@
+import json
+import pytest
+from sdrfly.channelizers import registry
+from sdrfly.channelizers.channelizer_pfb import ChannelizerPFB
+
+@pytest.fixture
+def broken_backends(tmp_path, monkeypatch):
+    # One backend whose module is missing and one whose shared library fails to load
+    (tmp_path / "sdrfly_test_oserror_backend.py").write_text("raise OSError('libmissing.so: cannot open shared object file')\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.setitem(registry.BACKENDS, "missing", ("sdrfly_test_no_such_module", "Channelizer"))
+    monkeypatch.setitem(registry.BACKENDS, "broken", ("sdrfly_test_oserror_backend", "Channelizer"))
+    registry.load_backend.cache_clear()
+    yield
+    registry.load_backend.cache_clear()
+
+@pytest.fixture
+def cache_home(tmp_path, monkeypatch):
+    monkeypatch.delenv("SDRFLY_AUTOTUNE_CACHE", raising=False)
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    return tmp_path
+
+def test_unavailable_backends_are_skipped(broken_backends):
+    available = registry.available_backends()
+    assert "pfb" in available
+    assert "missing" not in available and "broken" not in available
+    for name in ("missing", "broken"):
+        with pytest.raises(RuntimeError, match=f"backend {name} is not available"):
+            registry.get_channelizer(10, 1e6, 10e6, backend=name)
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError, match="Unknown channelizer backend"):
+        registry.get_channelizer(10, 1e6, 10e6, backend="no_such_backend")
+
+def test_autotune_writes_and_rereads_its_cache(cache_home, monkeypatch):
+    result = registry.autotune(10, 1e6, 10e6, block_size=8192, backends=("pfb", "fft"), repeats=1)
+    assert result["backend"] in ("pfb", "fft")
+    cache_file = cache_home / "sdrfly" / "channelizer_autotune.json"
+    cache = json.loads(cache_file.read_text())
+    assert list(cache.values()) == [result]
+    assert not list(cache_file.parent.glob("*.tmp"))
+
+    # A cached winner is used without benchmarking again
+    def fail(*args, **kwargs):
+        raise AssertionError("autotune ran despite a cached winner")
+    monkeypatch.setattr(registry, "autotune", fail)
+    channelizer = registry.get_channelizer(10, 1e6, 10e6, block_size=8192)
+    assert type(channelizer).__name__ == registry.BACKENDS[result["backend"]][1]
+
+def test_home_cache_directory_is_used_without_xdg(tmp_path, monkeypatch):
+    monkeypatch.delenv("SDRFLY_AUTOTUNE_CACHE", raising=False)
+    monkeypatch.delenv("XDG_CACHE_HOME", raising=False)
+    monkeypatch.setenv("HOME", str(tmp_path))
+    registry.autotune(8, 1e6, 8e6, block_size=4096, backends=("pfb",), repeats=1)
+    assert (tmp_path / ".cache" / "sdrfly" / "channelizer_autotune.json").exists()
+    assert isinstance(registry.get_channelizer(8, 1e6, 8e6, block_size=4096), ChannelizerPFB)
@@ -0,0 +1,66 @@
+import asyncio
+import time
+import numpy as np
+import pytest
+from sdrfly.sdr.sdr_base import SDR, ReadResult
+
+class FailingSDR(SDR):
+    """Reads good samples, then fails every read as an unplugged device does."""
+
+    ERROR_BACKOFF = 0.0001
+    MAX_ERROR_BACKOFF = 0.001
+    MAX_READ_ERRORS = 10
+
+    def __init__(self, good_samples):
+        super().__init__(2.4e9, 1e6, 1e6, 0)
+        self.good_samples = good_samples
+        self.reads = 0
+
+    def _read_into(self, buffer):
+        self.reads += 1
+        if self.good_samples <= 0:
+            return ReadResult(-5)
+        count = min(len(buffer), self.good_samples)
+        buffer[:count] = 1
+        self.good_samples -= count
+        return ReadResult(count)
+
+    def set_frequency(self, frequency):
+        self.center_freq = frequency
+
+    def close(self):
+        self.stop()
+
+def test_capture_stops_after_consecutive_read_errors():
+    sdr = FailingSDR(good_samples=4096)
+    sdr.start(block_size=1024)
+    sdr.thread.join(timeout=5)
+    assert not sdr.thread.is_alive()
+    assert not sdr.running
+    assert sdr.reads == 4 + FailingSDR.MAX_READ_ERRORS
+    assert sdr.ring.sequence == 4
+    with pytest.raises(RuntimeError, match="consecutive read errors"):
+        sdr.reader()
+    sdr.stop()
+
+def test_stream_raises_capture_error_after_captured_blocks():
+    sdr = FailingSDR(good_samples=3072)
+
+    async def consume():
+        blocks = []
+        with pytest.raises(RuntimeError, match="consecutive read errors"):
+            async for block in sdr.stream(block_size=1024):
+                blocks.append(block)
+        return blocks
+
+    assert len(asyncio.run(consume())) == 3
+
+def test_capture_samples_raises_and_recovers():
+    sdr = FailingSDR(good_samples=0)
+    started = time.perf_counter()
+    with pytest.raises(RuntimeError):
+        sdr.capture_samples(1024)
+    # Backed off between reads rather than spinning
+    assert time.perf_counter() - started >= FailingSDR.ERROR_BACKOFF * FailingSDR.MAX_READ_ERRORS
+    sdr.good_samples = 1024
+    assert np.all(sdr.capture_samples(1024) == 1)
@@ -0,0 +1,57 @@
+import gc
+import os
+import numpy as np
+import pytest
+from sdrfly.iq import CS16
+from sdrfly.sdr.ring_buffer import BLOCK_PARTIAL
+from sdrfly.sdr.sdr_file import FileSDR, save_sigmf
+
+def _save(tmp_path, num_samples, dtype=np.complex64):
+    samples = np.zeros(num_samples, dtype=dtype)
+    if dtype == CS16:
+        samples["re"] = np.arange(num_samples) % 1000
+    else:
+        samples.real = np.arange(num_samples)
+    save_sigmf(tmp_path / "recording", samples, 1e6, 2.4e9)
+    return samples
+
+def test_capture_delivers_the_partial_tail(tmp_path):
+    samples = _save(tmp_path, 10 * 1024 + 300)
+    sdr = FileSDR(tmp_path / "recording")
+    sdr.start(block_size=1024, num_blocks=32)
+    sdr.thread.join(timeout=5)
+    blocks = list(sdr.reader("oldest"))
+    assert [len(block.samples) for block in blocks] == [1024] * 10 + [300]
+    assert blocks[-1].info["flags"] & BLOCK_PARTIAL
+    assert blocks[-1].info["num_samples"] == 300
+    assert not any(block.info["flags"] & BLOCK_PARTIAL for block in blocks[:-1])
+    np.testing.assert_array_equal(np.concatenate([block.samples for block in blocks]), samples)
+    sdr.close()
+
+def test_stream_format_must_match_the_recording(tmp_path):
+    _save(tmp_path, 1000)
+    with pytest.raises(ValueError, match="cf32, not CS16"):
+        FileSDR(tmp_path / "recording", stream_format="CS16")
+
+def test_native_blocks_keep_file_width(tmp_path):
+    samples = _save(tmp_path, 1000, CS16)
+    sdr = FileSDR(tmp_path / "recording", stream_format="native")
+    blocks = list(sdr.blocks(256))
+    assert all(block.samples.dtype == CS16 for block in blocks)
+    assert [int(block.info["num_samples"]) for block in blocks] == [256, 256, 256, 232]
+    np.testing.assert_array_equal(np.concatenate([block.samples for block in blocks]), samples)
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/maps"), reason="needs /proc to list mappings")
+def test_close_unmaps_the_recording(tmp_path):
+    _save(tmp_path, 1000, CS16)
+    sdr = FileSDR(tmp_path / "recording", stream_format="native")
+    data_path = str(tmp_path / "recording.sigmf-data")
+
+    def mapped():
+        with open("/proc/self/maps") as maps:
+            return data_path in maps.read()
+
+    assert mapped()
+    sdr.close()
+    gc.collect()
+    assert not mapped()
@@ -0,0 +1,92 @@
+import numpy as np
+from sdrfly.sdr.ring_buffer import BLOCK_DISCONTINUITY
+from sdrfly.sdr.sdr_base import SDR, SOAPY_SDR_HAS_TIME, SOAPY_SDR_OVERFLOW, ReadResult
+from sdrfly.sdr.sdr_multi import MultiSDR
+
+SAMPLE_RATE = 1e6
+BLOCK_SIZE = 1024
+
+class RampSDR(SDR):
+    """
+    Receiver whose samples count time in samples from a common epoch, starting at first.
+    The samples in drop are lost, either reported as an overflow or only seen in the
+    timestamps.
+    """
+
+    def __init__(self, first, length, drop=None, timestamps=True, report_overflow=False):
+        super().__init__(2.4e9, SAMPLE_RATE, SAMPLE_RATE, 0)
+        self.position = first
+        self.end = first + length
+        self.drop = drop
+        self.timestamps = timestamps
+        self.report_overflow = report_overflow
+
+    def _read_into(self, buffer):
+        if self.drop is not None and self.position == self.drop[0]:
+            self.position = self.drop[1]
+            self.drop = None
+            if self.report_overflow:
+                return ReadResult(SOAPY_SDR_OVERFLOW)
+        stop = min(self.position + min(len(buffer), 1000), self.end)
+        if self.drop is not None:
+            stop = min(stop, self.drop[0])
+        if stop <= self.position:
+            self.exhausted = True
+            return ReadResult(0)
+        count = stop - self.position
+        buffer[:count] = np.arange(self.position, stop)
+        time_ns = round(self.position * 1e9 / SAMPLE_RATE)
+        self.position = stop
+        return ReadResult(count, SOAPY_SDR_HAS_TIME if self.timestamps else 0, time_ns)
+
+    def set_frequency(self, frequency):
+        self.center_freq = frequency
+
+    def close(self):
+        self.stop()
+
+def _capture(sdrs, align):
+    multi = MultiSDR(sdrs, align=align)
+    # A ring large enough for the whole stream, so nothing is lost to overruns
+    multi.start(BLOCK_SIZE, num_blocks=64)
+    try:
+        return list(multi.blocks()), multi.drop_stats()
+    finally:
+        multi.close()
+
+def test_time_alignment_lines_up_offset_devices_and_zero_fills_a_drop():
+    a = RampSDR(0, 40000)
+    b = RampSDR(300, 40000, drop=(5000, 5700))
+    tuples, stats = _capture([a, b], "time")
+    # The output starts at the first sample both devices have
+    assert tuples[0][0].samples[0] == tuples[0][1].samples[0] == 300
+    gaps = 0
+    lost_samples = 0
+    for block_a, block_b in tuples[:-1]:
+        assert block_a.info["time_ns"] == block_b.info["time_ns"]
+        received = block_b.samples != 0
+        np.testing.assert_array_equal(block_b.samples[received], block_a.samples[received])
+        lost = block_a.samples[~received].real
+        assert np.all((lost >= 5000) & (lost < 5700))
+        lost_samples += len(lost)
+        if block_a.info["flags"] & BLOCK_DISCONTINUITY:
+            # A gap on one device marks every block of the tuple
+            assert block_b.info["flags"] & BLOCK_DISCONTINUITY
+            gaps += 1
+    assert gaps >= 1
+    assert lost_samples == 700
+    # The device zero-fills the part of the drop inside its block, the aligner the rest
+    assert stats[1]["dropped"] == 700 and stats[0]["dropped"] == 0
+    assert stats[0]["zero_filled"] == 0 and 0 < stats[1]["zero_filled"] <= 700
+
+def test_samples_alignment_marks_the_whole_tuple_on_an_unmeasured_overflow():
+    a = RampSDR(0, 40000, timestamps=False)
+    b = RampSDR(0, 40000, drop=(5000, 5700), timestamps=False, report_overflow=True)
+    tuples, stats = _capture([a, b], "samples")
+    flagged = [bool(block_a.info["flags"] & BLOCK_DISCONTINUITY) for block_a, _ in tuples]
+    assert any(flagged)
+    for block_a, block_b in tuples:
+        assert bool(block_a.info["flags"] & BLOCK_DISCONTINUITY) == bool(block_b.info["flags"] & BLOCK_DISCONTINUITY)
+    assert stats[1]["overflows"] == 1 and stats[0]["overflows"] == 0
+    # The device could not say how much it lost
+    assert stats[1]["dropped"] == 0
@@ -0,0 +1,71 @@
+import numpy as np
+from sdrfly.demodulators.demodulator_numpy import GFSKDemodNumPy
+from sdrfly.demodulators.gfsk_slicer import GFSKSlicer
+from sdrfly.protocols.ble import ADVERTISING_CHANNELS, BLEAdvertisingDecoder
+from sdrfly.sdr.sdr_scenario import KIND_BLE, BLEAdvertiser, NoiseEmitter, ScenarioSDR, ToneEmitter
+
+SAMPLE_RATE = 4e6
+
+def _peak(samples):
+    """Frequency in Hz and power in dBFS of the strongest FFT bin."""
+    spectrum = np.fft.fft(samples) / len(samples)
+    peak = np.abs(spectrum).argmax()
+    return np.fft.fftfreq(len(samples), 1 / SAMPLE_RATE)[peak], 20 * np.log10(np.abs(spectrum[peak]))
+
+def test_tone_lands_at_its_offset_and_power():
+    sdr = ScenarioSDR(2.441e9, SAMPLE_RATE, [ToneEmitter(2.4415e9, power_db=-10)])
+    frequency, power_db = _peak(sdr.capture_samples(4000))
+    assert frequency == 0.5e6
+    assert abs(power_db + 10) < 0.01
+
+def test_reads_are_phase_continuous_whatever_their_size():
+    def scenario():
+        emitters = [ToneEmitter(2.4413e9, power_db=-10), BLEAdvertiser(interval=0.002, channels=(38,), power_db=-10)]
+        return ScenarioSDR(ADVERTISING_CHANNELS[38], SAMPLE_RATE, emitters, seed=3)
+
+    sdr = scenario()
+    pieces = [sdr.capture_samples(count) for count in (1, 999, 4096, 24904)]
+    np.testing.assert_allclose(np.concatenate(pieces), scenario().capture_samples(30000), atol=1e-6)
+
+def test_reset_replays_the_scenario():
+    sdr = ScenarioSDR(ADVERTISING_CHANNELS[38], SAMPLE_RATE, [NoiseEmitter(-40), BLEAdvertiser(interval=0.002)], seed=3)
+    first = sdr.capture_samples(30000)
+    sdr.reset()
+    np.testing.assert_array_equal(sdr.capture_samples(30000), first)
+
+def test_ble_packets_decode_on_their_channel():
+    advertiser = BLEAdvertiser(interval=0.005, channels=(38,), power_db=-10)
+    sdr = ScenarioSDR(ADVERTISING_CHANNELS[38], 2e6, [advertiser, NoiseEmitter(-40)], seed=1)
+    samples = sdr.capture_samples(40000)
+    bits = GFSKSlicer(2).slice(GFSKDemodNumPy().demodulate(samples[None]))
+    packets = BLEAdvertisingDecoder(channels=(38,)).decode(bits)
+    sent = sdr.transmissions()
+    assert len(sent) >= 1 and len(packets) == len(sent)
+    assert np.all(sent["kind"] == KIND_BLE) and np.all(sent["channel"] == 38)
+    assert np.all(packets["crc_ok"]) and np.all(packets["adv_address"] == advertiser.address)
+    np.testing.assert_allclose(packets["timestamp"], sent["time"], atol=20e-6)
+
+def test_retune_moves_signals_and_keeps_the_stream():
+    tone = 2.4415e9
+    sdr = ScenarioSDR(2.441e9, SAMPLE_RATE, [ToneEmitter(tone, power_db=-10)], seed=5)
+    sdr.capture_samples(5000)
+    sdr.set_frequency(2.442e9)
+    assert sdr.position == 5000
+    after = sdr.capture_samples(4000)
+    assert _peak(after)[0] == -0.5e6
+    # Same samples as a receiver tuned there all along, so the tone's phase follows the stream
+    tuned = ScenarioSDR(2.442e9, SAMPLE_RATE, [ToneEmitter(tone, power_db=-10)], seed=5)
+    tuned.capture_samples(5000)
+    np.testing.assert_allclose(after, tuned.capture_samples(4000), atol=1e-6)
+
+def test_retune_away_puts_no_packets_on_the_air():
+    advertiser = BLEAdvertiser(interval=0.002, channels=(38,), power_db=-10)
+    sdr = ScenarioSDR(ADVERTISING_CHANNELS[38], 2e6, [advertiser], seed=2)
+    sdr.capture_samples(10000)
+    logged = len(sdr.transmissions())
+    sdr.set_frequency(2.480e9)
+    assert np.all(sdr.capture_samples(20000) == 0)
+    assert len(sdr.transmissions()) == logged
+    sdr.set_frequency(ADVERTISING_CHANNELS[38])
+    sdr.capture_samples(20000)
+    assert len(sdr.transmissions()) > logged
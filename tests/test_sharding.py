@@ -0,0 +1,91 @@
+import functools
+import os
+import numpy as np
+import pytest
+from sdrfly.correlator import br_sync_word
+from sdrfly.sharding import CorrelatorStage, ShardedPipeline
+from sdrfly.synth import br_access_code_bits, gfsk_waveform
+
+NUM_CHANNELS = 6
+SAMPLES_PER_SYMBOL = 2
+LAP = 0x9E8B33
+
+def _channel_samples(num_bits=6000, seed=2):
+    """One GFSK row per channel, each carrying the access code at a different bit offset."""
+    rng = np.random.default_rng(seed)
+    code = br_access_code_bits(LAP)
+    rows = []
+    for channel in range(NUM_CHANNELS):
+        bits = rng.integers(0, 2, num_bits).astype(np.uint8)
+        position = 500 + 700 * channel
+        bits[position:position + len(code)] = code
+        rows.append(gfsk_waveform(bits, SAMPLES_PER_SYMBOL)[:num_bits * SAMPLES_PER_SYMBOL])
+    return np.array(rows)
+
+def _blocks(samples, block_len):
+    return [samples[:, start:start + block_len] for start in range(0, samples.shape[1], block_len)]
+
+def _sorted(matches):
+    return np.sort(matches, order=["channel", "bit_offset"])
+
+class FailingStage:
+    """Stage whose worker fails on the second block."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = 0
+
+    def __call__(self, samples):
+        self.calls += 1
+        if self.calls == 2:
+            raise ValueError("bad block")
+        return np.zeros(0)
+
+def _failing_factory(rows):
+    raise ValueError("cannot build stage")
+
+def _exiting_stage(rows):
+    def stage(samples):
+        os._exit(3)
+    return stage
+
+def test_sharded_results_match_one_process():
+    stage_factory = functools.partial(CorrelatorStage, samples_per_symbol=SAMPLES_PER_SYMBOL,
+                                      sync_words=[br_sync_word(LAP)], max_errors=2, labels=[LAP])
+    blocks = _blocks(_channel_samples(), 2000)
+    reference = stage_factory(np.arange(NUM_CHANNELS))
+    expected = np.concatenate([reference(block) for block in blocks])
+    assert len(expected) == NUM_CHANNELS
+
+    results = []
+    with ShardedPipeline(NUM_CHANNELS, 2000, stage_factory, num_workers=3, num_slots=2) as pipeline:
+        for block in blocks:
+            results.extend(pipeline.submit(block, timeout=30))
+        results.extend(pipeline.drain(timeout=30))
+    assert len(results) == len(blocks)
+    np.testing.assert_array_equal(_sorted(np.concatenate(results)), _sorted(expected))
+
+def test_worker_failure_is_raised_with_its_traceback():
+    blocks = _blocks(np.zeros((NUM_CHANNELS, 400), np.complex64), 100)
+    with ShardedPipeline(NUM_CHANNELS, 100, FailingStage, num_workers=2) as pipeline:
+        for block in blocks[:2]:
+            pipeline.submit(block)
+        with pytest.raises(RuntimeError, match="bad block"):
+            pipeline.drain(timeout=30)
+
+def test_stage_factory_failure_is_raised():
+    with ShardedPipeline(NUM_CHANNELS, 100, _failing_factory, num_workers=2) as pipeline:
+        pipeline.submit(np.zeros((NUM_CHANNELS, 100), np.complex64))
+        with pytest.raises(RuntimeError, match="cannot build stage"):
+            pipeline.get(timeout=30)
+
+def test_dead_worker_is_raised():
+    with ShardedPipeline(NUM_CHANNELS, 100, _exiting_stage, num_workers=2) as pipeline:
+        pipeline.submit(np.zeros((NUM_CHANNELS, 100), np.complex64))
+        with pytest.raises(RuntimeError, match="exited with code 3"):
+            pipeline.get(timeout=30)
+
+def test_submit_rejects_oversized_blocks():
+    with ShardedPipeline(NUM_CHANNELS, 100, FailingStage, num_workers=1) as pipeline:
+        with pytest.raises(ValueError):
+            pipeline.submit(np.zeros((NUM_CHANNELS, 101), np.complex64))
@@ -0,0 +1,36 @@
+import numpy as np
+from sdrfly.protocols.ble import PACKET_DTYPE
+from sdrfly.sightings import MAX_CHANNEL_HITS, SightingTable
+
+def test_update_expires_without_explicit_expire():
+    table = SightingTable(ttl=10.0)
+    table.update([1, 2], [0.0, 0.0])
+    for t in np.arange(1.0, 30.0):
+        table.update([3], t)
+    assert 1 not in table and 2 not in table
+    assert 3 in table
+
+def test_update_packets_skips_missing_adv_address():
+    packets = np.zeros(3, dtype=PACKET_DTYPE)
+    packets["crc_ok"] = True
+    packets["adv_address"] = [0, 0, 0x123456789ABC]
+    table = SightingTable()
+    table.update_packets(packets)
+    assert len(table) == 1 and 0x123456789ABC in table
+
+def test_channel_hits_count_and_saturate():
+    table = SightingTable(num_channels=4)
+    table.update([7, 7, 7, 9], [0.0, 1.0, 2.0, 3.0], channels=[1, 1, 3, 0])
+    _, hits = table.lookup(7)
+    assert hits.tolist() == [0, 2, 0, 1]
+    assert table.lookup(9)[1].tolist() == [1, 0, 0, 0]
+    table.update(np.full(70000, 9), np.arange(70000.0), channels=2)
+    assert table.lookup(9)[1].tolist() == [1, 0, MAX_CHANNEL_HITS, 0]
+    assert table.lookup(9)[0]["count"] == 70001
+
+def test_columns_grow_on_demand():
+    table = SightingTable(num_channels=40)
+    assert table._channel_hits.nbytes <= 1024 * 40 * 2
+    table.update(np.arange(5000), 0.0, channels=0)
+    assert len(table) == 5000
+    assert table._channel_hits.shape[0] < 10000
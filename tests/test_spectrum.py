@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+from sdrfly.spectrum import SpectrumEngine
+
+SAMPLE_RATE = 1.024e6
+FFT_SIZE = 1024
+
+def _tone(frequency, num_samples, amplitude=1.0):
+    return (amplitude * np.exp(2j * np.pi * frequency / SAMPLE_RATE * np.arange(num_samples))).astype(np.complex64)
+
+def _noise(num_samples, power_db=-60, seed=0):
+    rng = np.random.default_rng(seed)
+    noise = rng.standard_normal((num_samples, 2)).astype(np.float32) * np.float32(10 ** (power_db / 20) / np.sqrt(2))
+    return noise.view(np.complex64)[:, 0]
+
+@pytest.mark.parametrize("window", ["hann", "rectangular", "blackman"])
+@pytest.mark.parametrize("frequency", [-300e3, 0.0, 12e3])
+def test_full_scale_tone_reads_0_dbfs_in_its_bin(window, frequency):
+    engine = SpectrumEngine(SAMPLE_RATE, FFT_SIZE, window, center_freq=100e6)
+    spectrum = engine.compute(_tone(frequency, 8 * FFT_SIZE))
+    peak = spectrum.argmax()
+    assert engine.freqs[peak] == 100e6 + frequency
+    assert abs(spectrum[peak]) < 0.01
+
+def test_push_produces_frames_at_frame_rate():
+    engine = SpectrumEngine(SAMPLE_RATE, FFT_SIZE, frame_rate=25, num_average=4)
+    samples = _noise(int(SAMPLE_RATE))
+    frames = []
+    for start in range(0, len(samples), 10007):
+        frames.extend(engine.push(samples[start:start + 10007]))
+    assert len(frames) == pytest.approx(25, abs=1)
+    assert engine.latest is frames[-1]
+
+def test_push_in_blocks_matches_one_push():
+    samples = _noise(100000) + _tone(50e3, 100000, 0.1)
+    whole = SpectrumEngine(SAMPLE_RATE, FFT_SIZE, num_average=8).push(samples)
+    engine = SpectrumEngine(SAMPLE_RATE, FFT_SIZE, num_average=8)
+    pieces = [frame for start in range(0, len(samples), 777) for frame in engine.push(samples[start:start + 777])]
+    assert len(pieces) == len(whole) > 1
+    for piece, frame in zip(pieces, whole):
+        np.testing.assert_allclose(piece, frame, atol=1e-3)
+
+def test_max_and_min_hold_persist_until_reset():
+    tone_bin = FFT_SIZE // 2 + 50
+    burst = _noise(16 * FFT_SIZE) + _tone(50e3, 16 * FFT_SIZE)
+    quiet = _noise(16 * FFT_SIZE, seed=1)
+
+    max_hold = SpectrumEngine(SAMPLE_RATE, FFT_SIZE, averaging="max_hold", num_average=4)
+    max_hold.push(burst)
+    held = max_hold.push(quiet)[-1]
+    assert held[tone_bin] > -1
+    max_hold.reset()
+    assert max_hold.push(quiet)[-1][tone_bin] < -60
+
+    min_hold = SpectrumEngine(SAMPLE_RATE, FFT_SIZE, averaging="min_hold", num_average=4)
+    min_hold.push(quiet)
+    assert min_hold.push(burst)[-1][tone_bin] < -60
+    min_hold.reset()
+    assert min_hold.push(burst)[-1][tone_bin] > -1
+
+def test_compute_leaves_streaming_state_untouched():
+    samples = _noise(40000) + _tone(-80e3, 40000, 0.5)
+    reference = SpectrumEngine(SAMPLE_RATE, FFT_SIZE, averaging="ewma", num_average=8)
+    expected = reference.push(samples[:15000]) + reference.push(samples[15000:])
+    engine = SpectrumEngine(SAMPLE_RATE, FFT_SIZE, averaging="ewma", num_average=8)
+    outputs = engine.push(samples[:15000])
+    engine.compute(_tone(200e3, 4 * FFT_SIZE))
+    outputs += engine.push(samples[15000:])
+    assert len(outputs) == len(expected)
+    for output, frame in zip(outputs, expected):
+        np.testing.assert_array_equal(output, frame)
+
+def test_compute_needs_a_whole_frame():
+    with pytest.raises(ValueError):
+        SpectrumEngine(SAMPLE_RATE, FFT_SIZE).compute(np.zeros(FFT_SIZE - 1, np.complex64))
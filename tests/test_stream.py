@@ -0,0 +1,74 @@
+import asyncio
+import contextlib
+import threading
+import time
+import numpy as np
+from sdrfly.sdr.ring_buffer import BLOCK_DISCONTINUITY
+from sdrfly.sdr.sdr_file import FileSDR, save_sigmf
+from sdrfly.sdr.sdr_simulated import SimulatedBluetoothSDR
+
+BLOCK_SIZE = 1024
+NUM_BLOCKS = 64
+
+def _recording(tmp_path):
+    samples = np.arange(BLOCK_SIZE * NUM_BLOCKS, dtype=np.float32).astype(np.complex64)
+    save_sigmf(tmp_path / "recording", samples, 1e6, 2.4e9)
+    return FileSDR(tmp_path / "recording")
+
+async def _consume(sdr, delay, **kwargs):
+    blocks = []
+    async with contextlib.aclosing(sdr.stream(block_size=BLOCK_SIZE, **kwargs)) as stream:
+        async for block in stream:
+            blocks.append(block)
+            await asyncio.sleep(delay)
+    return blocks
+
+def _pump_threads():
+    return [thread for thread in threading.enumerate() if thread.name == "sdrfly-stream-pump"]
+
+def test_drop_oldest_accounts_for_dropped_blocks(tmp_path):
+    sdr = _recording(tmp_path)
+    blocks = asyncio.run(_consume(sdr, 0.005, queue_size=2, policy="drop_oldest"))
+    dropped = sum(int(block.info["dropped"]) for block in blocks)
+    assert 0 < len(blocks) < NUM_BLOCKS
+    assert dropped > 0
+    assert sum(len(block.samples) for block in blocks) + dropped == BLOCK_SIZE * NUM_BLOCKS
+    # Every delivered block after a loss is marked, and the newest block is kept
+    assert all(block.info["flags"] & BLOCK_DISCONTINUITY for block in blocks if block.info["dropped"])
+    assert blocks[-1].info["sample_index"] == BLOCK_SIZE * (NUM_BLOCKS - 1)
+
+def test_block_policy_delivers_every_block(tmp_path):
+    sdr = _recording(tmp_path)
+    blocks = asyncio.run(_consume(sdr, 0.001, queue_size=2, policy="block", num_blocks=2 * NUM_BLOCKS))
+    assert len(blocks) == NUM_BLOCKS
+    assert sum(int(block.info["dropped"]) for block in blocks) == 0
+    assert [int(block.info["sample_index"]) for block in blocks] == list(range(0, BLOCK_SIZE * NUM_BLOCKS, BLOCK_SIZE))
+    np.testing.assert_array_equal(np.concatenate([block.samples for block in blocks]).real,
+                                  np.arange(BLOCK_SIZE * NUM_BLOCKS))
+
+def test_cancelling_the_consumer_stops_pump_and_capture():
+    sdr = SimulatedBluetoothSDR(2.4e9, 2e6, 2e6, 0)
+
+    async def main():
+        received = asyncio.Event()
+
+        async def consume():
+            async for _ in sdr.stream(block_size=BLOCK_SIZE):
+                received.set()
+
+        task = asyncio.create_task(consume())
+        await received.wait()
+        assert sdr.running
+        assert len(_pump_threads()) == 1
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    asyncio.run(main())
+    assert not sdr.running
+    deadline = time.monotonic() + 2
+    while _pump_threads() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not _pump_threads()
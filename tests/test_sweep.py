@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+from sdrfly.sdr.sdr_base import SDR, ReadResult
+from sdrfly.sweep import Sweep, measure_settle_samples
+from sdrfly.synth import AWGN, NCO
+
+class ToneSDR(SDR):
+    """
+    Receiver that sees one full-scale tone at tone_freq over a flat noise floor. For
+    settle samples after every retune it reads 20 dB hot, as a tuner still locking.
+    """
+
+    def __init__(self, tone_freq=None, sample_rate=1e6, settle=0, noise_db=-50):
+        super().__init__(100e6, sample_rate, sample_rate, 0)
+        self.tone_freq = tone_freq
+        self.settle = settle
+        self.unsettled = 0
+        self._tone = NCO(0, sample_rate)
+        self._noise = AWGN(-noise_db, seed=7)
+
+    def set_frequency(self, frequency):
+        self.center_freq = frequency
+        self.unsettled = self.settle
+        if self.tone_freq is not None:
+            self._tone.frequency = self.tone_freq - frequency
+
+    def _read_into(self, buffer):
+        offset = None if self.tone_freq is None else self.tone_freq - self.center_freq
+        if offset is not None and abs(offset) < self.sample_rate / 2:
+            self._tone.fill(buffer)
+        else:
+            buffer[:] = 0
+        self._noise.add_to(buffer)
+        hot = min(self.unsettled, len(buffer))
+        buffer[:hot] *= 10
+        self.unsettled -= hot
+        return ReadResult(len(buffer))
+
+    def close(self):
+        self.stop()
+
+def test_measure_settle_samples_is_zero_when_the_tuner_settles_at_once():
+    assert measure_settle_samples(ToneSDR(), 100e6, 200e6) == 0
+
+def test_measure_settle_samples_rounds_up_to_whole_windows():
+    assert measure_settle_samples(ToneSDR(settle=3000), 100e6, 200e6, window=1024) == 3072
+
+def test_measure_settle_samples_is_capped():
+    sdr = ToneSDR(settle=200000)
+    assert measure_settle_samples(sdr, 100e6, 200e6, window=1024, num_windows=256) == 65536
+    assert measure_settle_samples(sdr, 100e6, 200e6, window=1024, num_windows=256, max_samples=4096) == 4096
+
+def test_sweep_discards_the_measured_settle_samples():
+    sweep = Sweep(ToneSDR(settle=3000), 100e6, 110e6, fft_size=256, num_frames=8)
+    sweep.run()
+    assert sweep.settle_samples == 3072
+
+def test_sweep_measures_settling_between_the_configured_frequencies():
+    sdr = ToneSDR()
+    tuned = []
+    set_frequency = sdr.set_frequency
+    sdr.set_frequency = lambda frequency: (tuned.append(frequency), set_frequency(frequency))
+    Sweep(sdr, 100e6, 110e6, fft_size=256, num_frames=8, settle_freqs=(50e6, 60e6)).run()
+    assert tuned[:2] == [50e6, 60e6]
+
+@pytest.mark.parametrize("tone_freq", [100.5e6, 103.3e6, 106.25e6, 109.9e6])
+def test_stitched_tone_lands_in_its_bin(tone_freq):
+    result = Sweep(ToneSDR(tone_freq), 100e6, 110e6, fft_size=1024, num_frames=8, settle_samples=0).run()
+    peak = result.freqs[result.power_db.argmax()]
+    assert abs(peak - tone_freq) <= (result.freqs[1] - result.freqs[0]) / 2
+    # A full-scale tone reads close to 0 dBFS, and well above the floor
+    assert result.power_db.max() > -3
+    assert np.median(result.power_db) < -40
+
+def test_panorama_covers_the_span_without_seams():
+    sweep = Sweep(ToneSDR(noise_db=-30), 100e6, 120e6, fft_size=512, num_frames=200, settle_samples=0)
+    result = sweep.run()
+    bin_width = sweep.bin_width
+    assert len(sweep.step_freqs) > 3
+    assert result.freqs[0] - 100e6 < bin_width and 120e6 - result.freqs[-1] < bin_width
+    np.testing.assert_allclose(np.diff(result.freqs), bin_width)
+    # A flat floor stays flat across the overlaps between steps
+    index = np.round((result.freqs - sweep.grid[0]) / bin_width).astype(int)
+    overlap_bins = sweep.kept_bins - sweep.step_bins
+    in_overlap = (index >= sweep.step_bins) & (index % sweep.step_bins < overlap_bins)
+    assert in_overlap.any() and (~in_overlap).any()
+    assert abs(result.power_db[in_overlap].mean() - result.power_db[~in_overlap].mean()) < 0.1
+    assert np.ptp(np.convolve(result.power_db, np.ones(64) / 64, mode="valid")) < 0.5
+    assert result.step_power_db.shape == (len(sweep.step_freqs), sweep.kept_bins)
@@ -0,0 +1,62 @@
+from fractions import Fraction
+import numpy as np
+import pytest
+from sdrfly.synth import FULL_TURN, NCO, phase_increment
+
+SAMPLE_RATE = 20e6
+# Phase error of the 16 bit sine table lookup
+TABLE_ERROR = 2 * np.pi / (1 << 16)
+
+def _exact(frequency, num_samples, phase=0.0):
+    return np.exp(1j * (phase + 2 * np.pi * frequency / SAMPLE_RATE * np.arange(num_samples)))
+
+@pytest.mark.parametrize("frequency", [1e6, -3.3e6, 123.456])
+def test_nco_is_phase_continuous_across_calls(frequency):
+    nco = NCO(frequency, SAMPLE_RATE, phase=0.5)
+    blocks = [nco.generate(count) for count in (1, 7, 1000, 4096, 3)]
+    np.testing.assert_array_equal(np.concatenate(blocks), NCO(frequency, SAMPLE_RATE, phase=0.5).generate(5107))
+    np.testing.assert_allclose(np.concatenate(blocks), _exact(frequency, 5107, 0.5), atol=2 * TABLE_ERROR)
+
+def test_nco_frequency_is_exact_to_the_accumulator_resolution():
+    frequency = 2.4e6 + 1 / 3
+    increment = phase_increment(frequency, SAMPLE_RATE)
+    assert abs(Fraction(increment, FULL_TURN) * Fraction(SAMPLE_RATE) - Fraction(frequency)) <= Fraction(SAMPLE_RATE) / FULL_TURN
+
+def test_nco_phase_does_not_drift_over_long_runs():
+    frequency = 1e6 / 3
+    nco = NCO(frequency, SAMPLE_RATE)
+    for _ in range(100):
+        nco.generate(100003)
+    num_samples = 100 * 100003
+    assert nco.phase == increment_phase(frequency, num_samples)
+    # A billion samples on, the phase is still within the table error of the exact one
+    nco.seek(10 ** 12)
+    exact_turns = Fraction(frequency) / Fraction(SAMPLE_RATE) * 10 ** 12 % 1
+    error = abs(Fraction(nco.phase, FULL_TURN) - exact_turns)
+    assert min(error, 1 - error) * 2 * np.pi < TABLE_ERROR
+
+def increment_phase(frequency, num_samples):
+    return phase_increment(frequency, SAMPLE_RATE) * num_samples % FULL_TURN
+
+def test_nco_seek_matches_continuous_generation():
+    nco = NCO(-1.7e6, SAMPLE_RATE, phase=1.0)
+    nco.generate(12345)
+    continued = nco.generate(100)
+    sought = NCO(-1.7e6, SAMPLE_RATE, phase=1.0)
+    sought.seek(12345)
+    np.testing.assert_array_equal(sought.generate(100), continued)
+
+def test_nco_frequency_change_has_no_phase_jump():
+    nco = NCO(1e6, SAMPLE_RATE)
+    first = nco.generate(1000)
+    nco.frequency = 2e6
+    second = nco.generate(1000)
+    steps = np.angle(np.concatenate((first, second))[1:] * np.conj(np.concatenate((first, second))[:-1]))
+    expected = np.where(np.arange(1999) < 1000, 2 * np.pi * 1e6 / SAMPLE_RATE, 2 * np.pi * 2e6 / SAMPLE_RATE)
+    np.testing.assert_allclose(steps, expected, atol=2 * TABLE_ERROR)
+
+def test_nco_amplitude_and_add_to():
+    nco = NCO(1e6, SAMPLE_RATE, amplitude=0.25)
+    out = np.ones(500, dtype=np.complex64)
+    nco.add_to(out)
+    np.testing.assert_allclose(out - 1, 0.25 * _exact(1e6, 500), atol=TABLE_ERROR)
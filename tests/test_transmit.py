@@ -0,0 +1,91 @@
+import threading
+import time
+import numpy as np
+import pytest
+from sdrfly.sdr.sdr_base import SDR, ReadResult
+from sdrfly.sdr.transmit import SOAPY_SDR_END_BURST, CyclicSource, GeneratorSource, Transmission
+
+class RecordingSDR(SDR):
+    """Transmitter that records every write as (num_samples, flags)."""
+
+    def __init__(self, max_write=None, fail_after=None, write_delay=0.0):
+        super().__init__(2.4e9, 1e6, 1e6, 0)
+        self.max_write = max_write
+        self.fail_after = fail_after
+        self.write_delay = write_delay
+        self.writes = []
+        self.samples = []
+        self.closed_tx = threading.Event()
+
+    def _write_from(self, buffer, flags=0):
+        if self.fail_after is not None and len(self.writes) >= self.fail_after:
+            self.writes.append((0, flags))
+            return ReadResult(-5)
+        time.sleep(self.write_delay)
+        count = len(buffer) if self.max_write is None else min(len(buffer), self.max_write)
+        self.writes.append((count, flags))
+        self.samples.append(buffer[:count].copy())
+        return ReadResult(count)
+
+    def _close_tx_stream(self):
+        self.closed_tx.set()
+
+    def set_frequency(self, frequency):
+        self.center_freq = frequency
+
+    def close(self):
+        self.stop()
+
+def _finish(transmission):
+    assert transmission.wait(5)
+    assert transmission.error is None
+    return transmission
+
+@pytest.mark.parametrize("num_samples", [1000, 1024, 2048, 2500])
+def test_cyclic_source_sends_every_sample_and_ends_the_burst(num_samples):
+    sdr = RecordingSDR(max_write=300)
+    burst = np.arange(num_samples, dtype=np.complex64)
+    transmission = _finish(Transmission(sdr, CyclicSource(burst), 512))
+    assert transmission.sent == num_samples
+    np.testing.assert_array_equal(np.concatenate(sdr.samples), burst)
+    # Only the writes of the final chunk end the burst, even when the last chunk is exactly full
+    flags = [flags for _, flags in sdr.writes]
+    final = flags.index(SOAPY_SDR_END_BURST)
+    assert sum(count for count, _ in sdr.writes[:final]) >= num_samples - 512
+    assert set(flags[:final]) <= {0} and set(flags[final:]) == {SOAPY_SDR_END_BURST}
+    if num_samples % 512 == 0:
+        assert sdr.writes[-1] == (0, SOAPY_SDR_END_BURST)
+    assert sdr.closed_tx.is_set()
+
+def test_generator_source_sends_every_sample():
+    sdr = RecordingSDR()
+    chunks = [np.full(length, i, dtype=np.complex64) for i, length in enumerate([7, 700, 1, 512, 90])]
+    transmission = _finish(Transmission(sdr, GeneratorSource(iter(chunks)), 256))
+    assert transmission.sent == sum(len(chunk) for chunk in chunks)
+    np.testing.assert_array_equal(np.concatenate(sdr.samples), np.concatenate(chunks))
+    assert sdr.writes[-1][1] == SOAPY_SDR_END_BURST
+
+def test_loop_runs_until_stop_and_stop_ends_the_burst():
+    sdr = RecordingSDR(write_delay=0.001)
+    transmission = Transmission(sdr, CyclicSource(np.ones(100, dtype=np.complex64), loop=True), 64)
+    time.sleep(0.2)
+    assert transmission.running
+    assert transmission.sent > 100
+    started = time.perf_counter()
+    transmission.stop()
+    assert transmission.wait(1)
+    assert time.perf_counter() - started < 0.5
+    assert transmission.error is None
+    assert sdr.writes[-1] == (0, SOAPY_SDR_END_BURST)
+    assert sdr.closed_tx.is_set()
+    assert transmission.sent == sum(count for count, _ in sdr.writes)
+
+def test_write_error_is_reported():
+    sdr = RecordingSDR(fail_after=2)
+    transmission = Transmission(sdr, CyclicSource(np.ones(1000, dtype=np.complex64)), 128)
+    assert transmission.wait(5)
+    assert isinstance(transmission.error, RuntimeError)
+    assert transmission.sent == 256
+    assert sdr.closed_tx.is_set()
+    # The failed burst is still ended
+    assert sdr.writes[-1][1] == SOAPY_SDR_END_BURST